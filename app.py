@@ -1,18 +1,46 @@
 
-from fastapi import FastAPI, Request, Form
+import asyncio
+import os
+import time
+
+from fastapi import Depends, FastAPI, Request, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.responses import HTMLResponse, RedirectResponse
 from uvicorn import run as app_run
 
-from typing import Optional
+from typing import List, Optional
 
-from schizophrenia_prediction.constants import APP_HOST, APP_PORT
-from schizophrenia_prediction.pipeline.prediction_pipeline import SchizophreniaData, SchizophreniaClassifier
-from schizophrenia_prediction.pipeline.training_pipeline import TrainPipeline
-from schizophrenia_prediction.logger import logging
+from schizophrenia_prediction.constants import (APP_HOST, APP_PORT, PREDICTION_BATCH_MAX_RECORDS,
+                                                PREDICTION_COLUMNAR_BATCH_MAX_BYTES,
+                                                PREDICTION_COLUMNAR_BATCH_MAX_RECORDS, PREDICTION_LABELS,
+                                                SERVING_MODEL_ROUTING_KEY_HEADER, SERVING_MODEL_VERSION_HEADER,
+                                                SERVING_MODEL_VERSION_QUERY_PARAM)
+from schizophrenia_prediction.entity.request_entity import (SchizophreniaRecord, SchizophreniaBatchResponse,
+                                                             SchizophreniaPredictionResponse, PatientPredictionRequest,
+                                                             PatientBatchPredictionRequest, PatientPredictionResponse,
+                                                             PatientBatchPredictionResponse)
+from schizophrenia_prediction.pipeline.prediction_pipeline import SchizophreniaData, SchizophreniaBatchData, SchizophreniaClassifier
+from schizophrenia_prediction.logger import logging, log_route, route_sampling_filter
+from schizophrenia_prediction.entity.config_entity import (AdmissionControlConfig, MicroBatchConfig, InferenceExecutorConfig,
+                                                          InferenceLogConfig,
+                                                          ModelRegistryConfig, ModelWatcherConfig)
+from schizophrenia_prediction.serving.admission_controller import AdmissionController, AdmissionRejected
+from schizophrenia_prediction.serving.columnar_codec import codec_available, decode_columnar, encode_columnar
+from schizophrenia_prediction.serving.inference_executor import InferenceExecutor
+from schizophrenia_prediction.serving.inference_log_writer import InferenceLogWriter
+from schizophrenia_prediction.serving.launcher import in_launcher_worker, read_process_memory
+from schizophrenia_prediction.serving.metrics import REGISTRY, observe_seconds, predict_stage_histogram
+from schizophrenia_prediction.serving.micro_batcher import MicroBatcher
+from schizophrenia_prediction.serving.model_holder import get_model_holder
+from schizophrenia_prediction.serving.model_registry import ModelRouter, get_model_registry
+from schizophrenia_prediction.serving.model_watcher import ModelWatcher
+from schizophrenia_prediction.serving.patient_feature_store import get_patient_feature_store
+from schizophrenia_prediction.serving.prediction_cache import get_prediction_cache
+from schizophrenia_prediction.serving.scoring_job_manager import ScoringJobManager, ScoringUploadTooLarge
+from schizophrenia_prediction.serving.training_job_manager import TrainingJobManager
 
 
 app = FastAPI()
@@ -57,6 +85,192 @@ class DataForm:
         self.GAF_Score = form.get("GAF_Score")
         self.Medication_Adherence = form.get("Medication_Adherence")
 
+inference_executor = InferenceExecutor(inference_executor_config=InferenceExecutorConfig())
+
+model_watcher_config = ModelWatcherConfig()
+model_watcher = ModelWatcher(model_holder=get_model_holder(), model_watcher_config=model_watcher_config)
+
+training_job_manager = TrainingJobManager()
+scoring_job_manager = ScoringJobManager()
+inference_log_config = InferenceLogConfig()
+inference_log_writer = InferenceLogWriter(inference_log_config)
+model_router = ModelRouter(ModelRegistryConfig().ab_split)
+admission_control_config = AdmissionControlConfig()
+admission_controller = AdmissionController(admission_control_config)
+
+REGISTRY.register_collector("schizophrenia_log_records_sampled_out_total", "counter",
+                            "Log records dropped by the per route sampling",
+                            lambda: [({"route": route}, dropped) for route, dropped in route_sampling_filter.dropped.items()])
+
+
+def prediction_error_counter(route: str):
+    return REGISTRY.counter("schizophrenia_predict_errors_total", "Prediction requests that failed", route=route)
+
+
+def resolve_model_version(request: Request) -> Optional[str]:
+    """
+    Picks the registry version of the request from the pinning header or query parameter, or
+    from the A/B split. None serves the production model
+    """
+    pinned_version = (request.headers.get(SERVING_MODEL_VERSION_HEADER)
+                      or request.query_params.get(SERVING_MODEL_VERSION_QUERY_PARAM))
+    return model_router.resolve(pinned_version, request.headers.get(SERVING_MODEL_ROUTING_KEY_HEADER))
+
+
+def log_inferences(route: str, inputs, predictions, started_at: float, model_version: Optional[str] = None,
+                   probabilities=None, patient_ids: Optional[List[int]] = None) -> None:
+    """
+    Hands the predictions of a request to the inference log writer, registry versions are logged by
+    name and the production model by the version of its storage object
+    """
+    if inference_log_writer.enabled:
+        inference_log_writer.log(route, inputs, predictions, time.perf_counter() - started_at,
+                                 model_version=model_version or get_model_holder().model_version,
+                                 probabilities=probabilities, patient_ids=patient_ids)
+
+
+async def load_model_version(model_version: Optional[str]) -> Optional[JSONResponse]:
+    """
+    Warms the registry version off the event loop, returns the error response when it cannot be served
+    """
+    if model_version is None:
+        return None
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, get_model_registry().get_holder, model_version)
+    except ValueError as e:
+        return JSONResponse({"status": False, "error": f"{e}"}, status_code=400)
+    except KeyError as e:
+        return JSONResponse({"status": False, "error": e.args[0]}, status_code=404)
+    except Exception as e:
+        return JSONResponse({"status": False, "error": f"Model version {model_version} is not available: {e}"},
+                            status_code=503, headers={"Retry-After": "30"})
+    return None
+
+
+@app.middleware("http")
+async def admissionControl(request: Request, call_next):
+    if not admission_control_config.enabled or not admission_controller.is_admitted_route(request.url.path):
+        return await call_next(request)
+    try:
+        await admission_controller.acquire()
+    except AdmissionRejected as e:
+        logging.info(f"Shed {request.url.path} request: {e.reason}")
+        return JSONResponse({"status": False, "error": f"{e}"}, status_code=e.status_code,
+                            headers={"Retry-After": str(e.retry_after_seconds)})
+    try:
+        return await call_next(request)
+    finally:
+        admission_controller.release()
+
+
+@app.middleware("http")
+async def logRouteContext(request: Request, call_next):
+    token = log_route.set(request.url.path)
+    try:
+        return await call_next(request)
+    finally:
+        log_route.reset(token)
+
+
+@app.on_event("startup")
+async def preload_model():
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, get_model_holder().load)
+    except Exception as e:
+        logging.info(f"Model preload failed, it will be retried on the first prediction: {e}")
+    inference_executor.start()
+    inference_log_writer.start()
+    # under the launcher its parent polls the model and re-forks the workers on a new version
+    if model_watcher_config.enabled and not in_launcher_worker():
+        model_watcher.start()
+
+
+@app.on_event("startup")
+async def start_micro_batcher():
+    app.state.micro_batcher = None
+    micro_batch_config = MicroBatchConfig()
+    if micro_batch_config.enabled:
+        app.state.micro_batcher = MicroBatcher(predict_fn=SchizophreniaClassifier().predict_array,
+                                               micro_batch_config=micro_batch_config,
+                                               inference_executor=inference_executor)
+        await app.state.micro_batcher.start()
+
+
+@app.on_event("shutdown")
+async def stop_micro_batcher():
+    if app.state.micro_batcher is not None:
+        await app.state.micro_batcher.stop()
+    model_watcher.stop(timeout=5)
+    inference_log_writer.stop(timeout=inference_log_config.drain_timeout_seconds)
+    training_job_manager.shutdown()
+    scoring_job_manager.shutdown()
+    inference_executor.shutdown()
+
+
+@app.get("/health/live")
+async def liveRouteClient():
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readyRouteClient():
+    model_status = get_model_holder().status()
+    return JSONResponse(model_status, status_code=200 if model_status["ready"] else 503)
+
+
+@app.get("/stats/model")
+async def modelStatsRouteClient():
+    return {"model": get_model_holder().status(),
+            "watcher": {**model_watcher.stats(), "in_launcher": in_launcher_worker()}}
+
+
+@app.get("/stats/prediction-cache")
+async def predictionCacheStatsRouteClient():
+    return get_prediction_cache().stats()
+
+
+@app.get("/stats/micro-batcher")
+async def microBatcherStatsRouteClient():
+    if app.state.micro_batcher is None:
+        return {"enabled": False}
+    return app.state.micro_batcher.stats()
+
+
+@app.get("/stats/admission")
+async def admissionStatsRouteClient():
+    return admission_controller.stats()
+
+
+@app.get("/stats/patient-feature-store")
+async def patientFeatureStoreStatsRouteClient():
+    return get_patient_feature_store().stats()
+
+
+@app.get("/stats/inference-log")
+async def inferenceLogStatsRouteClient():
+    return inference_log_writer.stats()
+
+
+@app.get("/stats/model-registry")
+async def modelRegistryStatsRouteClient():
+    return {**get_model_registry().stats(), "ab_split": dict(model_router.splits)}
+
+
+@app.get("/stats/process")
+async def processStatsRouteClient():
+    return {"pid": os.getpid(), **read_process_memory(os.getpid())}
+
+
+@app.get("/metrics")
+async def metricsRouteClient():
+    """
+    Metrics of the worker answering the scrape. The pre-forked launcher runs SERVING_WORKERS
+    processes with a registry each, so counters and histograms cover one worker and successive
+    scrapes can land on different workers. Run a single worker where exact totals are needed
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/", tags=["authentication"],response_class=HTMLResponse)
 async def index(request: Request):
 
@@ -64,24 +278,144 @@ async def index(request: Request):
             "schizophrenia.html",{"request": request, "context": "Rendering"})
 
 
-@app.get("/train")
+@app.api_route("/train", methods=["GET", "POST"])
 async def trainRouteClient():
     try:
-        train_pipeline = TrainPipeline()
+        job = await asyncio.get_running_loop().run_in_executor(None, training_job_manager.submit)
+        return JSONResponse(TrainingJobManager.to_dict(job), status_code=202)
+
+    except Exception as e:
+        return JSONResponse({"status": False, "error": f"Error Occurred! {e}"}, status_code=500)
+
+
+@app.get("/train/{job_id}")
+async def trainStatusRouteClient(job_id: str):
+    job = training_job_manager.get(job_id)
+    if job is None:
+        return JSONResponse({"status": False, "error": f"Unknown training job {job_id}"}, status_code=404)
+    return TrainingJobManager.to_dict(job)
+
+
+@app.delete("/train/{job_id}")
+async def trainCancelRouteClient(job_id: str):
+    job = await asyncio.get_running_loop().run_in_executor(None, training_job_manager.cancel, job_id)
+    if job is None:
+        return JSONResponse({"status": False, "error": f"Unknown training job {job_id}"}, status_code=404)
+    return TrainingJobManager.to_dict(job)
+
+
+SCORING_JOB_RAW_CONTENT_TYPES = {"text/csv": "csv", "application/vnd.apache.parquet": "parquet",
+                                 "application/x-parquet": "parquet"}
+SCORING_JOB_RESULT_MEDIA_TYPES = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+# request body blocks are collected up to this size before each write to the job input file
+SCORING_JOB_WRITE_BUFFER_BYTES = 1024 * 1024
+
+
+async def receive_scoring_job_body(request: Request, input_format: str):
+    """
+    Streams a raw CSV or Parquet request body into a new job without holding it in memory, the
+    file is opened and written in the default executor so disk writes do not block the event loop
+    """
+    loop = asyncio.get_running_loop()
+    job = await loop.run_in_executor(None, scoring_job_manager.create_job, input_format)
+    written = 0
+    try:
+        input_file = await loop.run_in_executor(None, open, scoring_job_manager.input_path(job), "wb")
+        try:
+            pending_blocks, pending_bytes = [], 0
+            async for block in request.stream():
+                written += len(block)
+                if written > scoring_job_manager.scoring_job_config.max_upload_bytes:
+                    raise ScoringUploadTooLarge(
+                        f"Upload exceeds limit of {scoring_job_manager.scoring_job_config.max_upload_bytes} bytes")
+                pending_blocks.append(block)
+                pending_bytes += len(block)
+                if pending_bytes >= SCORING_JOB_WRITE_BUFFER_BYTES:
+                    await loop.run_in_executor(None, input_file.write, b"".join(pending_blocks))
+                    pending_blocks, pending_bytes = [], 0
+            await loop.run_in_executor(None, input_file.write, b"".join(pending_blocks))
+        finally:
+            await loop.run_in_executor(None, input_file.close)
+    except BaseException:
+        await loop.run_in_executor(None, scoring_job_manager.discard, job)
+        raise
+    return await loop.run_in_executor(None, scoring_job_manager.submit, job)
 
-        train_pipeline.run_pipeline()
 
-        return Response("Training successful !!")
+@app.post("/jobs/scoring", status_code=202)
+async def scoringJobSubmitRouteClient(request: Request):
+    """
+    Accepts a multipart "file" upload, a raw text/csv or Parquet body, or a JSON reference
+    {"s3_key": ...} to a file under the input prefix of the configured input bucket and returns the job
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    loop = asyncio.get_running_loop()
+    try:
+        if content_type == "multipart/form-data":
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                return JSONResponse({"status": False, "error": "Multipart upload needs a \"file\" field"}, status_code=400)
+            job = await loop.run_in_executor(None, scoring_job_manager.submit_upload, upload.file, upload.filename)
+        elif content_type in SCORING_JOB_RAW_CONTENT_TYPES:
+            job = await receive_scoring_job_body(request, SCORING_JOB_RAW_CONTENT_TYPES[content_type])
+        elif content_type == "application/json":
+            reference = await request.json()
+            if not isinstance(reference, dict) or not isinstance(reference.get("s3_key"), str) or \
+                    not isinstance(reference.get("bucket_name", ""), str):
+                return JSONResponse({"status": False, "error": "JSON body needs a string \"s3_key\""}, status_code=400)
+            job = await loop.run_in_executor(None, scoring_job_manager.submit_reference,
+                                             reference.get("bucket_name"), reference["s3_key"])
+        else:
+            return JSONResponse({"status": False, "error": f"Unsupported content type {content_type!r}, send "
+                                                           "multipart/form-data, text/csv, Parquet or a JSON reference"},
+                                status_code=415)
+        return JSONResponse(ScoringJobManager.to_dict(job), status_code=202,
+                            headers={"Location": f"/jobs/scoring/{job.job_id}"})
 
+    except ScoringUploadTooLarge as e:
+        return JSONResponse({"status": False, "error": f"{e}"}, status_code=413)
+    except ValueError as e:
+        return JSONResponse({"status": False, "error": f"{e}"}, status_code=400)
     except Exception as e:
-        return Response(f"Error Occurred! {e}")
+        return JSONResponse({"status": False, "error": f"Error Occurred! {e}"}, status_code=500)
+
+
+@app.get("/jobs/scoring/{job_id}")
+async def scoringJobStatusRouteClient(job_id: str):
+    job = scoring_job_manager.get(job_id)
+    if job is None:
+        return JSONResponse({"status": False, "error": f"Unknown scoring job {job_id}"}, status_code=404)
+    return ScoringJobManager.to_dict(job)
+
+
+@app.get("/jobs/scoring/{job_id}/result")
+async def scoringJobResultRouteClient(job_id: str):
+    job = scoring_job_manager.get(job_id)
+    if job is None:
+        return JSONResponse({"status": False, "error": f"Unknown scoring job {job_id}"}, status_code=404)
+    if job.status != ScoringJobManager.SUCCEEDED:
+        return JSONResponse({"status": False, "error": f"Scoring job {job_id} is {job.status}"}, status_code=409,
+                            headers={"Retry-After": "5"} if job.status in ScoringJobManager.ACTIVE_STATUSES else None)
+    return FileResponse(scoring_job_manager.result_path(job), media_type=SCORING_JOB_RESULT_MEDIA_TYPES[job.input_format],
+                        filename=f"{job_id}-scored.{job.input_format}")
+
+
+@app.delete("/jobs/scoring/{job_id}")
+async def scoringJobCancelRouteClient(job_id: str):
+    job = await asyncio.get_running_loop().run_in_executor(None, scoring_job_manager.cancel, job_id)
+    if job is None:
+        return JSONResponse({"status": False, "error": f"Unknown scoring job {job_id}"}, status_code=404)
+    return ScoringJobManager.to_dict(job)
 
 
 @app.post("/predict")
 async def predictRouteClient(request: Request):
+    started_at = time.perf_counter()
     try:
         form_data = DataForm(request)
-        await form_data.get_schizophrenia_data()
+        with observe_seconds(predict_stage_histogram("form_parse")):
+            await form_data.get_schizophrenia_data()
         logging.info("In prediction pipeline")
         schizophrenia_data = SchizophreniaData(
                                 Disease_Duration = form_data.Disease_Duration,
@@ -95,26 +429,246 @@ async def predictRouteClient(request: Request):
                                 Medication_Adherence= form_data.Medication_Adherence
                                 )
                 
-        schizophrenia_df = schizophrenia_data.get_schizophrenia_input_data_frame()
+        if app.state.micro_batcher is not None:
+            value = await app.state.micro_batcher.predict(schizophrenia_data)
+        else:
+            with observe_seconds(predict_stage_histogram("input_build")):
+                schizophrenia_array = schizophrenia_data.get_schizophrenia_input_array()
 
-        model_predictor = SchizophreniaClassifier()
+            model_predictor = SchizophreniaClassifier()
 
-        value = model_predictor.predict(dataframe=schizophrenia_df)[0]
+            value = (await inference_executor.run(model_predictor.predict_array, schizophrenia_array))[0]
 
-        status = None
-        if value == 1:
-            status = "Schizophreniac"
-        else:
-            status = "Not Schizophreniac"
+        if inference_log_writer.enabled:
+            log_inferences("/predict", schizophrenia_data.get_schizophrenia_input_array(), [value], started_at)
 
-        return templates.TemplateResponse(
-            "schizophrenia.html",
-            {"request": request, "context": status},
-        )
+        status = PREDICTION_LABELS[1] if value == 1 else PREDICTION_LABELS[0]
+
+        with observe_seconds(predict_stage_histogram("render")):
+            return templates.TemplateResponse(
+                "schizophrenia.html",
+                {"request": request, "context": status},
+            )
         
     except Exception as e:
+        prediction_error_counter("/predict").inc()
         return {"status": False, "error": f"{e}"}
 
 
+@app.post("/predict/batch", response_model=SchizophreniaBatchResponse)
+async def predictBatchRouteClient(records: List[SchizophreniaRecord], response: Response,
+                                  model_version: Optional[str] = Depends(resolve_model_version)):
+    started_at = time.perf_counter()
+    if len(records) > PREDICTION_BATCH_MAX_RECORDS:
+        return JSONResponse(
+            {"status": False, "error": f"Batch size {len(records)} exceeds limit of {PREDICTION_BATCH_MAX_RECORDS} records"},
+            status_code=413,
+        )
+    try:
+        logging.info("In batch prediction pipeline")
+        if len(records) == 0:
+            return SchizophreniaBatchResponse(predictions=[])
+
+        error_response = await load_model_version(model_version)
+        if error_response is not None:
+            return error_response
+        response.headers[SERVING_MODEL_VERSION_HEADER] = model_version or "production"
+
+        with observe_seconds(predict_stage_histogram("input_build")):
+            schizophrenia_array = SchizophreniaBatchData(records=records).get_schizophrenia_input_array()
+
+        model_predictor = SchizophreniaClassifier(model_version=model_version)
+
+        predictions = await inference_executor.run(model_predictor.predict_array, schizophrenia_array)
+        log_inferences("/predict/batch", schizophrenia_array, predictions, started_at, model_version=model_version)
+
+        return SchizophreniaBatchResponse(predictions=[int(value) for value in predictions])
+
+    except Exception as e:
+        prediction_error_counter("/predict/batch").inc()
+        return JSONResponse({"status": False, "error": f"{e}"}, status_code=500)
+
+
+@app.post("/api/v1/predict", response_model=SchizophreniaPredictionResponse,
+          responses={503: {"description": "Model is not loaded"}, 500: {"description": "Prediction failed"},
+                     404: {"description": "Model version is not in the registry"}})
+async def predictApiRouteClient(record: SchizophreniaRecord, response: Response,
+                                model_version: Optional[str] = Depends(resolve_model_version)):
+    started_at = time.perf_counter()
+    model_holder = get_model_holder()
+    if model_version is None and not model_holder.is_ready and model_holder.state == model_holder.FAILED:
+        return JSONResponse({"status": False, "error": f"Model is not available: {model_holder.error}"},
+                            status_code=503, headers={"Retry-After": "30"})
+    error_response = await load_model_version(model_version)
+    if error_response is not None:
+        return error_response
+    response.headers[SERVING_MODEL_VERSION_HEADER] = model_version or "production"
+    try:
+        with observe_seconds(predict_stage_histogram("input_build")):
+            schizophrenia_array = SchizophreniaBatchData(records=[record]).get_schizophrenia_input_array()
+
+        model_predictor = SchizophreniaClassifier(model_version=model_version)
+
+        predictions, probabilities = await inference_executor.run(model_predictor.predict_with_probability,
+                                                                  schizophrenia_array)
+        log_inferences("/api/v1/predict", schizophrenia_array, predictions, started_at, model_version=model_version,
+                       probabilities=probabilities)
+        prediction = int(predictions[0])
+        return SchizophreniaPredictionResponse(prediction=prediction, label=PREDICTION_LABELS[prediction],
+                                               probability=float(probabilities[0]))
+
+    except Exception as e:
+        prediction_error_counter("/api/v1/predict").inc()
+        return JSONResponse({"status": False, "error": f"{e}"}, status_code=500)
+
+
+async def lookup_patient_features(patient_ids: List[int]):
+    """
+    Looks the features of the patients up off the event loop
+    Returns: The ids found, their feature array and the unavailable ids, or the error response
+    when the feature store can not be reached
+    """
+    try:
+        patient_features = await asyncio.get_running_loop().run_in_executor(
+            None, get_patient_feature_store().get_feature_array, patient_ids)
+        return patient_features, None
+    except Exception as e:
+        logging.info(f"Patient feature lookup failed: {e}")
+        return None, JSONResponse({"status": False, "error": f"Patient features are not available: {e}"},
+                                  status_code=503, headers={"Retry-After": "5"})
+
+
+@app.post("/api/v1/predict/patient", response_model=PatientPredictionResponse,
+          responses={404: {"description": "Patient is unknown or misses feature values"},
+                     503: {"description": "Feature store or model is not available"}})
+async def predictPatientRouteClient(patient_request: PatientPredictionRequest, response: Response,
+                                    model_version: Optional[str] = Depends(resolve_model_version)):
+    started_at = time.perf_counter()
+    error_response = await load_model_version(model_version)
+    if error_response is not None:
+        return error_response
+    response.headers[SERVING_MODEL_VERSION_HEADER] = model_version or "production"
+    patient_features, error_response = await lookup_patient_features([patient_request.patient_id])
+    if error_response is not None:
+        return error_response
+    found_ids, schizophrenia_array, _ = patient_features
+    if not found_ids:
+        return JSONResponse({"status": False, "error": f"No complete features for patient {patient_request.patient_id}"},
+                            status_code=404)
+    try:
+        model_predictor = SchizophreniaClassifier(model_version=model_version)
+
+        predictions, probabilities = await inference_executor.run(model_predictor.predict_with_probability,
+                                                                  schizophrenia_array)
+        log_inferences("/api/v1/predict/patient", schizophrenia_array, predictions, started_at,
+                       model_version=model_version, probabilities=probabilities, patient_ids=found_ids)
+        prediction = int(predictions[0])
+        return PatientPredictionResponse(patient_id=found_ids[0], prediction=prediction,
+                                         label=PREDICTION_LABELS[prediction], probability=float(probabilities[0]))
+
+    except Exception as e:
+        prediction_error_counter("/api/v1/predict/patient").inc()
+        return JSONResponse({"status": False, "error": f"{e}"}, status_code=500)
+
+
+@app.post("/api/v1/predict/patients", response_model=PatientBatchPredictionResponse,
+          responses={413: {"description": "Too many patient ids"},
+                     503: {"description": "Feature store or model is not available"}})
+async def predictPatientsRouteClient(patient_request: PatientBatchPredictionRequest, response: Response,
+                                     model_version: Optional[str] = Depends(resolve_model_version)):
+    started_at = time.perf_counter()
+    if len(patient_request.patient_ids) > PREDICTION_BATCH_MAX_RECORDS:
+        return JSONResponse(
+            {"status": False, "error": f"Batch size {len(patient_request.patient_ids)} exceeds limit of "
+                                       f"{PREDICTION_BATCH_MAX_RECORDS} patient ids"},
+            status_code=413,
+        )
+    error_response = await load_model_version(model_version)
+    if error_response is not None:
+        return error_response
+    response.headers[SERVING_MODEL_VERSION_HEADER] = model_version or "production"
+    patient_features, error_response = await lookup_patient_features(patient_request.patient_ids)
+    if error_response is not None:
+        return error_response
+    found_ids, schizophrenia_array, unavailable_ids = patient_features
+    try:
+        predictions, probabilities = [], []
+        if found_ids:
+            model_predictor = SchizophreniaClassifier(model_version=model_version)
+            predictions, probabilities = await inference_executor.run(model_predictor.predict_with_probability,
+                                                                      schizophrenia_array)
+            log_inferences("/api/v1/predict/patients", schizophrenia_array, predictions, started_at,
+                           model_version=model_version, probabilities=probabilities, patient_ids=found_ids)
+
+        return PatientBatchPredictionResponse(
+            predictions=[PatientPredictionResponse(patient_id=patient_id, prediction=int(prediction),
+                                                   label=PREDICTION_LABELS[int(prediction)], probability=float(probability))
+                         for patient_id, prediction, probability in zip(found_ids, predictions, probabilities)],
+            unavailable=unavailable_ids,
+        )
+
+    except Exception as e:
+        prediction_error_counter("/api/v1/predict/patients").inc()
+        return JSONResponse({"status": False, "error": f"{e}"}, status_code=500)
+
+
+def columnar_body_too_large() -> JSONResponse:
+    return JSONResponse(
+        {"status": False, "error": f"Body exceeds limit of {PREDICTION_COLUMNAR_BATCH_MAX_BYTES} bytes"},
+        status_code=413,
+    )
+
+
+@app.post("/predict/columnar")
+async def predictColumnarRouteClient(request: Request, model_version: Optional[str] = Depends(resolve_model_version)):
+    started_at = time.perf_counter()
+    content_type = request.headers.get("content-type", "")
+    if not codec_available(content_type):
+        return JSONResponse(
+            {"status": False, "error": f"Unsupported content type {content_type!r}, send "
+                                       "application/vnd.apache.arrow.stream or application/x-msgpack"},
+            status_code=415,
+        )
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > PREDICTION_COLUMNAR_BATCH_MAX_BYTES:
+        return columnar_body_too_large()
+    try:
+        blocks = []
+        received = 0
+        async for block in request.stream():
+            received += len(block)
+            if received > PREDICTION_COLUMNAR_BATCH_MAX_BYTES:
+                return columnar_body_too_large()
+            blocks.append(block)
+        body = b"".join(blocks)
+        with observe_seconds(predict_stage_histogram("input_build")):
+            schizophrenia_array = await asyncio.get_running_loop().run_in_executor(
+                None, decode_columnar, content_type, body)
+    except ValueError as e:
+        return JSONResponse({"status": False, "error": f"Invalid payload: {e}"}, status_code=400)
+    if len(schizophrenia_array) > PREDICTION_COLUMNAR_BATCH_MAX_RECORDS:
+        return JSONResponse(
+            {"status": False, "error": f"Batch size {len(schizophrenia_array)} exceeds limit of "
+                                       f"{PREDICTION_COLUMNAR_BATCH_MAX_RECORDS} records"},
+            status_code=413,
+        )
+    error_response = await load_model_version(model_version)
+    if error_response is not None:
+        return error_response
+    try:
+        logging.info(f"In columnar batch prediction pipeline with {len(schizophrenia_array)} records")
+        model_predictor = SchizophreniaClassifier(model_version=model_version)
+
+        predictions = await inference_executor.run(model_predictor.predict_array, schizophrenia_array, use_cache=False)
+        log_inferences("/predict/columnar", schizophrenia_array, predictions, started_at, model_version=model_version)
+
+        return Response(encode_columnar(content_type, predictions), media_type=content_type,
+                        headers={SERVING_MODEL_VERSION_HEADER: model_version or "production"})
+
+    except Exception as e:
+        prediction_error_counter("/predict/columnar").inc()
+        return JSONResponse({"status": False, "error": f"{e}"}, status_code=500)
+
+
 if __name__ == "__main__":
     app_run(app, host=APP_HOST, port=APP_PORT)     
\ No newline at end of file
@@ -0,0 +1,299 @@
+"""
+End to end load test of the serving app.
+
+Starts the production launcher against a filesystem model store preloaded with a trained
+model (MODEL_STORAGE_BACKEND=local, no AWS needed), drives the form and JSON prediction
+routes at a fixed concurrency and writes throughput and latency percentiles to a JSON file
+so that releases can be compared run against run.
+
+    python benchmarks/load_test.py --workers 1 2 4 --concurrency 32 --duration 20
+    python benchmarks/load_test.py --url http://localhost:8080 --scenarios predict_batch
+
+Without --model-file a random forest is fitted on synthetic rows with the preprocessor of
+the data transformation stage. The load generator is one asyncio process, give it cores of
+its own when measuring many workers.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from schizophrenia_prediction.constants import (MODEL_BUCKET_NAME, MODEL_FILE_NAME, NATIVE_MODEL_FILE_NAME,
+                                                PREDICTION_FEATURE_COLUMNS, RANDOM_STATE)
+
+# value ranges of the synthetic patients, integer features drawn uniformly from [low, high)
+FEATURE_RANGES: Dict[str, tuple] = {
+    "Disease_Duration": (0, 40),
+    "Hospitalizations": (0, 10),
+    "Family_History": (0, 2),
+    "Substance_Use": (0, 2),
+    "Suicide_Attempt": (0, 2),
+    "Positive_Symptom_Score": (0, 100),
+    "Negative_Symptom_Score": (0, 100),
+    "GAF_Score": (0, 100),
+    "Medication_Adherence": (0, 3),
+}
+
+
+def synthetic_rows(rng: np.random.Generator, n_rows: int) -> pd.DataFrame:
+    return pd.DataFrame({column: rng.integers(*FEATURE_RANGES[column], size=n_rows)
+                         for column in PREDICTION_FEATURE_COLUMNS})
+
+
+def build_synthetic_model(n_rows: int = 5000):
+    from sklearn.ensemble import RandomForestClassifier
+
+    from schizophrenia_prediction.components.data_transformation import DataTransformation
+    from schizophrenia_prediction.entity.estimator import SchizophreniaPredModel
+
+    rng = np.random.default_rng(RANDOM_STATE)
+    features = synthetic_rows(rng, n_rows)
+    target = ((features["Positive_Symptom_Score"] + 30 * features["Family_History"]
+               - 0.3 * features["GAF_Score"] + rng.normal(0, 15, n_rows)) > 40).astype(int)
+    # DataTransformation reads config/schema.yaml relative to the working directory
+    working_dir = os.getcwd()
+    os.chdir(ROOT_DIR)
+    try:
+        preprocessor = DataTransformation(None, None, None).get_data_transformer_object()
+    finally:
+        os.chdir(working_dir)
+    transformed = preprocessor.fit_transform(features)
+    classifier = RandomForestClassifier(n_estimators=100, max_depth=10, max_features="sqrt",
+                                        random_state=RANDOM_STATE).fit(transformed, target)
+    model = SchizophreniaPredModel(preprocessing_object=preprocessor, trained_model_object=classifier)
+    model.compile_trained_model(validation_array=transformed)
+    return model
+
+
+def prepare_model_store(store_dir: str, model_file: Optional[str] = None) -> None:
+    """
+    Puts the model into the bucket directory the local storage backend serves from
+    """
+    bucket_dir = os.path.join(store_dir, MODEL_BUCKET_NAME)
+    os.makedirs(bucket_dir, exist_ok=True)
+    if model_file is not None:
+        target = NATIVE_MODEL_FILE_NAME if model_file.endswith(".szm") else MODEL_FILE_NAME
+        shutil.copyfile(model_file, os.path.join(bucket_dir, target))
+        return
+
+    from schizophrenia_prediction.entity.native_artifact import save_native_model
+    from schizophrenia_prediction.utils.main_utils import save_object
+
+    model = build_synthetic_model()
+    save_object(os.path.join(bucket_dir, MODEL_FILE_NAME), model)
+    if model.compiled_model is not None:
+        save_native_model(model, os.path.join(bucket_dir, NATIVE_MODEL_FILE_NAME), metadata={"synthetic": True})
+
+
+def start_server(store_dir: str, port: int, workers: int, extra_env: Dict[str, str]) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "MODEL_STORAGE_BACKEND": "local",
+        "MODEL_STORAGE_LOCAL_DIR": store_dir,
+        "MODEL_CACHE_DIR": os.path.join(store_dir, ".model_cache"),
+        "SERVING_MODEL_WATCH_ENABLED": "false",
+    })
+    env.update(extra_env)
+    return subprocess.Popen(
+        [sys.executable, "-m", "schizophrenia_prediction.serving.launcher", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers)],
+        cwd=ROOT_DIR, env=env,
+    )
+
+
+def wait_until_ready(url: str, timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/health/ready", timeout=2.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"Server at {url} did not become ready within {timeout} seconds")
+
+
+def stop_server(server: subprocess.Popen) -> None:
+    server.terminate()
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+def predict_form_request(rng: np.random.Generator, batch_size: int) -> dict:
+    row = synthetic_rows(rng, 1).iloc[0]
+    return {"method": "POST", "url": "/predict", "data": {column: str(row[column]) for column in row.index}}
+
+
+def predict_batch_request(rng: np.random.Generator, batch_size: int) -> dict:
+    return {"method": "POST", "url": "/predict/batch",
+            "json": synthetic_rows(rng, batch_size).to_dict(orient="records")}
+
+
+SCENARIOS: Dict[str, tuple] = {
+    # name -> (request factory, rows scored per request is the batch size)
+    "predict_form": (predict_form_request, False),
+    "predict_batch": (predict_batch_request, True),
+}
+
+
+def percentiles(latencies: List[float]) -> dict:
+    if not latencies:
+        return {"p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+    latencies_ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99),
+            "mean": float(latencies_ms.mean()), "max": float(latencies_ms.max())}
+
+
+def is_failed_response(response: httpx.Response) -> bool:
+    """
+    The form /predict route answers 200 with {"status": false, ...} when the prediction failed,
+    so a 200 only counts as a success when its body is not such an error
+    """
+    if response.status_code != 200:
+        return True
+    if not response.headers.get("content-type", "").startswith("application/json"):
+        return False
+    try:
+        payload = response.json()
+    except ValueError:
+        return True
+    return isinstance(payload, dict) and payload.get("status") is False
+
+
+async def run_scenario(url: str, request_factory: Callable, batch_size: int, concurrency: int,
+                       duration: float, warmup: float, seed: int) -> dict:
+    """
+    Runs concurrency closed loop clients for warmup + duration seconds and keeps the requests
+    that started after the warmup. Latency percentiles cover the successful requests only
+    """
+    latencies: List[float] = []
+    requests = 0
+    status_codes: Dict[int, int] = {}
+    errors = 0
+    start = time.perf_counter()
+    measure_from = start + warmup
+    deadline = measure_from + duration
+
+    async def client_loop(client: httpx.AsyncClient, client_index: int) -> None:
+        nonlocal errors, requests
+        rng = np.random.default_rng(seed + client_index)
+        while True:
+            request = request_factory(rng, batch_size)
+            sent_at = time.perf_counter()
+            if sent_at >= deadline:
+                return
+            try:
+                response = await client.request(**request)
+                status_code, failed = response.status_code, is_failed_response(response)
+            except httpx.HTTPError:
+                status_code, failed = 0, True
+            if sent_at < measure_from:
+                continue
+            requests += 1
+            status_codes[status_code] = status_codes.get(status_code, 0) + 1
+            if failed:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - sent_at)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60.0) as client:
+        await asyncio.gather(*(client_loop(client, index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - measure_from
+    return {"requests": requests, "errors": errors, "status_codes": status_codes,
+            "elapsed_seconds": elapsed, "throughput_rps": len(latencies) / elapsed if elapsed > 0 else 0.0,
+            "latency_ms": percentiles(latencies)}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the prediction routes and record latency percentiles")
+    parser.add_argument("--url", help="Target an already running server instead of starting the launcher")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1], help="Worker counts to start, one run each")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15.0, help="Measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds before each scenario")
+    parser.add_argument("--batch-size", type=int, default=100, help="Rows per /predict/batch request")
+    parser.add_argument("--model-file", help="Model .pkl or native .szm to serve, a synthetic model when omitted")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--env", nargs="*", default=[], help="Extra KEY=VALUE settings for the server")
+    parser.add_argument("--output", default=os.path.join(ROOT_DIR, "benchmarks", "results",
+                                                         f"load_test_{datetime.now():%Y%m%d_%H%M%S}.json"))
+    args = parser.parse_args()
+
+    extra_env = dict(item.split("=", 1) for item in args.env)
+    result = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "runs": [],
+    }
+
+    store_dir = None
+    if args.url is None:
+        store_dir = tempfile.mkdtemp(prefix="load-test-store-")
+        prepare_model_store(store_dir, model_file=args.model_file)
+
+    try:
+        for workers in ([None] if args.url else args.workers):
+            url = args.url or f"http://127.0.0.1:{args.port}"
+            server = None if args.url else start_server(store_dir, args.port, workers, extra_env)
+            try:
+                wait_until_ready(url)
+                for scenario in args.scenarios:
+                    request_factory, is_batch = SCENARIOS[scenario]
+                    run = asyncio.run(run_scenario(url, request_factory, args.batch_size, args.concurrency,
+                                                   args.duration, args.warmup, seed=RANDOM_STATE))
+                    rows_per_request = args.batch_size if is_batch else 1
+                    run.update({"scenario": scenario, "workers": workers,
+                                "rows_per_second": run["throughput_rps"] * rows_per_request})
+                    if workers:
+                        run["rows_per_second_per_worker"] = run["rows_per_second"] / workers
+                    result["runs"].append(run)
+                    latency = run["latency_ms"]
+                    print(f"workers={workers} {scenario}: {run['throughput_rps']:.1f} req/s, "
+                          f"{run['rows_per_second']:.0f} rows/s, p50={latency['p50'] or 0:.2f}ms "
+                          f"p95={latency['p95'] or 0:.2f}ms p99={latency['p99'] or 0:.2f}ms, errors={run['errors']}")
+            finally:
+                if server is not None:
+                    stop_server(server)
+    finally:
+        if store_dir is not None:
+            shutil.rmtree(store_dir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as result_file:
+        json.dump(result, result_file, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -30,6 +30,25 @@ class SimpleStorageService:
         
         
 
+    def get_object_version(self, bucket_name: str, s3_key: str) -> dict:
+        """
+        Method Name :   get_object_version
+        Description :   This method reads the ETag, VersionId and LastModified of the s3_key object
+                        with a HEAD request, without downloading the object
+
+        Output      :   dict with etag, version_id and last_modified of the object
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            response = self.s3_client.head_object(Bucket=bucket_name, Key=s3_key)
+            return {
+                "etag": response.get("ETag", "").strip('"'),
+                "version_id": response.get("VersionId"),
+                "last_modified": str(response.get("LastModified")),
+            }
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
     @staticmethod
     def read_object(object_name: str, decode: bool = True, make_readable: bool = False) -> Union[StringIO, str]:
         """
@@ -105,6 +124,26 @@ class SimpleStorageService:
         except Exception as e:
             raise SchizophreniaPredException(e, sys) from e
 
+    def read_model_bytes(self, model_name: str, bucket_name: str, model_dir: str = None) -> bytes:
+        """
+        Method Name :   read_model_bytes
+        Description :   This method downloads the model_name object from bucket_name bucket as raw bytes
+
+        Output      :   Serialized model bytes
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the read_model_bytes method of S3Operations class")
+
+        try:
+            model_file = model_name if model_dir is None else model_dir + "/" + model_name
+            file_object = self.get_file_object(model_file, bucket_name)
+            model_bytes = self.read_object(file_object, decode=False)
+            logging.info("Exited the read_model_bytes method of S3Operations class")
+            return model_bytes
+
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
     def load_model(self, model_name: str, bucket_name: str, model_dir: str = None) -> object:
         """
         Method Name :   load_model
@@ -197,6 +236,42 @@ class SimpleStorageService:
         except Exception as e:
             raise SchizophreniaPredException(e, sys) from e
 
+    def download_file(self, bucket_name: str, s3_key: str, to_filename: str) -> None:
+        """
+        Method Name :   download_file
+        Description :   This method streams the s3_key object of bucket_name bucket into the to_filename local file
+
+        Output      :   Object is written to to_filename
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the download_file method of S3Operations class")
+
+        try:
+            self.s3_client.download_file(bucket_name, s3_key, to_filename)
+            logging.info(f"Downloaded {s3_key} from {bucket_name} bucket to {to_filename}")
+            logging.info("Exited the download_file method of S3Operations class")
+
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+    def delete_object(self, bucket_name: str, s3_key: str) -> None:
+        """
+        Method Name :   delete_object
+        Description :   This method deletes the s3_key object of bucket_name bucket, a missing key is not an error
+
+        Output      :   Object is removed from the s3 bucket
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the delete_object method of S3Operations class")
+
+        try:
+            self.s3_client.delete_object(Bucket=bucket_name, Key=s3_key)
+            logging.info(f"Deleted {s3_key} from {bucket_name} bucket")
+            logging.info("Exited the delete_object method of S3Operations class")
+
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
     def upload_df_as_csv(self,data_frame: DataFrame,local_filename: str, bucket_filename: str,bucket_name: str,) -> None:
         """
         Method Name :   upload_df_as_csv
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from typing import Optional
+
+from schizophrenia_prediction.entity.config_entity import LocalModelCacheConfig
+from schizophrenia_prediction.exception import SchizophreniaPredException
+from schizophrenia_prediction.logger import logging
+
+
+class LocalModelCache:
+    """
+    This class keeps downloaded model objects on local disk keyed by bucket, key and ETag/VersionId,
+    so that worker starts, container restarts and scale out events read the model from disk
+    instead of downloading it from s3 again
+    """
+
+    DATA_SUFFIX: str = ".bin"
+    META_SUFFIX: str = ".json"
+
+    def __init__(self, local_model_cache_config: LocalModelCacheConfig = LocalModelCacheConfig()):
+        """
+        :param local_model_cache_config: Configuration with the cache directory and its size bound
+        """
+        self.local_model_cache_config = local_model_cache_config
+        self.cache_dir = local_model_cache_config.cache_dir
+
+    @staticmethod
+    def _entry_name(bucket_name: str, s3_key: str, model_version: str) -> str:
+        return hashlib.sha256(f"{bucket_name}/{s3_key}/{model_version}".encode()).hexdigest()
+
+    def _atomic_write(self, file_path: str, content: bytes) -> None:
+        """
+        Writes to a temporary file of the cache directory and renames it over file_path,
+        readers never see a partially written entry
+        """
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".tmp-")
+        try:
+            with os.fdopen(file_descriptor, "wb") as temp_file:
+                temp_file.write(content)
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+            os.replace(temp_path, file_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @staticmethod
+    def _file_sha256(file_path: str) -> str:
+        sha256 = hashlib.sha256()
+        with open(file_path, "rb") as data_file:
+            for block in iter(lambda: data_file.read(1024 * 1024), b""):
+                sha256.update(block)
+        return sha256.hexdigest()
+
+    def get_path(self, bucket_name: str, s3_key: str, model_version: str) -> Optional[str]:
+        """
+        Method Name :   get_path
+        Description :   This method returns the path of the cached model file after checking its sha256,
+                        streamed in blocks, against the one recorded when the entry was written.
+                        Corrupt entries are deleted
+
+        Output      :   Path of the entry or None when the entry is missing or corrupt
+        On Failure  :   Write an exception log and return None, the caller downloads from s3
+        """
+        entry_name = LocalModelCache._entry_name(bucket_name, s3_key, model_version)
+        data_path = os.path.join(self.cache_dir, entry_name + LocalModelCache.DATA_SUFFIX)
+        meta_path = os.path.join(self.cache_dir, entry_name + LocalModelCache.META_SUFFIX)
+        try:
+            if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+                return None
+            with open(meta_path, "r") as meta_file:
+                meta = json.load(meta_file)
+            if LocalModelCache._file_sha256(data_path) != meta["sha256"]:
+                logging.info(f"Local model cache entry {entry_name} failed its content hash check, removing it")
+                self._remove_entry(entry_name)
+                return None
+            os.utime(data_path)
+            logging.info(f"Read model {bucket_name}/{s3_key} version {model_version} from local model cache")
+            return data_path
+        except Exception as e:
+            logging.info(f"Could not read local model cache entry {entry_name}: {e}")
+            return None
+
+    def get(self, bucket_name: str, s3_key: str, model_version: str) -> Optional[bytes]:
+        """
+        Returns the cached model bytes, None when the entry is missing or corrupt
+        """
+        data_path = self.get_path(bucket_name, s3_key, model_version)
+        if data_path is None:
+            return None
+        try:
+            with open(data_path, "rb") as data_file:
+                return data_file.read()
+        except Exception as e:
+            logging.info(f"Could not read local model cache entry {data_path}: {e}")
+            return None
+
+    def put(self, bucket_name: str, s3_key: str, model_version: str, content: bytes) -> None:
+        """
+        Method Name :   put
+        Description :   This method stores model bytes with their sha256 and evicts the least
+                        recently used entries beyond max_size_bytes
+
+        Output      :   Entry written to the cache directory
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            entry_name = LocalModelCache._entry_name(bucket_name, s3_key, model_version)
+            meta = {
+                "bucket_name": bucket_name,
+                "s3_key": s3_key,
+                "model_version": model_version,
+                "sha256": hashlib.sha256(content).hexdigest(),
+                "size": len(content),
+            }
+            self._atomic_write(os.path.join(self.cache_dir, entry_name + LocalModelCache.DATA_SUFFIX), content)
+            self._atomic_write(os.path.join(self.cache_dir, entry_name + LocalModelCache.META_SUFFIX),
+                               json.dumps(meta).encode())
+            logging.info(f"Wrote model {bucket_name}/{s3_key} version {model_version} to local model cache")
+            self.evict()
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+    def _remove_entry(self, entry_name: str) -> None:
+        for suffix in (LocalModelCache.DATA_SUFFIX, LocalModelCache.META_SUFFIX):
+            file_path = os.path.join(self.cache_dir, entry_name + suffix)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def evict(self) -> None:
+        """
+        Removes least recently read entries until the cache fits into max_size_bytes
+        """
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.endswith(LocalModelCache.DATA_SUFFIX):
+                stat = os.stat(os.path.join(self.cache_dir, file_name))
+                entries.append((stat.st_mtime, stat.st_size, file_name[: -len(LocalModelCache.DATA_SUFFIX)]))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry_name in sorted(entries):
+            if total_size <= self.local_model_cache_config.max_size_bytes:
+                break
+            self._remove_entry(entry_name)
+            total_size -= size
+            logging.info(f"Evicted local model cache entry {entry_name}")
@@ -0,0 +1,133 @@
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+
+from schizophrenia_prediction.constants import MODEL_STORAGE_BACKEND, MODEL_STORAGE_LOCAL_DIR
+from schizophrenia_prediction.exception import SchizophreniaPredException
+from schizophrenia_prediction.logger import logging
+
+
+class LocalStorageService:
+    """
+    This class is a filesystem backed stand-in of SimpleStorageService for the model objects.
+    Every bucket is a directory under root_dir, so serving and the model pusher can run
+    without AWS, e.g. for load tests and local development
+    """
+
+    def __init__(self, root_dir: str = MODEL_STORAGE_LOCAL_DIR):
+        """
+        :param root_dir: Directory holding one sub directory per bucket
+        """
+        self.root_dir = root_dir
+
+    def _object_path(self, bucket_name: str, s3_key: str) -> str:
+        bucket_dir = os.path.realpath(os.path.join(self.root_dir, bucket_name))
+        object_path = os.path.realpath(os.path.join(bucket_dir, *s3_key.split("/")))
+        # bucket names and keys come from callers, neither may resolve outside of root_dir
+        if os.path.dirname(bucket_dir) != os.path.realpath(self.root_dir) or \
+                os.path.commonpath([bucket_dir, object_path]) != bucket_dir:
+            raise ValueError(f"Object {bucket_name}/{s3_key} resolves outside of the storage root {self.root_dir}")
+        return object_path
+
+    def s3_key_path_available(self, bucket_name, s3_key) -> bool:
+        try:
+            object_path = self._object_path(bucket_name, s3_key)
+            if os.path.exists(object_path):
+                return True
+            parent_dir, prefix = os.path.split(object_path)
+            return os.path.isdir(parent_dir) and any(name.startswith(prefix) for name in os.listdir(parent_dir))
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys)
+
+    def get_object_version(self, bucket_name: str, s3_key: str) -> dict:
+        """
+        Method Name :   get_object_version
+        Description :   This method builds an ETag like token from the modification time and size of
+                        the object file. Uploads replace the file atomically, so every upload changes it
+
+        Output      :   dict with etag, version_id and last_modified of the object
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            stat = os.stat(self._object_path(bucket_name, s3_key))
+            return {
+                "etag": f"{stat.st_mtime_ns:x}-{stat.st_size:x}",
+                "version_id": None,
+                "last_modified": str(datetime.fromtimestamp(stat.st_mtime)),
+            }
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+    def read_model_bytes(self, model_name: str, bucket_name: str, model_dir: str = None) -> bytes:
+        logging.info("Entered the read_model_bytes method of LocalStorageService class")
+        try:
+            model_file = model_name if model_dir is None else model_dir + "/" + model_name
+            with open(self._object_path(bucket_name, model_file), "rb") as object_file:
+                model_bytes = object_file.read()
+            logging.info("Exited the read_model_bytes method of LocalStorageService class")
+            return model_bytes
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+    def load_model(self, model_name: str, bucket_name: str, model_dir: str = None) -> object:
+        try:
+            return pickle.loads(self.read_model_bytes(model_name, bucket_name, model_dir=model_dir))
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+    def upload_file(self, from_filename: str, to_filename: str, bucket_name: str, remove: bool = True):
+        """
+        Method Name :   upload_file
+        Description :   This method copies from_filename into the bucket directory through a temporary
+                        file renamed over the target, readers never see a partial object
+
+        Output      :   File is stored under the bucket directory
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the upload_file method of LocalStorageService class")
+        try:
+            object_path = self._object_path(bucket_name, to_filename)
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            file_descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(object_path), prefix=".tmp-")
+            os.close(file_descriptor)
+            shutil.copyfile(from_filename, temp_path)
+            os.replace(temp_path, object_path)
+            logging.info(f"Uploaded {from_filename} file to {to_filename} file in {bucket_name} local bucket")
+            if remove is True:
+                os.remove(from_filename)
+            logging.info("Exited the upload_file method of LocalStorageService class")
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+    def download_file(self, bucket_name: str, s3_key: str, to_filename: str) -> None:
+        try:
+            shutil.copyfile(self._object_path(bucket_name, s3_key), to_filename)
+            logging.info(f"Downloaded {s3_key} from {bucket_name} local bucket to {to_filename}")
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+    def delete_object(self, bucket_name: str, s3_key: str) -> None:
+        try:
+            object_path = self._object_path(bucket_name, s3_key)
+            if os.path.exists(object_path):
+                os.remove(object_path)
+                logging.info(f"Deleted {s3_key} from {bucket_name} local bucket")
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+
+def get_storage_service():
+    """
+    Returns the model storage backend selected with MODEL_STORAGE_BACKEND, SimpleStorageService
+    for "s3" and LocalStorageService for "local"
+    """
+    if MODEL_STORAGE_BACKEND == "local":
+        return LocalStorageService()
+    if MODEL_STORAGE_BACKEND != "s3":
+        raise ValueError(f"Unknown model storage backend: {MODEL_STORAGE_BACKEND}")
+    from schizophrenia_prediction.cloud_storage.aws_storage import SimpleStorageService
+
+    return SimpleStorageService()
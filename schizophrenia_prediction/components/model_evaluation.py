@@ -110,6 +110,7 @@ class ModelEvaluation:
                 is_model_accepted=evaluate_model_response.is_model_accepted,
                 s3_model_path=s3_model_path,
                 trained_model_path=self.model_trainer_artifact.trained_model_file_path,
+                trained_native_model_path=self.model_trainer_artifact.trained_native_model_file_path,
                 changed_accuracy=evaluate_model_response.difference)
 
             logging.info(f"Model evaluation artifact: {model_evaluation_artifact}")
@@ -1,6 +1,6 @@
 import sys
 
-from schizophrenia_prediction.cloud_storage.aws_storage import SimpleStorageService
+from schizophrenia_prediction.cloud_storage.local_storage import get_storage_service
 from schizophrenia_prediction.exception import SchizophreniaPredException
 from schizophrenia_prediction.logger import logging
 from schizophrenia_prediction.entity.artifact_entity import ModelPusherArtifact, ModelEvaluationArtifact
@@ -15,7 +15,7 @@ class ModelPusher:
         :param model_evaluation_artifact: Output reference of data evaluation artifact stage
         :param model_pusher_config: Configuration for model pusher
         """
-        self.s3 = SimpleStorageService()
+        self.s3 = get_storage_service()
         self.model_evaluation_artifact = model_evaluation_artifact
         self.model_pusher_config = model_pusher_config
         self.schizophrenia_estimator = SchizophreniaEstimator(bucket_name=model_pusher_config.bucket_name,
@@ -36,9 +36,34 @@ class ModelPusher:
 
             self.schizophrenia_estimator.save_model(from_file=self.model_evaluation_artifact.trained_model_path)
 
+            # serving prefers the native artifact, a stale one must not outlive the model it was built from
+            trained_native_model_path = self.model_evaluation_artifact.trained_native_model_path
+            if trained_native_model_path is not None:
+                self.s3.upload_file(trained_native_model_path,
+                                    to_filename=self.model_pusher_config.s3_native_model_key_path,
+                                    bucket_name=self.model_pusher_config.bucket_name,
+                                    remove=False)
+            else:
+                self.s3.delete_object(bucket_name=self.model_pusher_config.bucket_name,
+                                      s3_key=self.model_pusher_config.s3_native_model_key_path)
+
+
+            # immutable copies under model-registry/<version>/ that serving can pin requests to
+            registry_dir = f"{self.model_pusher_config.model_registry_prefix}/{self.model_pusher_config.model_version}"
+            self.s3.upload_file(self.model_evaluation_artifact.trained_model_path,
+                                to_filename=f"{registry_dir}/{self.model_pusher_config.s3_model_key_path}",
+                                bucket_name=self.model_pusher_config.bucket_name,
+                                remove=False)
+            if trained_native_model_path is not None:
+                self.s3.upload_file(trained_native_model_path,
+                                    to_filename=f"{registry_dir}/{self.model_pusher_config.s3_native_model_key_path}",
+                                    bucket_name=self.model_pusher_config.bucket_name,
+                                    remove=False)
+            logging.info(f"Pushed model version {self.model_pusher_config.model_version} to {registry_dir}")
 
             model_pusher_artifact = ModelPusherArtifact(bucket_name=self.model_pusher_config.bucket_name,
-                                                        s3_model_path=self.model_pusher_config.s3_model_key_path)
+                                                        s3_model_path=self.model_pusher_config.s3_model_key_path,
+                                                        model_version=self.model_pusher_config.model_version)
 
             logging.info("Uploaded artifacts folder to s3 bucket")
             logging.info(f"Model pusher artifact: [{model_pusher_artifact}]")
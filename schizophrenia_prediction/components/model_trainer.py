@@ -12,6 +12,7 @@ from schizophrenia_prediction.utils.main_utils import load_numpy_array_data, loa
 from schizophrenia_prediction.entity.config_entity import ModelTrainerConfig
 from schizophrenia_prediction.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact, ClassificationMetricArtifact
 from schizophrenia_prediction.entity.estimator import SchizophreniaPredModel
+from schizophrenia_prediction.entity.native_artifact import save_native_model
 
 class ModelTrainer:
     def __init__(self, data_transformation_artifact: DataTransformationArtifact,
@@ -81,12 +82,28 @@ class ModelTrainer:
             schizophrenia_model = SchizophreniaPredModel(preprocessing_object=preprocessing_obj,
                                        trained_model_object=best_model_detail.best_model)
             logging.info("Created schizophrenia model object with preprocessor and model")
+            validation_arr = np.vstack([train_arr[:, :-1], test_arr[:, :-1]])
+            if self.model_trainer_config.compile_ensemble:
+                if schizophrenia_model.compile_trained_model(validation_array=validation_arr):
+                    logging.info(f"Stored compiled evaluator {schizophrenia_model.compiled_model} with the model")
+            if self.model_trainer_config.export_onnx:
+                if schizophrenia_model.export_onnx_model(validation_array=validation_arr):
+                    logging.info(f"Stored ONNX graph of {len(schizophrenia_model.onnx_model)} bytes with the model")
             logging.info("Created best model file path.")
             save_object(self.model_trainer_config.trained_model_file_path, schizophrenia_model)
 
+            trained_native_model_file_path = None
+            if schizophrenia_model.compiled_model is not None and schizophrenia_model.compile_preprocessor():
+                save_native_model(schizophrenia_model, self.model_trainer_config.trained_native_model_file_path,
+                                  metadata={"best_score": float(best_model_detail.best_score)})
+                trained_native_model_file_path = self.model_trainer_config.trained_native_model_file_path
+            else:
+                logging.info("Model could not be compiled, no native artifact is written")
+
             model_trainer_artifact = ModelTrainerArtifact(
                 trained_model_file_path=self.model_trainer_config.trained_model_file_path,
                 metric_artifact=metric_artifact,
+                trained_native_model_file_path=trained_native_model_file_path,
             )
             logging.info(f"Model trainer artifact: {model_trainer_artifact}")
             return model_trainer_artifact
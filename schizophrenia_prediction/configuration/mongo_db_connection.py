@@ -4,7 +4,9 @@ from schizophrenia_prediction.exception import SchizophreniaPredException
 from schizophrenia_prediction.logger import logging
 
 import os
-from schizophrenia_prediction.constants import DATABASE_NAME, MONGODB_URL_KEY
+from schizophrenia_prediction.constants import (DATABASE_NAME, MONGODB_CONNECT_TIMEOUT_MS, MONGODB_MAX_IDLE_TIME_MS,
+                                                MONGODB_MAX_POOL_SIZE, MONGODB_MIN_POOL_SIZE,
+                                                MONGODB_SERVER_SELECTION_TIMEOUT_MS, MONGODB_URL_KEY)
 import pymongo
 import certifi
 
@@ -19,14 +21,22 @@ class MongoDBClient:
     On Failure  :   raises an exception
     """
     client = None
+    client_pid = None
 
     def __init__(self, database_name=DATABASE_NAME) -> None:
         try:
-            if MongoDBClient.client is None:
+            # pymongo clients are not fork safe, every forked serving worker opens its own connection pool
+            if MongoDBClient.client is None or MongoDBClient.client_pid != os.getpid():
                 mongo_db_url = os.getenv(MONGODB_URL_KEY)
                 if mongo_db_url is None:
                     raise Exception(f"Environment key: {MONGODB_URL_KEY} is not set.")
-                MongoDBClient.client = pymongo.MongoClient(mongo_db_url, tlsCAFile=ca)
+                MongoDBClient.client = pymongo.MongoClient(mongo_db_url, tlsCAFile=ca,
+                                                           maxPoolSize=MONGODB_MAX_POOL_SIZE,
+                                                           minPoolSize=MONGODB_MIN_POOL_SIZE,
+                                                           maxIdleTimeMS=MONGODB_MAX_IDLE_TIME_MS,
+                                                           serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+                                                           connectTimeoutMS=MONGODB_CONNECT_TIMEOUT_MS)
+                MongoDBClient.client_pid = os.getpid()
             self.client = MongoDBClient.client
             self.database = self.client[database_name]
             self.database_name = database_name
@@ -6,6 +6,11 @@ DATABASE_NAME = "SCHIZOPHRENIA_PRED"
 COLLECTION_NAME = "schizophrenia_data"
 
 MONGODB_URL_KEY = "MONGODB_URL"
+MONGODB_MAX_POOL_SIZE: int = int(os.getenv("MONGODB_MAX_POOL_SIZE", "50"))
+MONGODB_MIN_POOL_SIZE: int = int(os.getenv("MONGODB_MIN_POOL_SIZE", "2"))
+MONGODB_MAX_IDLE_TIME_MS: int = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "60000"))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGODB_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "5000"))
 
 PIPELINE_NAME: str = "schizophrenia"
 ARTIFACT_DIR: str = "artifact"
@@ -18,6 +23,7 @@ TEST_FILE_NAME: str = "test.csv"
 FILE_NAME: str = "schizophrenia_dataset.csv"
 FILE_SOURCE_PATH : str = "asinow/schizohealth-dataset"
 MODEL_FILE_NAME = "model.pkl"
+NATIVE_MODEL_FILE_NAME = "model.szm"
 
 
 TARGET_COLUMN = "Diagnosis"
@@ -33,6 +39,10 @@ REGION_NAME = "us-east-1"
 
 
 
+TRAINING_PIPELINE_STAGES: tuple = ("data_ingestion", "data_validation", "data_transformation",
+                                   "model_trainer", "model_evaluation", "model_pusher")
+
+
 """
 Data Ingestion related constant start with DATA_INGESTION VAR NAME
 """
@@ -69,6 +79,8 @@ MODEL_TRAINER_TRAINED_MODEL_DIR: str = "trained_model"
 MODEL_TRAINER_TRAINED_MODEL_NAME: str = "model.pkl"
 MODEL_TRAINER_EXPECTED_SCORE: float = 0.8
 MODEL_TRAINER_MODEL_CONFIG_FILE_PATH: str = os.path.join("config", "model.yaml")
+MODEL_TRAINER_COMPILE_ENSEMBLE: bool = True
+MODEL_TRAINER_EXPORT_ONNX: bool = os.getenv("MODEL_TRAINER_EXPORT_ONNX", "true").lower() == "true"
 
 
 """
@@ -77,8 +89,136 @@ MODEL EVALUATION related constant
 MODEL_EVALUATION_CHANGED_THRESHOLD_SCORE: float = 0.02
 MODEL_BUCKET_NAME = "schizophrenia-model2025"
 MODEL_PUSHER_S3_KEY = "model-registry"
+MODEL_CACHE_ENABLED: bool = os.getenv("MODEL_CACHE_ENABLED", "true").lower() == "true"
+MODEL_CACHE_DIR: str = os.getenv("MODEL_CACHE_DIR", "model_cache")
+MODEL_CACHE_MAX_SIZE_BYTES: int = int(os.getenv("MODEL_CACHE_MAX_SIZE_BYTES", str(1024 * 1024 * 1024)))
+# "s3" or "local", the local backend keeps buckets as directories under MODEL_STORAGE_LOCAL_DIR
+MODEL_STORAGE_BACKEND: str = os.getenv("MODEL_STORAGE_BACKEND", "s3")
+MODEL_STORAGE_LOCAL_DIR: str = os.getenv("MODEL_STORAGE_LOCAL_DIR", "local_model_storage")
+
+
+"""
+Prediction related constant start with PREDICTION var name
+"""
+PREDICTION_FEATURE_COLUMNS: list = [
+    "Disease_Duration",
+    "Hospitalizations",
+    "Family_History",
+    "Substance_Use",
+    "Suicide_Attempt",
+    "Positive_Symptom_Score",
+    "Negative_Symptom_Score",
+    "GAF_Score",
+    "Medication_Adherence",
+]
+PREDICTION_LABELS: dict = {0: "Not Schizophreniac", 1: "Schizophreniac"}
+PREDICTION_BATCH_MAX_RECORDS: int = 10000
+PREDICTION_COLUMNAR_BATCH_MAX_RECORDS: int = 1000000
+# 1M rows of the nine float64 features are 72MB raw, larger bodies are refused before they are read
+PREDICTION_COLUMNAR_BATCH_MAX_BYTES: int = 128 * 1024 * 1024
+PATIENT_ID_COLUMN: str = "Patient_ID"
+
+
+
+"""
+Batch scoring related constant start with BATCH_SCORING var name
+"""
+BATCH_SCORING_CHUNK_SIZE: int = 50000
+BATCH_SCORING_MAX_WORKERS: int = os.cpu_count() or 1
+BATCH_SCORING_PREDICTION_COLUMN: str = "prediction"
 
 
 APP_HOST = "0.0.0.0"
 APP_PORT = 8080
 
+
+
+"""
+Serving related constant start with SERVING var name
+"""
+SERVING_MICRO_BATCH_ENABLED: bool = os.getenv("SERVING_MICRO_BATCH_ENABLED", "false").lower() == "true"
+SERVING_MICRO_BATCH_MAX_WAIT_MS: float = float(os.getenv("SERVING_MICRO_BATCH_MAX_WAIT_MS", "2"))
+SERVING_MICRO_BATCH_MAX_SIZE: int = int(os.getenv("SERVING_MICRO_BATCH_MAX_SIZE", "64"))
+SERVING_INFERENCE_EXECUTOR: str = os.getenv("SERVING_INFERENCE_EXECUTOR", "thread")
+SERVING_INFERENCE_MAX_WORKERS: int = int(os.getenv("SERVING_INFERENCE_MAX_WORKERS", "4"))
+SERVING_PREDICTION_CACHE_ENABLED: bool = os.getenv("SERVING_PREDICTION_CACHE_ENABLED", "true").lower() == "true"
+SERVING_PREDICTION_CACHE_MAX_SIZE: int = int(os.getenv("SERVING_PREDICTION_CACHE_MAX_SIZE", "10000"))
+SERVING_PREDICTION_CACHE_TTL_SECONDS: float = float(os.getenv("SERVING_PREDICTION_CACHE_TTL_SECONDS", "3600"))
+# "onnx", "compiled" or "library", onnx falls back to compiled and compiled to library when unavailable
+SERVING_INFERENCE_ENGINE: str = os.getenv("SERVING_INFERENCE_ENGINE", "compiled")
+SERVING_ONNX_INTRA_OP_THREADS: int = int(os.getenv("SERVING_ONNX_INTRA_OP_THREADS", "0"))
+SERVING_MODEL_WATCH_ENABLED: bool = os.getenv("SERVING_MODEL_WATCH_ENABLED", "true").lower() == "true"
+SERVING_MODEL_WATCH_INTERVAL_SECONDS: float = float(os.getenv("SERVING_MODEL_WATCH_INTERVAL_SECONDS", "30"))
+SERVING_IMPORT_TIME_BUDGET_SECONDS: float = float(os.getenv("SERVING_IMPORT_TIME_BUDGET_SECONDS", "2.0"))
+SERVING_IMPORT_RSS_BUDGET_MB: float = float(os.getenv("SERVING_IMPORT_RSS_BUDGET_MB", "160"))
+SERVING_IMPORT_FORBIDDEN_MODULES: list = [
+    "evidently",
+    "neuro_mf",
+    "kagglehub",
+    "xgboost",
+    "sklearn",
+    "pymongo",
+    "skl2onnx",
+    "onnxmltools",
+    "schizophrenia_prediction.pipeline.training_pipeline",
+]
+SERVING_TRAINING_JOB_NICE: int = int(os.getenv("SERVING_TRAINING_JOB_NICE", "10"))
+SERVING_TRAINING_JOB_HISTORY: int = int(os.getenv("SERVING_TRAINING_JOB_HISTORY", "20"))
+# shared by all serving workers, holds the job.json of every training job and the lock making /train single flight
+SERVING_TRAINING_JOB_DIR: str = os.getenv("SERVING_TRAINING_JOB_DIR", "training_jobs")
+# how long DELETE /train/{id} waits for the worker owning the job to stop it
+SERVING_TRAINING_JOB_CANCEL_WAIT_SECONDS: float = float(os.getenv("SERVING_TRAINING_JOB_CANCEL_WAIT_SECONDS", "15"))
+SERVING_MODEL_REGISTRY_MEMORY_BUDGET_MB: float = float(os.getenv("SERVING_MODEL_REGISTRY_MEMORY_BUDGET_MB", "512"))
+# comma separated version=fraction pairs of unpinned traffic sent to registry versions, e.g. "01_02_2026_10_00_00=0.1"
+SERVING_MODEL_AB_SPLIT: str = os.getenv("SERVING_MODEL_AB_SPLIT", "")
+SERVING_MODEL_VERSION_HEADER: str = "X-Model-Version"
+SERVING_MODEL_VERSION_QUERY_PARAM: str = "model_version"
+SERVING_MODEL_ROUTING_KEY_HEADER: str = "X-Client-Id"
+SERVING_ADMISSION_CONTROL_ENABLED: bool = os.getenv("SERVING_ADMISSION_CONTROL_ENABLED", "true").lower() == "true"
+SERVING_ADMISSION_MAX_CONCURRENCY: int = int(os.getenv("SERVING_ADMISSION_MAX_CONCURRENCY",
+                                                       str(SERVING_INFERENCE_MAX_WORKERS * 2)))
+SERVING_ADMISSION_MAX_QUEUE_SIZE: int = int(os.getenv("SERVING_ADMISSION_MAX_QUEUE_SIZE", "64"))
+SERVING_ADMISSION_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("SERVING_ADMISSION_QUEUE_TIMEOUT_SECONDS", "1"))
+SERVING_ADMISSION_RETRY_AFTER_SECONDS: int = int(os.getenv("SERVING_ADMISSION_RETRY_AFTER_SECONDS", "1"))
+# path prefixes going through admission control, health checks, stats and metrics always bypass it
+SERVING_ADMISSION_ROUTES: list = os.getenv("SERVING_ADMISSION_ROUTES", "/predict,/api/v1/predict").split(",")
+# shared by all serving workers, job state is read back from this directory by whichever worker gets the poll
+SERVING_SCORING_JOB_DIR: str = os.getenv("SERVING_SCORING_JOB_DIR", "scoring_jobs")
+SERVING_SCORING_JOB_MAX_CONCURRENT: int = int(os.getenv("SERVING_SCORING_JOB_MAX_CONCURRENT", "1"))
+# scoring processes run at this niceness so the /predict workers keep their share of the CPU
+SERVING_SCORING_JOB_NICE: int = int(os.getenv("SERVING_SCORING_JOB_NICE", "10"))
+SERVING_SCORING_JOB_HISTORY: int = int(os.getenv("SERVING_SCORING_JOB_HISTORY", "50"))
+SERVING_SCORING_JOB_MAX_UPLOAD_MB: float = float(os.getenv("SERVING_SCORING_JOB_MAX_UPLOAD_MB", "1024"))
+# reference jobs may only read keys under <prefix>/ of this bucket, they are refused when it is unset
+SERVING_SCORING_JOB_INPUT_BUCKET: str = os.getenv("SERVING_SCORING_JOB_INPUT_BUCKET", "")
+SERVING_SCORING_JOB_INPUT_PREFIX: str = os.getenv("SERVING_SCORING_JOB_INPUT_PREFIX", "scoring-inputs")
+# results are also uploaded under <prefix>/<job_id>/ of this bucket when set
+SERVING_SCORING_JOB_OUTPUT_BUCKET: str = os.getenv("SERVING_SCORING_JOB_OUTPUT_BUCKET", "")
+SERVING_SCORING_JOB_OUTPUT_PREFIX: str = os.getenv("SERVING_SCORING_JOB_OUTPUT_PREFIX", "scoring-jobs")
+SERVING_PATIENT_FEATURE_CACHE_MAX_SIZE: int = int(os.getenv("SERVING_PATIENT_FEATURE_CACHE_MAX_SIZE", "100000"))
+# features change only when data ingestion reloads the collection
+SERVING_PATIENT_FEATURE_CACHE_TTL_SECONDS: float = float(os.getenv("SERVING_PATIENT_FEATURE_CACHE_TTL_SECONDS", "300"))
+SERVING_PATIENT_FEATURE_QUERY_TIMEOUT_MS: int = int(os.getenv("SERVING_PATIENT_FEATURE_QUERY_TIMEOUT_MS", "500"))
+# predictions are logged to Mongo by default whenever a Mongo url is configured
+SERVING_INFERENCE_LOG_ENABLED: bool = os.getenv("SERVING_INFERENCE_LOG_ENABLED",
+                                                "true" if os.getenv(MONGODB_URL_KEY) else "false").lower() == "true"
+SERVING_INFERENCE_LOG_COLLECTION_NAME: str = os.getenv("SERVING_INFERENCE_LOG_COLLECTION_NAME", "inference_log")
+SERVING_INFERENCE_LOG_BATCH_SIZE: int = int(os.getenv("SERVING_INFERENCE_LOG_BATCH_SIZE", "500"))
+SERVING_INFERENCE_LOG_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("SERVING_INFERENCE_LOG_FLUSH_INTERVAL_SECONDS", "1"))
+SERVING_INFERENCE_LOG_MAX_BUFFERED_ROWS: int = int(os.getenv("SERVING_INFERENCE_LOG_MAX_BUFFERED_ROWS", "100000"))
+SERVING_INFERENCE_LOG_DRAIN_TIMEOUT_SECONDS: float = float(os.getenv("SERVING_INFERENCE_LOG_DRAIN_TIMEOUT_SECONDS", "10"))
+SERVING_WORKERS: int = int(os.getenv("SERVING_WORKERS", str(os.cpu_count() or 1)))
+SERVING_MEMORY_REPORT_INTERVAL_SECONDS: float = float(os.getenv("SERVING_MEMORY_REPORT_INTERVAL_SECONDS", "60"))
+
+
+
+"""
+Logging related constant start with LOG var name
+"""
+LOG_ASYNC_ENABLED: bool = os.getenv("LOG_ASYNC_ENABLED", "true").lower() == "true"
+LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")
+LOG_LEVEL: str = os.getenv("LOG_LEVEL", "DEBUG")
+# comma separated module=LEVEL pairs, e.g. "prediction_pipeline=WARNING,model_holder=INFO"
+LOG_MODULE_LEVELS: str = os.getenv("LOG_MODULE_LEVELS", "")
+# comma separated route=records_per_second pairs, e.g. "/predict=5,/predict/batch=1"
+LOG_ROUTE_SAMPLE_RATES: str = os.getenv("LOG_ROUTE_SAMPLE_RATES", "")
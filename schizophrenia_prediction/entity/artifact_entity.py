@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 
 @dataclass
@@ -35,6 +36,7 @@ class ClassificationMetricArtifact:
 class ModelTrainerArtifact:
     trained_model_file_path:str 
     metric_artifact:ClassificationMetricArtifact
+    trained_native_model_file_path:Optional[str] = None
 
 
 
@@ -44,6 +46,7 @@ class ModelEvaluationArtifact:
     changed_accuracy:float
     s3_model_path:str 
     trained_model_path:str
+    trained_native_model_path:Optional[str] = None
 
 
 
@@ -51,6 +54,7 @@ class ModelEvaluationArtifact:
 class ModelPusherArtifact:
     bucket_name:str
     s3_model_path:str
+    model_version:Optional[str] = None
 
 
 
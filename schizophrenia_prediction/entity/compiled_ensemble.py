@@ -0,0 +1,197 @@
+import json
+import sys
+from typing import List, Optional
+
+import numpy as np
+
+from schizophrenia_prediction.exception import SchizophreniaPredException
+from schizophrenia_prediction.logger import logging
+
+
+class CompiledTreeEnsemble:
+    """
+    This class holds a fitted RandomForestClassifier or binary XGBClassifier flattened into
+    contiguous numpy arrays (feature index, threshold, children, leaf values) and walks all
+    trees of a batch at once with vectorized traversal
+    """
+
+    RANDOM_FOREST: str = "random_forest"
+    XGBOOST: str = "xgboost"
+
+    def __init__(self, kind: str, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray,
+                 right: np.ndarray, default_left: np.ndarray, value: np.ndarray, roots: np.ndarray,
+                 max_depth: int, classes: np.ndarray, base_margin: float = 0.0):
+        """
+        :param kind: RANDOM_FOREST (x <= threshold goes left, leaf values are class probabilities)
+                     or XGBOOST (x < threshold goes left, leaf values are summed margins)
+        :param feature: Feature index tested by each node
+        :param threshold: Split threshold of each node
+        :param left: Child taken when the test holds, leaves point to themselves
+        :param right: Child taken when the test fails, leaves point to themselves
+        :param default_left: Whether a missing value goes to the left child
+        :param value: Leaf values of shape (n_nodes, n_values)
+        :param roots: Index of the root node of every tree
+        :param max_depth: Depth of the deepest tree, number of traversal steps
+        :param classes: Class labels returned by predict
+        :param base_margin: Margin added to the tree sum of an xgboost model
+        """
+        self.kind = kind
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.classes = classes
+        self.base_margin = base_margin
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def _leaves(self, array: np.ndarray) -> np.ndarray:
+        array = np.asarray(array, dtype=np.float32)
+        rows = np.arange(array.shape[0])[:, None]
+        node = np.repeat(self.roots[None, :], array.shape[0], axis=0)
+        for _ in range(self.max_depth):
+            x = array[rows, self.feature[node]]
+            threshold = self.threshold[node]
+            go_left = x <= threshold if self.kind == CompiledTreeEnsemble.RANDOM_FOREST else x < threshold
+            go_left = np.where(np.isnan(x), self.default_left[node], go_left)
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict_proba(self, array: np.ndarray) -> np.ndarray:
+        leaves = self._leaves(array)
+        if self.kind == CompiledTreeEnsemble.RANDOM_FOREST:
+            return self.value[leaves].mean(axis=1)
+        margin = self.base_margin + self.value[leaves, 0].astype(np.float32).sum(axis=1, dtype=np.float32)
+        positive = 1.0 / (1.0 + np.exp(-margin.astype(np.float64)))
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, array: np.ndarray) -> np.ndarray:
+        proba = self.predict_proba(array)
+        if self.kind == CompiledTreeEnsemble.XGBOOST:
+            return self.classes[(proba[:, 1] > 0.5).astype(np.intp)]
+        return self.classes[np.argmax(proba, axis=1)]
+
+    def __repr__(self):
+        return f"CompiledTreeEnsemble(kind={self.kind}, n_trees={self.n_trees}, max_depth={self.max_depth})"
+
+
+def _from_random_forest(model) -> CompiledTreeEnsemble:
+    features, thresholds, lefts, rights, default_lefts, values, roots = [], [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        node_index = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        lefts.append(np.where(is_leaf, node_index, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, node_index, tree.children_right) + offset)
+        missing_go_to_left = getattr(tree, "missing_go_to_left", None)
+        default_lefts.append(np.zeros(tree.node_count, dtype=bool) if missing_go_to_left is None
+                             else missing_go_to_left.astype(bool))
+        value = tree.value[:, 0, :]
+        totals = value.sum(axis=1, keepdims=True)
+        values.append(np.divide(value, totals, out=np.zeros_like(value), where=totals > 0))
+        roots.append(offset)
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+    return CompiledTreeEnsemble(
+        kind=CompiledTreeEnsemble.RANDOM_FOREST,
+        feature=np.concatenate(features).astype(np.intp),
+        threshold=np.concatenate(thresholds).astype(np.float64),
+        left=np.concatenate(lefts).astype(np.intp),
+        right=np.concatenate(rights).astype(np.intp),
+        default_left=np.concatenate(default_lefts),
+        value=np.concatenate(values).astype(np.float64),
+        roots=np.asarray(roots, dtype=np.intp),
+        max_depth=max_depth,
+        classes=np.asarray(model.classes_),
+    )
+
+
+def _from_xgboost(model) -> CompiledTreeEnsemble:
+    booster = model.get_booster()
+    config = json.loads(booster.save_config())
+    objective = config["learner"]["objective"]["name"]
+    if objective != "binary:logistic":
+        raise ValueError(f"Unsupported xgboost objective {objective}")
+    base_score = float(str(config["learner"]["learner_model_param"]["base_score"]).strip("[]"))
+    feature_names: Optional[List[str]] = booster.feature_names
+
+    features, thresholds, lefts, rights, default_lefts, values, roots = [], [], [], [], [], [], []
+    max_depth = 0
+
+    def add_node(node: dict, depth: int) -> int:
+        nonlocal max_depth
+        index = len(features)
+        features.append(0)
+        thresholds.append(np.inf)
+        lefts.append(index)
+        rights.append(index)
+        default_lefts.append(False)
+        values.append(0.0)
+        max_depth = max(max_depth, depth)
+        if "leaf" in node:
+            values[index] = node["leaf"]
+            return index
+        split = node["split"]
+        features[index] = feature_names.index(split) if feature_names and split in feature_names else int(split.lstrip("f"))
+        thresholds[index] = node["split_condition"]
+        children = {child["nodeid"]: child for child in node["children"]}
+        lefts[index] = add_node(children[node["yes"]], depth + 1)
+        rights[index] = add_node(children[node["no"]], depth + 1)
+        default_lefts[index] = node.get("missing", node["yes"]) == node["yes"]
+        return index
+
+    for tree_dump in booster.get_dump(dump_format="json"):
+        roots.append(add_node(json.loads(tree_dump), 0))
+
+    return CompiledTreeEnsemble(
+        kind=CompiledTreeEnsemble.XGBOOST,
+        feature=np.asarray(features, dtype=np.intp),
+        threshold=np.asarray(thresholds, dtype=np.float32),
+        left=np.asarray(lefts, dtype=np.intp),
+        right=np.asarray(rights, dtype=np.intp),
+        default_left=np.asarray(default_lefts, dtype=bool),
+        value=np.asarray(values, dtype=np.float32)[:, None],
+        roots=np.asarray(roots, dtype=np.intp),
+        max_depth=max_depth,
+        classes=np.asarray(getattr(model, "classes_", [0, 1])),
+        base_margin=float(np.log(base_score / (1.0 - base_score))),
+    )
+
+
+def compile_tree_ensemble(model, validation_array: np.ndarray) -> Optional[CompiledTreeEnsemble]:
+    """
+    Flattens a fitted RandomForestClassifier or XGBClassifier and returns it only when its
+    predictions on validation_array are identical to model.predict, None otherwise
+    """
+    logging.info("Entered the compile_tree_ensemble method of compiled_ensemble")
+    try:
+        model_name = type(model).__name__
+        if model_name == "RandomForestClassifier":
+            compiled = _from_random_forest(model)
+        elif model_name == "XGBClassifier":
+            compiled = _from_xgboost(model)
+        else:
+            logging.info(f"No compiled evaluator for {model_name}, keeping the library predict")
+            return None
+
+        expected = np.asarray(model.predict(validation_array))
+        if not np.array_equal(compiled.predict(validation_array), expected):
+            logging.info(f"Compiled {compiled} disagrees with {model_name}.predict, keeping the library predict")
+            return None
+
+        logging.info(f"Compiled {model_name} into {compiled}")
+        return compiled
+
+    except Exception as e:
+        logging.info(f"Could not compile tree ensemble, keeping the library predict: "
+                     f"{SchizophreniaPredException(e, sys)}")
+        return None
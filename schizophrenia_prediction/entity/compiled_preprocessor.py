@@ -0,0 +1,180 @@
+import sys
+from typing import List, Optional, Sequence
+
+import numpy as np
+from pandas import DataFrame
+
+from schizophrenia_prediction.constants import PREDICTION_FEATURE_COLUMNS, RANDOM_STATE
+from schizophrenia_prediction.exception import SchizophreniaPredException
+from schizophrenia_prediction.logger import logging
+
+
+def _yeo_johnson(x: np.ndarray, lmbda: float, variant: str) -> np.ndarray:
+    """
+    Same arithmetic as the yeo-johnson transform of sklearn so that the outputs match bit for bit.
+    "power" is the formula of PowerTransformer._yeo_johnson_transform (scikit-learn < 1.6),
+    "expm1" the one of scipy.stats.yeojohnson that PowerTransformer delegates to since then
+    """
+    out = np.zeros_like(x)
+    pos = x >= 0
+    if abs(lmbda) < np.spacing(1.0):
+        out[pos] = np.log1p(x[pos])
+    elif variant == "expm1":
+        out[pos] = np.expm1(lmbda * np.log1p(x[pos])) / lmbda
+    else:
+        out[pos] = (np.power(x[pos] + 1, lmbda) - 1) / lmbda
+    if abs(lmbda - 2) <= np.spacing(1.0):
+        out[~pos] = -np.log1p(-x[~pos])
+    elif variant == "expm1":
+        out[~pos] = -np.expm1((2 - lmbda) * np.log1p(-x[~pos])) / (2 - lmbda)
+    else:
+        out[~pos] = -(np.power(-x[~pos] + 1, 2 - lmbda) - 1) / (2 - lmbda)
+    return out
+
+
+class CompiledPreprocessor:
+    """
+    This class flattens the fitted ColumnTransformer of the data transformation stage
+    (yeo-johnson PowerTransformer, StandardScaler and passthrough columns) into plain
+    numpy arithmetic over a float array laid out in PREDICTION_FEATURE_COLUMNS order
+    """
+
+    PASSTHROUGH: str = "passthrough"
+    YEO_JOHNSON: str = "yeo-johnson"
+    SCALE: str = "scale"
+    YEO_JOHNSON_VARIANTS: tuple = ("expm1", "power")
+
+    def __init__(self, preprocessing_object,
+                 feature_columns: Sequence[str] = PREDICTION_FEATURE_COLUMNS,
+                 yeo_johnson_variant: str = "expm1"):
+        """
+        :param preprocessing_object: Fitted ColumnTransformer from DataTransformation.get_data_transformer_object
+        :param feature_columns: Column order of the arrays passed to transform
+        :param yeo_johnson_variant: Formula of the yeo-johnson transform, one of YEO_JOHNSON_VARIANTS
+        """
+        try:
+            # sklearn is imported here rather than at module level to keep it off the serving import path
+            from sklearn.preprocessing import FunctionTransformer, PowerTransformer, StandardScaler
+
+            self.feature_columns = list(feature_columns)
+            self.yeo_johnson_variant = yeo_johnson_variant
+            fitted_columns = list(getattr(preprocessing_object, "feature_names_in_", self.feature_columns))
+            self.steps = []
+            self.n_output = 0
+
+            for name, transformer, columns in preprocessing_object.transformers_:
+                if isinstance(transformer, str) and transformer == "drop":
+                    continue
+                input_index = np.array([self.feature_columns.index(column) for column in
+                                        self._column_names(columns, fitted_columns)], dtype=np.intp)
+                if len(input_index) == 0:
+                    continue
+
+                is_identity = isinstance(transformer, FunctionTransformer) and transformer.func is None
+                if (isinstance(transformer, str) and transformer == "passthrough") or is_identity:
+                    self.steps.append((CompiledPreprocessor.PASSTHROUGH, input_index, None))
+                elif isinstance(transformer, PowerTransformer):
+                    if transformer.method != "yeo-johnson":
+                        raise ValueError(f"Unsupported PowerTransformer method {transformer.method} in step {name}")
+                    scaler = transformer._scaler if transformer.standardize else None
+                    self.steps.append((CompiledPreprocessor.YEO_JOHNSON, input_index, (
+                        np.asarray(transformer.lambdas_, dtype=np.float64),
+                        None if scaler is None or scaler.mean_ is None else scaler.mean_,
+                        None if scaler is None or scaler.scale_ is None else scaler.scale_,
+                    )))
+                elif isinstance(transformer, StandardScaler):
+                    self.steps.append((CompiledPreprocessor.SCALE, input_index, (
+                        transformer.mean_ if transformer.with_mean else None,
+                        transformer.scale_ if transformer.with_std else None,
+                    )))
+                else:
+                    raise ValueError(f"Unsupported transformer {type(transformer).__name__} in step {name}")
+                self.n_output += len(input_index)
+
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+    @classmethod
+    def from_steps(cls, steps: list, n_output: int, feature_columns: Sequence[str] = PREDICTION_FEATURE_COLUMNS,
+                   yeo_johnson_variant: str = "expm1") -> "CompiledPreprocessor":
+        """
+        Rebuilds a compiled preprocessor from its steps without the fitted ColumnTransformer,
+        used when loading a native model artifact
+        """
+        compiled = cls.__new__(cls)
+        compiled.feature_columns = list(feature_columns)
+        compiled.yeo_johnson_variant = yeo_johnson_variant
+        compiled.steps = list(steps)
+        compiled.n_output = n_output
+        return compiled
+
+    @staticmethod
+    def _column_names(columns, fitted_columns: List[str]) -> List[str]:
+        if isinstance(columns, str):
+            return [columns]
+        names = []
+        for column in columns:
+            names.append(fitted_columns[column] if isinstance(column, (int, np.integer)) else column)
+        return names
+
+    def transform(self, array: np.ndarray) -> np.ndarray:
+        """
+        Transforms a float array of shape (n_rows, n_features) exactly like ColumnTransformer.transform
+        """
+        array = np.asarray(array, dtype=np.float64)
+        out = np.empty((array.shape[0], self.n_output), dtype=np.float64)
+        position = 0
+        for kind, input_index, params in self.steps:
+            block = array[:, input_index]
+            if kind == CompiledPreprocessor.YEO_JOHNSON:
+                lambdas, mean, scale = params
+                for i, lmbda in enumerate(lambdas):
+                    with np.errstate(invalid="ignore"):
+                        block[:, i] = _yeo_johnson(block[:, i], lmbda, self.yeo_johnson_variant)
+                if mean is not None:
+                    block -= mean
+                if scale is not None:
+                    block /= scale
+            elif kind == CompiledPreprocessor.SCALE:
+                mean, scale = params
+                if mean is not None:
+                    block -= mean
+                if scale is not None:
+                    block /= scale
+            out[:, position:position + block.shape[1]] = block
+            position += block.shape[1]
+        return out
+
+    @staticmethod
+    def probe_array(n_rows: int = 512, n_features: int = len(PREDICTION_FEATURE_COLUMNS)) -> np.ndarray:
+        """
+        Deterministic integer valued rows, including zeros and negatives, used for the parity check
+        """
+        rng = np.random.default_rng(RANDOM_STATE)
+        return rng.integers(-10, 120, size=(n_rows, n_features)).astype(np.float64)
+
+    def is_equivalent_to(self, preprocessing_object, probe: Optional[np.ndarray] = None) -> bool:
+        """
+        Checks bit for bit equality with ColumnTransformer.transform on the probe rows
+        """
+        probe = CompiledPreprocessor.probe_array(n_features=len(self.feature_columns)) if probe is None else probe
+        expected = np.asarray(preprocessing_object.transform(DataFrame(probe, columns=self.feature_columns)),
+                              dtype=np.float64)
+        compiled = self.transform(probe)
+        return expected.shape == compiled.shape and np.array_equal(expected, compiled, equal_nan=True)
+
+
+def compile_preprocessor(preprocessing_object) -> Optional[CompiledPreprocessor]:
+    """
+    Returns the compiled preprocessor when it reproduces preprocessing_object exactly, None otherwise
+    """
+    try:
+        for variant in CompiledPreprocessor.YEO_JOHNSON_VARIANTS:
+            compiled = CompiledPreprocessor(preprocessing_object=preprocessing_object, yeo_johnson_variant=variant)
+            if compiled.is_equivalent_to(preprocessing_object):
+                logging.info(f"Compiled preprocessor ({variant} yeo-johnson) matches ColumnTransformer.transform bit for bit")
+                return compiled
+        logging.info("Compiled preprocessor does not match ColumnTransformer.transform, keeping the sklearn path")
+    except Exception as e:
+        logging.info(f"Could not compile preprocessor, keeping the sklearn path: {e}")
+    return None
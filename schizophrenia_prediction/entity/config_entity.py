@@ -1,6 +1,6 @@
 import os
 from schizophrenia_prediction.constants import *
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 
 TIMESTAMP: str = datetime.now().strftime("%m_%d_%Y_%H_%M_%S")
@@ -58,8 +58,12 @@ class DataTransformationConfig:
 class ModelTrainerConfig:
     model_trainer_dir: str = os.path.join(training_pipeline_config.artifact_dir, MODEL_TRAINER_DIR_NAME)
     trained_model_file_path: str = os.path.join(model_trainer_dir, MODEL_TRAINER_TRAINED_MODEL_DIR, MODEL_FILE_NAME)
+    trained_native_model_file_path: str = os.path.join(model_trainer_dir, MODEL_TRAINER_TRAINED_MODEL_DIR,
+                                                       NATIVE_MODEL_FILE_NAME)
     expected_accuracy: float = MODEL_TRAINER_EXPECTED_SCORE
     model_config_file_path: str = MODEL_TRAINER_MODEL_CONFIG_FILE_PATH
+    compile_ensemble: bool = MODEL_TRAINER_COMPILE_ENSEMBLE
+    export_onnx: bool = MODEL_TRAINER_EXPORT_ONNX
 
 
 
@@ -76,6 +80,18 @@ class ModelEvaluationConfig:
 class ModelPusherConfig:
     bucket_name: str = MODEL_BUCKET_NAME
     s3_model_key_path: str = MODEL_FILE_NAME
+    s3_native_model_key_path: str = NATIVE_MODEL_FILE_NAME
+    model_registry_prefix: str = MODEL_PUSHER_S3_KEY
+    model_version: str = training_pipeline_config.timestamp
+
+
+
+
+@dataclass
+class LocalModelCacheConfig:
+    enabled: bool = MODEL_CACHE_ENABLED
+    cache_dir: str = MODEL_CACHE_DIR
+    max_size_bytes: int = MODEL_CACHE_MAX_SIZE_BYTES
 
 
 
@@ -83,7 +99,73 @@ class ModelPusherConfig:
 @dataclass
 class SchizophreniaPredConfig:
     model_file_path: str = MODEL_FILE_NAME
+    native_model_file_path: str = NATIVE_MODEL_FILE_NAME
     model_bucket_name: str = MODEL_BUCKET_NAME
+    inference_engine: str = SERVING_INFERENCE_ENGINE
+    onnx_intra_op_num_threads: int = SERVING_ONNX_INTRA_OP_THREADS
+
+
+
+
+@dataclass
+class BatchScoringConfig:
+    chunk_size: int = BATCH_SCORING_CHUNK_SIZE
+    max_workers: int = BATCH_SCORING_MAX_WORKERS
+    prediction_column: str = BATCH_SCORING_PREDICTION_COLUMN
+
+
+
+
+@dataclass
+class MicroBatchConfig:
+    enabled: bool = SERVING_MICRO_BATCH_ENABLED
+    max_wait_ms: float = SERVING_MICRO_BATCH_MAX_WAIT_MS
+    max_batch_size: int = SERVING_MICRO_BATCH_MAX_SIZE
+
+
+
+
+@dataclass
+class InferenceExecutorConfig:
+    executor_type: str = SERVING_INFERENCE_EXECUTOR
+    max_workers: int = SERVING_INFERENCE_MAX_WORKERS
+
+
+
+
+@dataclass
+class PredictionCacheConfig:
+    enabled: bool = SERVING_PREDICTION_CACHE_ENABLED
+    max_size: int = SERVING_PREDICTION_CACHE_MAX_SIZE
+    ttl_seconds: float = SERVING_PREDICTION_CACHE_TTL_SECONDS
+
+
+
+
+@dataclass
+class ModelWatcherConfig:
+    enabled: bool = SERVING_MODEL_WATCH_ENABLED
+    poll_interval_seconds: float = SERVING_MODEL_WATCH_INTERVAL_SECONDS
+
+
+
+
+@dataclass
+class ImportBudgetConfig:
+    module_name: str = "app"
+    time_budget_seconds: float = SERVING_IMPORT_TIME_BUDGET_SECONDS
+    rss_budget_mb: float = SERVING_IMPORT_RSS_BUDGET_MB
+    forbidden_modules: list = field(default_factory=lambda: list(SERVING_IMPORT_FORBIDDEN_MODULES))
+
+
+
+
+@dataclass
+class TrainingJobConfig:
+    nice: int = SERVING_TRAINING_JOB_NICE
+    history_size: int = SERVING_TRAINING_JOB_HISTORY
+    job_dir: str = SERVING_TRAINING_JOB_DIR
+    cancel_wait_seconds: float = SERVING_TRAINING_JOB_CANCEL_WAIT_SECONDS
 
 
 
@@ -93,3 +175,74 @@ class SchizophreniaPredConfig:
 
 
 
+
+@dataclass
+class ServingLauncherConfig:
+    host: str = APP_HOST
+    port: int = APP_PORT
+    workers: int = SERVING_WORKERS
+    memory_report_interval_seconds: float = SERVING_MEMORY_REPORT_INTERVAL_SECONDS
+    app_module: str = "app"
+
+
+
+
+@dataclass
+class AdmissionControlConfig:
+    enabled: bool = SERVING_ADMISSION_CONTROL_ENABLED
+    max_concurrency: int = SERVING_ADMISSION_MAX_CONCURRENCY
+    max_queue_size: int = SERVING_ADMISSION_MAX_QUEUE_SIZE
+    queue_timeout_seconds: float = SERVING_ADMISSION_QUEUE_TIMEOUT_SECONDS
+    retry_after_seconds: int = SERVING_ADMISSION_RETRY_AFTER_SECONDS
+    admitted_routes: list = field(default_factory=lambda: list(SERVING_ADMISSION_ROUTES))
+
+
+
+
+@dataclass
+class ScoringJobConfig:
+    job_dir: str = SERVING_SCORING_JOB_DIR
+    max_concurrent_jobs: int = SERVING_SCORING_JOB_MAX_CONCURRENT
+    nice: int = SERVING_SCORING_JOB_NICE
+    history_size: int = SERVING_SCORING_JOB_HISTORY
+    max_upload_bytes: int = int(SERVING_SCORING_JOB_MAX_UPLOAD_MB * 1024 * 1024)
+    chunk_size: int = BATCH_SCORING_CHUNK_SIZE
+    prediction_column: str = BATCH_SCORING_PREDICTION_COLUMN
+    input_bucket_name: str = SERVING_SCORING_JOB_INPUT_BUCKET
+    input_key_prefix: str = SERVING_SCORING_JOB_INPUT_PREFIX
+    output_bucket_name: str = SERVING_SCORING_JOB_OUTPUT_BUCKET
+    output_key_prefix: str = SERVING_SCORING_JOB_OUTPUT_PREFIX
+
+
+
+
+@dataclass
+class PatientFeatureStoreConfig:
+    database_name: str = DATABASE_NAME
+    collection_name: str = DATA_INGESTION_COLLECTION_NAME
+    cache_max_size: int = SERVING_PATIENT_FEATURE_CACHE_MAX_SIZE
+    cache_ttl_seconds: float = SERVING_PATIENT_FEATURE_CACHE_TTL_SECONDS
+    query_timeout_ms: int = SERVING_PATIENT_FEATURE_QUERY_TIMEOUT_MS
+
+
+
+
+@dataclass
+class InferenceLogConfig:
+    enabled: bool = SERVING_INFERENCE_LOG_ENABLED
+    database_name: str = DATABASE_NAME
+    collection_name: str = SERVING_INFERENCE_LOG_COLLECTION_NAME
+    batch_size: int = SERVING_INFERENCE_LOG_BATCH_SIZE
+    flush_interval_seconds: float = SERVING_INFERENCE_LOG_FLUSH_INTERVAL_SECONDS
+    max_buffered_rows: int = SERVING_INFERENCE_LOG_MAX_BUFFERED_ROWS
+    drain_timeout_seconds: float = SERVING_INFERENCE_LOG_DRAIN_TIMEOUT_SECONDS
+
+
+
+
+@dataclass
+class ModelRegistryConfig:
+    bucket_name: str = MODEL_BUCKET_NAME
+    model_registry_prefix: str = MODEL_PUSHER_S3_KEY
+    memory_budget_bytes: int = int(SERVING_MODEL_REGISTRY_MEMORY_BUDGET_MB * 1024 * 1024)
+    ab_split: str = SERVING_MODEL_AB_SPLIT
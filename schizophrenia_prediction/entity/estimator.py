@@ -1,8 +1,14 @@
+import os
 import sys
 
+import numpy as np
 from pandas import DataFrame
-from sklearn.pipeline import Pipeline
 
+from schizophrenia_prediction.constants import PREDICTION_FEATURE_COLUMNS
+from schizophrenia_prediction.entity.compiled_ensemble import CompiledTreeEnsemble, compile_tree_ensemble
+from schizophrenia_prediction.entity.compiled_preprocessor import CompiledPreprocessor, compile_preprocessor
+from schizophrenia_prediction.entity.onnx_model import (ONNX_INPUT_NAME, ONNX_LABEL_OUTPUT, ONNX_PROBABILITY_OUTPUT,
+                                                        create_onnx_session, export_onnx_model, onnx_runtime_available)
 from schizophrenia_prediction.exception import SchizophreniaPredException
 from schizophrenia_prediction.logger import logging
 
@@ -20,13 +26,26 @@ from schizophrenia_prediction.logger import logging
     
 
 class SchizophreniaPredModel:
-    def __init__(self, preprocessing_object: Pipeline, trained_model_object: object):
+    def __init__(self, preprocessing_object: object, trained_model_object: object):
         """
         :param preprocessing_object: Input Object of preprocesser
         :param trained_model_object: Input Object of trained model 
         """
         self.preprocessing_object = preprocessing_object
         self.trained_model_object = trained_model_object
+        self.compiled_preprocessor: CompiledPreprocessor = None
+        self.compiled_model: CompiledTreeEnsemble = None
+        self.use_compiled_model: bool = False
+        self.onnx_model: bytes = None
+        self.onnx_classes: np.ndarray = None
+        self.use_onnx_model: bool = False
+        self.onnx_intra_op_num_threads: int = 0
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        # onnxruntime sessions do not pickle, every process builds its own from onnx_model
+        state.pop("_onnx_session", None)
+        return state
 
     def predict(self, dataframe: DataFrame) -> DataFrame:
         """
@@ -39,6 +58,10 @@ class SchizophreniaPredModel:
         try:
             logging.info("Using the trained model to get predictions")
 
+            if self.preprocessing_object is None:
+                # models loaded from a native artifact carry only the compiled preprocessor and ensemble
+                return self.predict_array(dataframe[PREDICTION_FEATURE_COLUMNS].to_numpy(dtype=np.float64))
+
             transformed_feature = self.preprocessing_object.transform(dataframe)
 
             logging.info("Used the trained model to get predictions")
@@ -47,9 +70,131 @@ class SchizophreniaPredModel:
         except Exception as e:
             raise SchizophreniaPredException(e, sys) from e
 
+    def compile_preprocessor(self) -> bool:
+        """
+        Compiles the fitted preprocessor into a numpy kernel checked bit for bit against
+        preprocessing_object.transform. Returns False and keeps the sklearn path when they differ
+        """
+        if self.preprocessing_object is None:
+            return getattr(self, "compiled_preprocessor", None) is not None
+        self.compiled_preprocessor = compile_preprocessor(self.preprocessing_object)
+        return self.compiled_preprocessor is not None
+
+    def compile_trained_model(self, validation_array: np.ndarray) -> bool:
+        """
+        Flattens the trained tree ensemble into numpy arrays stored with this object, kept only when
+        it predicts validation_array exactly like trained_model_object. Returns whether it was kept
+        """
+        self.compiled_model = compile_tree_ensemble(self.trained_model_object, validation_array=validation_array)
+        return self.compiled_model is not None
+
+    def export_onnx_model(self, validation_array: np.ndarray) -> bool:
+        """
+        Converts the trained model into an ONNX graph stored with this object, kept only when it
+        predicts validation_array like trained_model_object. Returns whether it was kept
+        """
+        self.onnx_model = export_onnx_model(self.trained_model_object, validation_array=validation_array)
+        self.onnx_classes = None if self.onnx_model is None else np.asarray(self.trained_model_object.classes_)
+        return self.onnx_model is not None
+
+    def select_inference_engine(self, inference_engine: str, onnx_intra_op_num_threads: int = 0) -> str:
+        """
+        Chooses the estimator used by predict_array, "onnx" falls back to "compiled" when the
+        artifact carries no ONNX graph or onnxruntime is missing, "compiled" falls back to "library"
+        when the artifact carries no compiled model and "library" falls back to "compiled"
+        when it carries no library model. Returns the engine in use
+        """
+        self.use_onnx_model = False
+        if inference_engine == "onnx":
+            if getattr(self, "onnx_model", None) is None:
+                logging.info("Model carries no ONNX graph, falling back from the onnx inference engine")
+            elif not onnx_runtime_available():
+                logging.info("onnxruntime is not installed, falling back from the onnx inference engine")
+            else:
+                try:
+                    self.onnx_intra_op_num_threads = onnx_intra_op_num_threads
+                    self._onnx_session = None
+                    self._get_onnx_session()
+                    self.use_onnx_model = True
+                except Exception as e:
+                    logging.info(f"Could not create the onnxruntime session, falling back from the onnx inference engine: {e}")
+        if self.use_onnx_model:
+            return "onnx"
+
+        has_compiled_model = getattr(self, "compiled_model", None) is not None
+        self.use_compiled_model = has_compiled_model and (inference_engine in ("compiled", "onnx")
+                                                          or self.trained_model_object is None)
+        return "compiled" if self.use_compiled_model else "library"
+
+    def _get_onnx_session(self):
+        # keyed on the pid since the onnxruntime thread pool does not survive a fork of the serving launcher
+        onnx_session = getattr(self, "_onnx_session", None)
+        if onnx_session is None or onnx_session[0] != os.getpid():
+            onnx_session = (os.getpid(), create_onnx_session(self.onnx_model, self.onnx_intra_op_num_threads))
+            self._onnx_session = onnx_session
+        return onnx_session[1]
+
+    def _run_onnx_session(self, transformed_array: np.ndarray, output_name: str) -> np.ndarray:
+        input_array = np.ascontiguousarray(transformed_array, dtype=np.float32)
+        return self._get_onnx_session().run([output_name], {ONNX_INPUT_NAME: input_array})[0]
+
+    def transform_array(self, array: np.ndarray) -> np.ndarray:
+        """
+        Transforms a float array laid out in PREDICTION_FEATURE_COLUMNS order, through the
+        compiled kernel when available and through preprocessing_object otherwise
+        """
+        compiled_preprocessor = getattr(self, "compiled_preprocessor", None)
+        if compiled_preprocessor is not None:
+            return compiled_preprocessor.transform(array)
+        return self.preprocessing_object.transform(DataFrame(array, columns=PREDICTION_FEATURE_COLUMNS))
+
+    def predict_array(self, array: np.ndarray) -> np.ndarray:
+        """
+        Fast path of predict for inputs already parsed into a float array, skips pandas entirely
+        when the preprocessor is compiled
+        """
+        try:
+            return self.predict_transformed(self.transform_array(array))
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+    def predict_transformed(self, transformed_array: np.ndarray) -> np.ndarray:
+        """
+        Predicts rows already passed through transform_array, with the ONNX graph or the compiled
+        ensemble when selected
+        """
+        if getattr(self, "use_onnx_model", False):
+            return self._run_onnx_session(transformed_array, ONNX_LABEL_OUTPUT)
+        estimator = self.compiled_model if getattr(self, "use_compiled_model", False) else self.trained_model_object
+        return estimator.predict(transformed_array)
+
+    def predict_proba_array(self, array: np.ndarray) -> np.ndarray:
+        """
+        Class probabilities of a float array laid out in PREDICTION_FEATURE_COLUMNS order,
+        columns ordered like classes
+        """
+        try:
+            return self.predict_proba_transformed(self.transform_array(array))
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+    def predict_proba_transformed(self, transformed_array: np.ndarray) -> np.ndarray:
+        if getattr(self, "use_onnx_model", False):
+            return self._run_onnx_session(transformed_array, ONNX_PROBABILITY_OUTPUT).astype(np.float64)
+        estimator = self.compiled_model if getattr(self, "use_compiled_model", False) else self.trained_model_object
+        return estimator.predict_proba(transformed_array)
+
+    @property
+    def classes(self) -> np.ndarray:
+        if getattr(self, "use_onnx_model", False):
+            return self.onnx_classes
+        if getattr(self, "use_compiled_model", False):
+            return self.compiled_model.classes
+        return self.trained_model_object.classes_
+
     def __repr__(self):
-        return f"{type(self.trained_model_object).__name__}()"
+        return getattr(self, "model_name", None) or f"{type(self.trained_model_object).__name__}()"
 
     def __str__(self):
-        return f"{type(self.trained_model_object).__name__}()"
+        return self.__repr__()
     
\ No newline at end of file
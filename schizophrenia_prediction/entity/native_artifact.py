@@ -0,0 +1,222 @@
+import json
+import struct
+import sys
+from datetime import datetime
+from typing import Dict, Optional, Union
+
+import numpy as np
+
+from schizophrenia_prediction.entity.compiled_ensemble import CompiledTreeEnsemble
+from schizophrenia_prediction.entity.compiled_preprocessor import CompiledPreprocessor
+from schizophrenia_prediction.entity.estimator import SchizophreniaPredModel
+from schizophrenia_prediction.exception import SchizophreniaPredException
+from schizophrenia_prediction.logger import logging
+
+# Layout of a native model artifact, all integers little endian:
+#
+#     magic (8 bytes) | format version (uint32) | reserved (uint32) | manifest length (uint64)
+#     manifest (utf-8 JSON) | zero padding to ALIGNMENT
+#     raw array and blob sections, each starting at a multiple of ALIGNMENT
+#
+# The manifest describes the compiled preprocessor, the tree ensemble and an optional ONNX graph
+# and records dtype, shape and offset of every section, so loading is JSON parsing plus array
+# views over the file mapped with np.memmap. Nothing in the file is executed
+
+MAGIC: bytes = b"SZPMODEL"
+FORMAT_VERSION: int = 1
+ALIGNMENT: int = 64
+_HEADER = struct.Struct("<8sIIQ")
+
+_ENSEMBLE_ARRAYS = ("feature", "threshold", "left", "right", "default_left", "value", "roots", "classes")
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class _SectionWriter:
+    def __init__(self):
+        self.sections: Dict[str, dict] = {}
+        self._chunks = []
+        self._size = 0
+
+    def add(self, name: str, data: Union[np.ndarray, bytes]) -> str:
+        if isinstance(data, (bytes, bytearray)):
+            raw, description = bytes(data), {"dtype": None, "shape": None}
+        else:
+            array = np.ascontiguousarray(data)
+            if array.dtype.kind == "O":
+                raise ValueError(f"Section {name} holds python objects and cannot be stored natively")
+            array = array.astype(array.dtype.newbyteorder("<"), copy=False)
+            raw, description = array.tobytes(), {"dtype": array.dtype.str, "shape": list(array.shape)}
+        start = _aligned(self._size)
+        self._chunks.append(b"\0" * (start - self._size))
+        self._chunks.append(raw)
+        self._size = start + len(raw)
+        self.sections[name] = {**description, "offset": start, "nbytes": len(raw)}
+        return name
+
+
+def save_native_model(model: SchizophreniaPredModel, file_path: str, metadata: Optional[dict] = None) -> None:
+    """
+    Method Name :   save_native_model
+    Description :   This method writes the compiled preprocessor and compiled tree ensemble of model
+                    as a native artifact. An XGBoost model is stored a second time as its UBJSON
+                    booster so the library engine can be rebuilt from the same file, and an exported
+                    ONNX graph is stored with its classes for the onnx inference engine
+
+    Output      :   Artifact written to file_path
+    On Failure  :   Write an exception log and then raise an exception
+    """
+    logging.info("Entered the save_native_model method of native_artifact")
+    try:
+        compiled_preprocessor = getattr(model, "compiled_preprocessor", None)
+        if compiled_preprocessor is None:
+            model.compile_preprocessor()
+            compiled_preprocessor = model.compiled_preprocessor
+        compiled_model = getattr(model, "compiled_model", None)
+        if compiled_preprocessor is None or compiled_model is None:
+            raise ValueError("A native artifact needs both the compiled preprocessor and the compiled model")
+
+        writer = _SectionWriter()
+        steps = []
+        for index, (kind, input_index, params) in enumerate(compiled_preprocessor.steps):
+            step = {"kind": kind, "input_index": writer.add(f"preprocessor.{index}.input_index", input_index),
+                    "params": None}
+            if params is not None:
+                step["params"] = [None if param is None else writer.add(f"preprocessor.{index}.param.{position}", param)
+                                  for position, param in enumerate(params)]
+            steps.append(step)
+
+        trained_model_object = getattr(model, "trained_model_object", None)
+        library_model = None
+        if compiled_model.kind == CompiledTreeEnsemble.XGBOOST and hasattr(trained_model_object, "get_booster"):
+            library_model = {"format": "xgboost-ubj",
+                             "blob": writer.add("model.xgboost_ubj", trained_model_object.get_booster().save_raw("ubj"))}
+
+        onnx_model = None
+        if getattr(model, "onnx_model", None) is not None:
+            onnx_model = {"blob": writer.add("model.onnx", model.onnx_model),
+                          "classes": writer.add("model.onnx_classes", np.asarray(model.onnx_classes))}
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "metadata": {
+                "model_name": str(model),
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "numpy_version": np.__version__,
+                **(metadata or {}),
+            },
+            "preprocessor": {
+                "feature_columns": compiled_preprocessor.feature_columns,
+                "yeo_johnson_variant": compiled_preprocessor.yeo_johnson_variant,
+                "n_output": compiled_preprocessor.n_output,
+                "steps": steps,
+            },
+            "model": {
+                "kind": compiled_model.kind,
+                "max_depth": int(compiled_model.max_depth),
+                "base_margin": float(compiled_model.base_margin),
+                "arrays": {name: writer.add(f"model.{name}", getattr(compiled_model, name)) for name in _ENSEMBLE_ARRAYS},
+                "library_model": library_model,
+                "onnx_model": onnx_model,
+            },
+            "sections": writer.sections,
+        }
+        manifest_bytes = json.dumps(manifest).encode("utf-8")
+        data_start = _aligned(_HEADER.size + len(manifest_bytes))
+
+        with open(file_path, "wb") as artifact_file:
+            artifact_file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(manifest_bytes)))
+            artifact_file.write(manifest_bytes)
+            artifact_file.write(b"\0" * (data_start - _HEADER.size - len(manifest_bytes)))
+            for chunk in writer._chunks:
+                artifact_file.write(chunk)
+        logging.info(f"Wrote native artifact of {model} to {file_path}")
+    except Exception as e:
+        raise SchizophreniaPredException(e, sys) from e
+
+
+def read_manifest(buffer: Union[bytes, np.ndarray]) -> dict:
+    header = bytes(buffer[:_HEADER.size])
+    if len(header) < _HEADER.size:
+        raise ValueError("File is too short to be a native model artifact")
+    magic, format_version, _, manifest_length = _HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError("File is not a native model artifact")
+    if format_version > FORMAT_VERSION:
+        raise ValueError(f"Native artifact format version {format_version} is newer than supported {FORMAT_VERSION}")
+    manifest = json.loads(bytes(buffer[_HEADER.size:_HEADER.size + manifest_length]).decode("utf-8"))
+    manifest["data_start"] = _aligned(_HEADER.size + manifest_length)
+    return manifest
+
+
+def load_native_model(source: Union[str, bytes], load_library_model: bool = False) -> SchizophreniaPredModel:
+    """
+    Method Name :   load_native_model
+    Description :   This method maps a native artifact from a file path with np.memmap, or wraps
+                    it when given as bytes, and rebuilds the model around read only array views.
+                    Processes mapping the same file share its pages
+
+    Output      :   SchizophreniaPredModel predicting through the compiled preprocessor and ensemble
+    On Failure  :   Write an exception log and then raise an exception
+    """
+    try:
+        buffer = np.memmap(source, dtype=np.uint8, mode="r") if isinstance(source, str) \
+            else np.frombuffer(source, dtype=np.uint8)
+        manifest = read_manifest(buffer)
+        data_start = manifest["data_start"]
+
+        def section(name: Optional[str]):
+            if name is None:
+                return None
+            description = manifest["sections"][name]
+            start = data_start + description["offset"]
+            if start + description["nbytes"] > len(buffer):
+                raise ValueError(f"Native artifact is truncated, section {name} is incomplete")
+            raw = buffer[start:start + description["nbytes"]]
+            if description["dtype"] is None:
+                return raw
+            return raw.view(np.dtype(description["dtype"])).reshape(description["shape"])
+
+        preprocessor = manifest["preprocessor"]
+        compiled_preprocessor = CompiledPreprocessor.from_steps(
+            steps=[(step["kind"], section(step["input_index"]),
+                    None if step["params"] is None else tuple(section(param) for param in step["params"]))
+                   for step in preprocessor["steps"]],
+            n_output=preprocessor["n_output"],
+            feature_columns=preprocessor["feature_columns"],
+            yeo_johnson_variant=preprocessor["yeo_johnson_variant"],
+        )
+
+        ensemble = manifest["model"]
+        arrays = {name: section(section_name) for name, section_name in ensemble["arrays"].items()}
+        compiled_model = CompiledTreeEnsemble(kind=ensemble["kind"], max_depth=ensemble["max_depth"],
+                                              base_margin=ensemble["base_margin"], **arrays)
+
+        trained_model_object = None
+        library_model = ensemble.get("library_model")
+        if load_library_model and library_model is not None and library_model["format"] == "xgboost-ubj":
+            from xgboost import XGBClassifier
+
+            trained_model_object = XGBClassifier()
+            trained_model_object.load_model(bytearray(section(library_model["blob"]).tobytes()))
+
+        model = SchizophreniaPredModel(preprocessing_object=None, trained_model_object=trained_model_object)
+        model.compiled_preprocessor = compiled_preprocessor
+        model.compiled_model = compiled_model
+        model.use_compiled_model = True
+        onnx_model = ensemble.get("onnx_model")
+        if onnx_model is not None:
+            # onnxruntime builds its session from bytes, the graph is copied out of the mapping
+            model.onnx_model = section(onnx_model["blob"]).tobytes()
+            model.onnx_classes = section(onnx_model["classes"])
+        model.model_name = manifest["metadata"].get("model_name")
+        model.artifact_metadata = manifest["metadata"]
+        return model
+    except Exception as e:
+        raise SchizophreniaPredException(e, sys) from e
+
+
+def is_native_artifact(content: bytes) -> bool:
+    return content[:len(MAGIC)] == MAGIC
@@ -0,0 +1,77 @@
+import importlib.util
+import sys
+from typing import Optional
+
+import numpy as np
+
+from schizophrenia_prediction.exception import SchizophreniaPredException
+from schizophrenia_prediction.logger import logging
+
+ONNX_INPUT_NAME = "input"
+ONNX_LABEL_OUTPUT = "label"
+ONNX_PROBABILITY_OUTPUT = "probabilities"
+ONNX_TARGET_OPSET = {"": 17, "ai.onnx.ml": 3}
+
+
+def onnx_runtime_available() -> bool:
+    return importlib.util.find_spec("onnxruntime") is not None
+
+
+def _register_xgboost_converter() -> None:
+    from onnxmltools.convert.xgboost.operator_converters.XGBoost import convert_xgboost
+    from skl2onnx import update_registered_converter
+    from skl2onnx.common.shape_calculator import calculate_linear_classifier_output_shapes
+    from xgboost import XGBClassifier
+
+    update_registered_converter(XGBClassifier, "XGBoostXGBClassifier", calculate_linear_classifier_output_shapes,
+                                convert_xgboost, options={"nocl": [True, False], "zipmap": [True, False, "columns"]})
+
+
+def export_onnx_model(model, validation_array: np.ndarray) -> Optional[bytes]:
+    """
+    Converts a fitted RandomForestClassifier or XGBClassifier into a serialized ONNX graph taking
+    the transformed float32 features and returns it only when its labels on validation_array are
+    identical to model.predict and its probabilities match model.predict_proba, None otherwise
+    """
+    logging.info("Entered the export_onnx_model method of onnx_model")
+    try:
+        from skl2onnx import convert_sklearn
+        from skl2onnx.common.data_types import FloatTensorType
+
+        model_name = type(model).__name__
+        if model_name == "XGBClassifier":
+            _register_xgboost_converter()
+        elif model_name != "RandomForestClassifier":
+            logging.info(f"No ONNX export for {model_name}, keeping the python objects")
+            return None
+
+        onnx_graph = convert_sklearn(model, initial_types=[(ONNX_INPUT_NAME, FloatTensorType([None, validation_array.shape[1]]))],
+                                     options={id(model): {"zipmap": False}}, target_opset=ONNX_TARGET_OPSET)
+        onnx_model = onnx_graph.SerializeToString()
+
+        labels, probabilities = create_onnx_session(onnx_model).run(
+            [ONNX_LABEL_OUTPUT, ONNX_PROBABILITY_OUTPUT], {ONNX_INPUT_NAME: validation_array.astype(np.float32)})
+        if not np.array_equal(labels, np.asarray(model.predict(validation_array))) \
+                or not np.allclose(probabilities, model.predict_proba(validation_array), atol=1e-4):
+            logging.info(f"ONNX graph disagrees with {model_name}.predict, keeping the python objects")
+            return None
+
+        logging.info(f"Exported {model_name} into an ONNX graph of {len(onnx_model)} bytes")
+        return onnx_model
+
+    except Exception as e:
+        logging.info(f"Could not export the ONNX graph, keeping the python objects: "
+                     f"{SchizophreniaPredException(e, sys)}")
+        return None
+
+
+def create_onnx_session(onnx_model: bytes, intra_op_num_threads: int = 0):
+    """
+    Creates an onnxruntime session on the CPU, intra_op_num_threads 0 lets onnxruntime use all cores
+    """
+    import onnxruntime
+
+    session_options = onnxruntime.SessionOptions()
+    session_options.intra_op_num_threads = intra_op_num_threads
+    session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return onnxruntime.InferenceSession(onnx_model, sess_options=session_options, providers=["CPUExecutionProvider"])
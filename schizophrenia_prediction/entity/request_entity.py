@@ -0,0 +1,77 @@
+from typing import List
+
+from pydantic import VERSION as PYDANTIC_VERSION
+from pydantic import BaseModel, validator
+
+# pydantic 2 rejects 12.7 for int fields by itself, pydantic 1 truncates it to 12 and needs the validators below
+PYDANTIC_V1: bool = PYDANTIC_VERSION.startswith("1.")
+
+
+def reject_fractional_float(value):
+    """
+    Integer fields only accept integral numbers, 12.0 passes and 12.7 is rejected
+    """
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"value is not a valid integer, got fractional {value}")
+    return value
+
+
+class SchizophreniaRecord(BaseModel):
+    """
+    One patient record with all features of the trained model for prediction
+    """
+    Disease_Duration: int
+    Hospitalizations: int
+    Family_History: int
+    Substance_Use: int
+    Suicide_Attempt: int
+    Positive_Symptom_Score: int
+    Negative_Symptom_Score: int
+    GAF_Score: int
+    Medication_Adherence: int
+
+    if PYDANTIC_V1:
+        _integral_features = validator("*", pre=True, allow_reuse=True)(reject_fractional_float)
+
+
+class SchizophreniaBatchResponse(BaseModel):
+    predictions: List[int]
+
+
+class SchizophreniaPredictionResponse(BaseModel):
+    """
+    Prediction of one record, probability is the model probability of the positive class
+    """
+    prediction: int
+    label: str
+    probability: float
+
+
+class PatientPredictionRequest(BaseModel):
+    patient_id: int
+
+    if PYDANTIC_V1:
+        _integral_patient_id = validator("patient_id", pre=True, allow_reuse=True)(reject_fractional_float)
+
+
+class PatientBatchPredictionRequest(BaseModel):
+    patient_ids: List[int]
+
+    if PYDANTIC_V1:
+        _integral_patient_ids = validator("patient_ids", pre=True, each_item=True,
+                                          allow_reuse=True)(reject_fractional_float)
+
+
+class PatientPredictionResponse(SchizophreniaPredictionResponse):
+    """
+    Prediction of one patient whose features were looked up by Patient_ID
+    """
+    patient_id: int
+
+
+class PatientBatchPredictionResponse(BaseModel):
+    """
+    Predictions of the patients found, unavailable lists ids that are unknown or miss feature values
+    """
+    predictions: List[PatientPredictionResponse]
+    unavailable: List[int]
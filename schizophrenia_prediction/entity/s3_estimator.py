@@ -1,7 +1,13 @@
-from schizophrenia_prediction.cloud_storage.aws_storage import SimpleStorageService
+from schizophrenia_prediction.cloud_storage.local_storage import get_storage_service
+from schizophrenia_prediction.cloud_storage.local_model_cache import LocalModelCache
+from schizophrenia_prediction.entity.config_entity import LocalModelCacheConfig
+from schizophrenia_prediction.logger import logging
 from schizophrenia_prediction.exception import SchizophreniaPredException
 from schizophrenia_prediction.entity.estimator import SchizophreniaPredModel
+from schizophrenia_prediction.entity.native_artifact import MAGIC as NATIVE_MAGIC, is_native_artifact, load_native_model
+import pickle
 import sys
+from typing import Optional
 from pandas import DataFrame
 
 
@@ -10,15 +16,21 @@ class SchizophreniaEstimator:
     This class is used to save and retrieve schizophrenia_prediction model in s3 bucket and to do prediction
     """
 
-    def __init__(self,bucket_name,model_path,):
+    def __init__(self,bucket_name,model_path,local_model_cache_config:LocalModelCacheConfig=LocalModelCacheConfig(),
+                 native_model_path:Optional[str]=None):
         """
         :param bucket_name: Name of your model bucket
         :param model_path: Location of your model in bucket
+        :param local_model_cache_config: Configuration of the on-disk cache sitting in front of s3
+        :param native_model_path: Location of the native artifact of the model, preferred over model_path when present
         """
         self.bucket_name = bucket_name
-        self.s3 = SimpleStorageService()
+        self.s3 = get_storage_service()
         self.model_path = model_path
+        self.native_model_path = native_model_path
         self.loaded_model:SchizophreniaPredModel=None
+        self.local_model_cache = LocalModelCache(local_model_cache_config) if local_model_cache_config.enabled else None
+        self._resolved_model_path:Optional[str] = None
 
 
     def is_model_present(self,model_path):
@@ -28,13 +40,70 @@ class SchizophreniaEstimator:
             print(e)
             return False
 
-    def load_model(self,)->SchizophreniaPredModel:
+    def get_model_version(self) -> str:
         """
-        Load the model from the model_path
+        Returns a token identifying the current content of the model, its VersionId when the
+        bucket is versioned and its ETag otherwise. The native artifact is read when it exists
+        and model_path otherwise, the key that answered is the one load_model reads
+        """
+        if self.native_model_path is not None:
+            try:
+                object_version = self.s3.get_object_version(bucket_name=self.bucket_name, s3_key=self.native_model_path)
+                self._resolved_model_path = self.native_model_path
+                return object_version["version_id"] or object_version["etag"]
+            except Exception as e:
+                logging.info(f"No native model artifact at {self.native_model_path}, using {self.model_path}: {e}")
+        object_version = self.s3.get_object_version(bucket_name=self.bucket_name, s3_key=self.model_path)
+        self._resolved_model_path = self.model_path
+        return object_version["version_id"] or object_version["etag"]
+
+    def _deserialize(self, model_bytes:Optional[bytes]=None, model_file:Optional[str]=None) -> SchizophreniaPredModel:
+        """
+        Native artifacts are mapped or wrapped without executing anything, pickles go through pickle.loads
+        """
+        if model_file is not None:
+            with open(model_file, "rb") as artifact_file:
+                if is_native_artifact(artifact_file.read(len(NATIVE_MAGIC))):
+                    return load_native_model(model_file)
+                artifact_file.seek(0)
+                return pickle.load(artifact_file)
+        if is_native_artifact(model_bytes):
+            return load_native_model(model_bytes)
+        return pickle.loads(model_bytes)
+
+    def load_model(self,model_version:Optional[str]=None)->SchizophreniaPredModel:
+        """
+        Load the model from the native artifact when present and from model_path otherwise,
+        through the local model cache when it is enabled. Cached native artifacts are memory mapped
+        :param model_version: ETag/VersionId of the object when the caller already read it
         :return:
         """
+        try:
+            if model_version is None or self._resolved_model_path is None:
+                model_version = self.get_model_version()
+        except Exception as e:
+            logging.info(f"Could not read the model version, loading {self.model_path} without the local model cache: {e}")
+            return self.s3.load_model(self.model_path,bucket_name=self.bucket_name)
+        model_path = self._resolved_model_path
+
+        if self.local_model_cache is None:
+            return self._deserialize(model_bytes=self.s3.read_model_bytes(model_path,bucket_name=self.bucket_name))
 
-        return self.s3.load_model(self.model_path,bucket_name=self.bucket_name)
+        model_file = self.local_model_cache.get_path(self.bucket_name, model_path, model_version)
+        if model_file is not None:
+            return self._deserialize(model_file=model_file)
+
+        model_bytes = self.s3.read_model_bytes(model_path,bucket_name=self.bucket_name)
+        try:
+            self.local_model_cache.put(self.bucket_name, model_path, model_version, model_bytes)
+            model_file = self.local_model_cache.get_path(self.bucket_name, model_path, model_version)
+        except Exception as e:
+            logging.info(f"Could not write the local model cache: {e}")
+        if model_file is None:
+            return self._deserialize(model_bytes=model_bytes)
+        # the downloaded bytes are released before the cached file is mapped
+        del model_bytes
+        return self._deserialize(model_file=model_file)
 
     def save_model(self,from_file,remove:bool=False)->None:
         """
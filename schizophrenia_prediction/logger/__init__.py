@@ -1,20 +1,199 @@
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
 
 from from_root import from_root
 from datetime import datetime
 
+from schizophrenia_prediction.constants import (LOG_ASYNC_ENABLED, LOG_FORMAT, LOG_LEVEL, LOG_MODULE_LEVELS,
+                                                LOG_ROUTE_SAMPLE_RATES)
+
 LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
 
 log_dir = 'logs'
 
 logs_path = os.path.join(from_root(), log_dir, LOG_FILE)
 
-os.makedirs(log_dir, exist_ok=True)
+os.makedirs(os.path.dirname(logs_path), exist_ok=True)
+
+# route of the request being served, set by the serving middleware and read by the filters and formatter
+log_route: ContextVar[Optional[str]] = ContextVar("log_route", default=None)
+
+
+def _parse_pairs(value: str) -> Dict[str, str]:
+    pairs = {}
+    for item in value.split(","):
+        if "=" in item:
+            key, setting = item.rsplit("=", 1)
+            pairs[key.strip()] = setting.strip()
+    return pairs
+
+
+def _parse_level(setting: str, invalid_levels: Dict[str, str], name: str) -> int:
+    """
+    Level number of a level name or number, unknown settings fall back to INFO and are
+    collected in invalid_levels so they can be reported once logging is set up
+    """
+    if setting.strip().isdigit():
+        return int(setting)
+    level = logging.getLevelName(setting.strip().upper())
+    if isinstance(level, int):
+        return level
+    invalid_levels[name] = setting
+    return logging.INFO
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats every record as one JSON object per line
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        route = getattr(record, "route", None)
+        if route is not None:
+            payload["route"] = route
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class RawRecordQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues the record as it is. The default prepare formats the message on the calling
+    thread, here formatting is left to the listener thread writing the record
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class ModuleLevelFilter(logging.Filter):
+    """
+    Applies a minimum level per module. All code logs through the root logger, so the
+    module the call was made from is the only thing telling records apart
+    """
+
+    def __init__(self, default_level: int, module_levels: Dict[str, int]):
+        super().__init__()
+        self.default_level = default_level
+        self.module_levels = module_levels
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= self.module_levels.get(record.module, self.default_level)
+
+
+class RouteSamplingFilter(logging.Filter):
+    """
+    Rate limits records below WARNING per route with a token bucket of records_per_second
+    tokens. Records logged outside of a request or on routes without a rate always pass
+    """
+
+    def __init__(self, route_rates: Dict[str, float]):
+        super().__init__()
+        self.route_rates = route_rates
+        self._buckets: Dict[str, list] = {}
+        self._lock = threading.Lock()
+        self.dropped: Dict[str, int] = {}
 
+    def filter(self, record: logging.LogRecord) -> bool:
+        route = log_route.get()
+        record.route = route
+        rate = self.route_rates.get(route)
+        if rate is None or record.levelno >= logging.WARNING:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.setdefault(route, [rate, now])
+            bucket[0] = min(rate, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True
+            self.dropped[route] = self.dropped.get(route, 0) + 1
+            return False
+
+
+invalid_log_levels: Dict[str, str] = {}
+log_level = _parse_level(LOG_LEVEL, invalid_log_levels, "LOG_LEVEL")
+module_levels = {module: _parse_level(level, invalid_log_levels, f"LOG_MODULE_LEVELS[{module}]")
+                 for module, level in _parse_pairs(LOG_MODULE_LEVELS).items()}
+route_sampling_filter = RouteSamplingFilter(
+    route_rates={route: float(rate) for route, rate in _parse_pairs(LOG_ROUTE_SAMPLE_RATES).items()})
+
+# delay=True opens the log file on the first record instead of at import time
+file_handler = logging.FileHandler(logs_path, delay=True)
+if LOG_FORMAT.lower() == "json":
+    file_handler.setFormatter(JsonFormatter())
+else:
+    file_handler.setFormatter(logging.Formatter("[ %(asctime)s ] %(name)s - %(levelname)s - %(message)s"))
+
+log_handler: logging.Handler = file_handler
+log_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _start_log_listener() -> None:
+    """
+    Starts the thread writing queued records. Forked children get a fresh queue and
+    listener since the parent's thread does not survive the fork
+    """
+    global log_listener
+    log_handler.queue = queue.SimpleQueue()
+    log_listener = logging.handlers.QueueListener(log_handler.queue, file_handler)
+    log_listener.start()
+
+
+def _stop_log_listener() -> None:
+    global log_listener
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+
+
+def _register_log_listener_finalizer(_=None) -> None:
+    import multiprocessing.util
+
+    multiprocessing.util.Finalize(None, _stop_log_listener, exitpriority=0)
+
+
+def _restart_log_listener_in_child() -> None:
+    # multiprocessing children leave through os._exit and skip atexit, so the queue is flushed by
+    # a multiprocessing finalizer, registered after the child has reset the inherited finalizers
+    import multiprocessing.util
+
+    _start_log_listener()
+    multiprocessing.util.register_after_fork(log_handler, _register_log_listener_finalizer)
+
+
+if LOG_ASYNC_ENABLED:
+    # the request path only enqueues the record, the listener thread formats and writes it
+    log_handler = RawRecordQueueHandler(queue.SimpleQueue())
+    _start_log_listener()
+    os.register_at_fork(after_in_child=_restart_log_listener_in_child)
+    atexit.register(_stop_log_listener)
+
+# filters sit in front of the queue so that dropped records cost neither a put nor a write
+log_handler.addFilter(ModuleLevelFilter(default_level=log_level, module_levels=module_levels))
+log_handler.addFilter(route_sampling_filter)
 
 logging.basicConfig(
-    filename=logs_path,
-    format="[ %(asctime)s ] %(name)s - %(levelname)s - %(message)s",
-    level=logging.DEBUG,
-)
\ No newline at end of file
+    level=min([log_level, *module_levels.values()]),
+    handlers=[log_handler],
+)
+
+for setting_name, setting in invalid_log_levels.items():
+    logging.warning(f"Unknown log level {setting!r} in {setting_name}, using INFO")
@@ -0,0 +1,180 @@
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from schizophrenia_prediction.constants import PREDICTION_FEATURE_COLUMNS
+from schizophrenia_prediction.entity.config_entity import BatchScoringConfig, SchizophreniaPredConfig
+from schizophrenia_prediction.exception import SchizophreniaPredException
+from schizophrenia_prediction.logger import logging
+from schizophrenia_prediction.serving.model_holder import get_model_holder
+
+
+_worker_prediction_pipeline_config: SchizophreniaPredConfig = None
+
+
+def _init_worker(prediction_pipeline_config: SchizophreniaPredConfig) -> None:
+    """
+    Process pool initializer, loads the model once per worker process
+    """
+    global _worker_prediction_pipeline_config
+    _worker_prediction_pipeline_config = prediction_pipeline_config
+    get_model_holder(prediction_pipeline_config).load()
+
+
+def score_chunk(chunk: pd.DataFrame, prediction_column: str) -> pd.DataFrame:
+    """
+    Scores one chunk with the warm model of the current process and returns it with the prediction column added
+    """
+    prediction_pipeline_config = _worker_prediction_pipeline_config or SchizophreniaPredConfig()
+    model = get_model_holder(prediction_pipeline_config).get_model()
+    return predict_chunk(model, chunk, prediction_column)
+
+
+def predict_chunk(model, chunk: pd.DataFrame, prediction_column: str) -> pd.DataFrame:
+    """
+    Scores one chunk with the given model and returns it with the prediction column added
+    """
+    missing_columns = [column for column in PREDICTION_FEATURE_COLUMNS if column not in chunk.columns]
+    if missing_columns:
+        raise ValueError(f"Input is missing the feature columns {missing_columns}")
+    input_array = chunk[PREDICTION_FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    chunk[prediction_column] = model.predict_array(input_array)
+    return chunk
+
+
+class BatchPredictionPipeline:
+    """
+    This class scores a CSV or Parquet file of patients offline. The file is read as a stream of
+    fixed size chunks, chunks are scored on a process pool with the model loaded once per worker
+    and results are appended to the output file in input order, so memory stays bounded by
+    chunk_size * (max_workers * 2) rows whatever the size of the file
+    """
+
+    def __init__(self, batch_scoring_config: BatchScoringConfig = BatchScoringConfig(),
+                 prediction_pipeline_config: SchizophreniaPredConfig = SchizophreniaPredConfig()):
+        """
+        :param batch_scoring_config: Configuration with chunk size, number of workers and output column
+        :param prediction_pipeline_config: Configuration of the model to score with
+        """
+        self.batch_scoring_config = batch_scoring_config
+        self.prediction_pipeline_config = prediction_pipeline_config
+
+    @staticmethod
+    def read_chunks(file_path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+        """
+        Method Name :   read_chunks
+        Description :   This method yields the input file chunk by chunk without loading it whole
+
+        Output      :   Generator of DataFrames of at most chunk_size rows
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            if file_path.endswith(".parquet"):
+                import pyarrow.parquet as pq
+
+                parquet_file = pq.ParquetFile(file_path)
+                for record_batch in parquet_file.iter_batches(batch_size=chunk_size):
+                    yield record_batch.to_pandas()
+            else:
+                for chunk in pd.read_csv(file_path, chunksize=chunk_size):
+                    yield chunk
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+    class _ChunkWriter:
+        def __init__(self, file_path: str):
+            self.file_path = file_path
+            self._parquet_writer = None
+            self._header_written = False
+            dir_path = os.path.dirname(file_path)
+            if dir_path:
+                os.makedirs(dir_path, exist_ok=True)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+        def write(self, chunk: pd.DataFrame) -> None:
+            if self.file_path.endswith(".parquet"):
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if self._parquet_writer is None:
+                    self._parquet_writer = pq.ParquetWriter(self.file_path, table.schema)
+                self._parquet_writer.write_table(table)
+            else:
+                chunk.to_csv(self.file_path, mode="a", index=False, header=not self._header_written)
+                self._header_written = True
+
+        def close(self) -> None:
+            if self._parquet_writer is not None:
+                self._parquet_writer.close()
+
+    def run(self, input_file_path: str, output_file_path: str) -> dict:
+        """
+        Method Name :   run
+        Description :   This method streams input_file_path through the process pool into output_file_path
+
+        Output      :   Returns the number of rows and chunks scored and the elapsed seconds
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the run method of BatchPredictionPipeline class")
+        try:
+            start = time.perf_counter()
+            rows, chunks = 0, 0
+            max_workers = self.batch_scoring_config.max_workers
+            max_in_flight = max_workers * 2
+            prediction_column = self.batch_scoring_config.prediction_column
+            writer = BatchPredictionPipeline._ChunkWriter(output_file_path)
+
+            try:
+                with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                         initargs=(self.prediction_pipeline_config,)) as executor:
+                    in_flight = deque()
+                    for chunk in BatchPredictionPipeline.read_chunks(input_file_path, self.batch_scoring_config.chunk_size):
+                        in_flight.append(executor.submit(score_chunk, chunk, prediction_column))
+                        if len(in_flight) >= max_in_flight:
+                            scored = in_flight.popleft().result()
+                            writer.write(scored)
+                            rows, chunks = rows + len(scored), chunks + 1
+                    while in_flight:
+                        scored = in_flight.popleft().result()
+                        writer.write(scored)
+                        rows, chunks = rows + len(scored), chunks + 1
+            finally:
+                writer.close()
+
+            elapsed = time.perf_counter() - start
+            logging.info(f"Scored {rows} rows in {chunks} chunks in {elapsed:.2f} seconds into {output_file_path}")
+            logging.info("Exited the run method of BatchPredictionPipeline class")
+            return {"rows": rows, "chunks": chunks, "seconds": elapsed}
+
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file of patients with the production model")
+    parser.add_argument("--input", required=True, help="CSV or .parquet file holding the model feature columns")
+    parser.add_argument("--output", required=True, help="CSV or .parquet file the scored rows are written to")
+    parser.add_argument("--chunk-size", type=int, default=BatchScoringConfig.chunk_size)
+    parser.add_argument("--workers", type=int, default=BatchScoringConfig.max_workers)
+    parser.add_argument("--prediction-column", default=BatchScoringConfig.prediction_column)
+    args = parser.parse_args()
+
+    batch_prediction_pipeline = BatchPredictionPipeline(
+        batch_scoring_config=BatchScoringConfig(chunk_size=args.chunk_size, max_workers=args.workers,
+                                                prediction_column=args.prediction_column)
+    )
+    result = batch_prediction_pipeline.run(input_file_path=args.input, output_file_path=args.output)
+    print(f"Scored {result['rows']} rows in {result['chunks']} chunks in {result['seconds']:.2f} seconds")
+
+
+if __name__ == "__main__":
+    main()
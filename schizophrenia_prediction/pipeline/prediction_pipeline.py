@@ -1,13 +1,16 @@
-import os
 import sys
 
 import numpy as np
-import pandas as pd
+from typing import List, Optional, Tuple
+
+from schizophrenia_prediction.constants import PREDICTION_FEATURE_COLUMNS
 from schizophrenia_prediction.entity.config_entity import SchizophreniaPredConfig
-from schizophrenia_prediction.entity.s3_estimator import SchizophreniaEstimator
+from schizophrenia_prediction.serving.metrics import observe_seconds, predict_stage_histogram
+from schizophrenia_prediction.serving.model_holder import ModelHolder, get_model_holder
+from schizophrenia_prediction.serving.model_registry import get_model_registry
+from schizophrenia_prediction.serving.prediction_cache import get_prediction_cache
 from schizophrenia_prediction.exception import SchizophreniaPredException
 from schizophrenia_prediction.logger import logging
-from schizophrenia_prediction.utils.main_utils import read_yaml_file
 from pandas import DataFrame
 
 
@@ -55,6 +58,20 @@ class SchizophreniaData:
             raise SchizophreniaPredException(e, sys) from e
 
 
+    def get_schizophrenia_input_array(self) -> np.ndarray:
+        """
+        This function parses the inputs straight into a preallocated float array in
+        PREDICTION_FEATURE_COLUMNS order, the input of SchizophreniaClassifier.predict_array
+        """
+        try:
+            input_array = np.empty((1, len(PREDICTION_FEATURE_COLUMNS)), dtype=np.float64)
+            for index, column in enumerate(PREDICTION_FEATURE_COLUMNS):
+                input_array[0, index] = float(getattr(self, column))
+            return input_array
+
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
     def get_schizophrenia_data_as_dict(self):
         """
         This function returns a dictionary from SchizophreniaData class input 
@@ -74,7 +91,7 @@ class SchizophreniaData:
                 "Medication_Adherence": [self.Medication_Adherence]
             }  
 
-            logging.info(input_data)
+            logging.debug(input_data)
 
             logging.info("Created schizophrenia data dict")
 
@@ -85,17 +102,66 @@ class SchizophreniaData:
         except Exception as e:
             raise SchizophreniaPredException(e, sys) from e
 
+class SchizophreniaBatchData:
+    def __init__(self, records: List[object]):
+        """
+        schizophrenia batch Data constructor
+        Input: list of records exposing all features of the trained model as attributes
+        """
+        self.records = records
+
+    def get_schizophrenia_input_data_frame(self) -> DataFrame:
+        """
+        This function returns one DataFrame holding every record of the batch,
+        so that the preprocessor and the model run once for the whole batch
+        """
+        try:
+            logging.info(f"Creating schizophrenia batch data frame of {len(self.records)} records")
+            return DataFrame(
+                {
+                    column: [getattr(record, column) for record in self.records]
+                    for column in PREDICTION_FEATURE_COLUMNS
+                },
+                columns=PREDICTION_FEATURE_COLUMNS,
+            )
+
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+    def get_schizophrenia_input_array(self) -> np.ndarray:
+        """
+        This function returns a float array of shape (records, features) in PREDICTION_FEATURE_COLUMNS order
+        """
+        try:
+            input_array = np.empty((len(self.records), len(PREDICTION_FEATURE_COLUMNS)), dtype=np.float64)
+            for row, record in enumerate(self.records):
+                for index, column in enumerate(PREDICTION_FEATURE_COLUMNS):
+                    input_array[row, index] = float(getattr(record, column))
+            return input_array
+
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+
 class SchizophreniaClassifier:
-    def __init__(self,prediction_pipeline_config: SchizophreniaPredConfig = SchizophreniaPredConfig(),) -> None:
+    def __init__(self,prediction_pipeline_config: SchizophreniaPredConfig = SchizophreniaPredConfig(),
+                 model_version: Optional[str] = None) -> None:
         """
         :param prediction_pipeline_config: Configuration for prediction the value
+        :param model_version: Registry version to predict with, None for the production model
         """
         try:
             # self.schema_config = read_yaml_file(SCHEMA_FILE_PATH)
             self.prediction_pipeline_config = prediction_pipeline_config
+            self.model_version = model_version
         except Exception as e:
             raise SchizophreniaPredException(e, sys)
 
+    def _get_model_holder(self) -> ModelHolder:
+        if self.model_version is None:
+            return get_model_holder(self.prediction_pipeline_config)
+        return get_model_registry().get_holder(self.model_version)
+
 
     def predict(self, dataframe) -> str:
         """
@@ -104,13 +170,65 @@ class SchizophreniaClassifier:
         """
         try:
             logging.info("Entered predict method of schizophreniaClassifier class")
-            model = SchizophreniaEstimator(
-                bucket_name=self.prediction_pipeline_config.model_bucket_name,
-                model_path=self.prediction_pipeline_config.model_file_path,
-            )
+            model = self._get_model_holder().get_model()
             result =  model.predict(dataframe)
             
             return result
         
         except Exception as e:
-            raise SchizophreniaPredException(e, sys)
\ No newline at end of file
+            raise SchizophreniaPredException(e, sys)
+
+    def predict_array(self, array: np.ndarray, use_cache: bool = True) -> np.ndarray:
+        """
+        This is the fast path of predict for inputs parsed into a float array. Large service to
+        service batches pass use_cache=False to skip the per row cache lookups
+        Returns: Predictions as a numpy array
+        """
+        try:
+            with observe_seconds(predict_stage_histogram("model_load")):
+                model, version = self._get_model_holder().get_model_with_version()
+            prediction_cache = get_prediction_cache()
+            if not prediction_cache.enabled or not use_cache:
+                return self._predict_uncached(model, array)
+
+            model_version = (self.prediction_pipeline_config.model_bucket_name,
+                             self.prediction_pipeline_config.model_file_path, self.model_version, version)
+            with observe_seconds(predict_stage_histogram("cache_lookup")):
+                predictions = [prediction_cache.get(model_version, row) for row in array]
+            missing = [index for index, prediction in enumerate(predictions) if prediction is None]
+            if missing:
+                for index, prediction in zip(missing, self._predict_uncached(model, array[missing])):
+                    predictions[index] = prediction
+                    prediction_cache.put(model_version, array[index], prediction)
+
+            return np.asarray(predictions)
+
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+    def predict_with_probability(self, array: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        This is the path of the JSON api, it bypasses the prediction cache since that only keeps labels
+        Returns: Predicted labels and the probability of the positive class of every row
+        """
+        try:
+            with observe_seconds(predict_stage_histogram("model_load")):
+                model, _ = self._get_model_holder().get_model_with_version()
+            with observe_seconds(predict_stage_histogram("transform")):
+                transformed_array = model.transform_array(array)
+            with observe_seconds(predict_stage_histogram("predict")):
+                probabilities = np.asarray(model.predict_proba_transformed(transformed_array))
+            classes = np.asarray(model.classes)
+            # argmax over the class probabilities is how both the forest and the binary booster pick their label
+            predictions = classes[np.argmax(probabilities, axis=1)]
+            return predictions, probabilities[:, list(classes).index(1)]
+
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+    @staticmethod
+    def _predict_uncached(model, array: np.ndarray) -> np.ndarray:
+        with observe_seconds(predict_stage_histogram("transform")):
+            transformed_array = model.transform_array(array)
+        with observe_seconds(predict_stage_histogram("predict")):
+            return model.predict_transformed(transformed_array)
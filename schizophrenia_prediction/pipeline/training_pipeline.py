@@ -1,4 +1,5 @@
 import sys
+from typing import Callable, Optional
 from schizophrenia_prediction.exception import SchizophreniaPredException
 from schizophrenia_prediction.logger import logging
 from schizophrenia_prediction.components.data_ingestion import DataIngestion
@@ -25,7 +26,11 @@ from schizophrenia_prediction.entity.artifact_entity import (DataIngestionArtifa
 
 
 class TrainPipeline:
-    def __init__(self):
+    def __init__(self, progress_callback: Optional[Callable[[str], None]] = None):
+        """
+        :param progress_callback: Called with the name of every stage in TRAINING_PIPELINE_STAGES when it starts
+        """
+        self.progress_callback = progress_callback
         self.data_ingestion_config = DataIngestionConfig()
         self.data_validation_config = DataValidationConfig()
         self.data_transformation_config = DataTransformationConfig()
@@ -145,22 +150,33 @@ class TrainPipeline:
         
 
     
+    def report_stage(self, stage: str) -> None:
+        logging.info(f"Starting {stage} stage of TrainPipeline")
+        if self.progress_callback is not None:
+            self.progress_callback(stage)
+
     def run_pipeline(self, ) -> None:
         """
         This method of TrainPipeline class is responsible for running complete pipeline
         """
         try:
+            self.report_stage("data_ingestion")
             data_ingestion_artifact = self.start_data_ingestion()
+            self.report_stage("data_validation")
             data_validation_artifact = self.start_data_validation(data_ingestion_artifact=data_ingestion_artifact)
+            self.report_stage("data_transformation")
             data_transformation_artifact = self.start_data_transformation(
                 data_ingestion_artifact=data_ingestion_artifact, data_validation_artifact=data_validation_artifact)
+            self.report_stage("model_trainer")
             model_trainer_artifact = self.start_model_trainer(data_transformation_artifact=data_transformation_artifact)
+            self.report_stage("model_evaluation")
             model_evaluation_artifact = self.start_model_evaluation(data_ingestion_artifact=data_ingestion_artifact,
                                                                     model_trainer_artifact=model_trainer_artifact)
             
             if not model_evaluation_artifact.is_model_accepted:
                 logging.info(f"Model not accepted.")
                 return None
+            self.report_stage("model_pusher")
             model_pusher_artifact = self.start_model_pusher(model_evaluation_artifact=model_evaluation_artifact)
 
         except Exception as e:
@@ -0,0 +1,152 @@
+import asyncio
+import sys
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque
+
+from schizophrenia_prediction.entity.config_entity import AdmissionControlConfig
+from schizophrenia_prediction.exception import SchizophreniaPredException
+from schizophrenia_prediction.serving.metrics import REGISTRY
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request is shed instead of admitted, carries the response status and reason
+    """
+
+    def __init__(self, status_code: int, reason: str, retry_after_seconds: int):
+        super().__init__(f"Request rejected: {reason}")
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after_seconds = retry_after_seconds
+
+
+class AdmissionController:
+    """
+    This class caps the number of prediction requests in flight on the event loop. Requests
+    beyond the limit wait in a bounded FIFO queue for a free slot, requests finding the queue
+    full or waiting longer than the queue timeout are rejected right away so that latency of the
+    admitted ones stays bounded under overload
+    """
+
+    QUEUE_FULL: str = "queue_full"
+    QUEUE_TIMEOUT: str = "queue_timeout"
+
+    def __init__(self, admission_control_config: AdmissionControlConfig = AdmissionControlConfig()):
+        """
+        :param admission_control_config: Configuration with the concurrency limit and the queue bounds
+        """
+        try:
+            if admission_control_config.max_concurrency < 1:
+                raise ValueError("Admission control needs a concurrency limit of at least one")
+            if admission_control_config.max_queue_size < 0:
+                raise ValueError("Admission queue size can not be negative")
+            self.admission_control_config = admission_control_config
+            self.in_flight = 0
+            self._waiters: Deque[asyncio.Future] = deque()
+            self.wait_histogram = REGISTRY.histogram(
+                "schizophrenia_admission_wait_seconds", "Time admitted requests waited in the admission queue",
+                buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+            self._admitted_counter = REGISTRY.counter("schizophrenia_admission_admitted_total",
+                                                      "Requests admitted by the admission controller")
+            self._rejection_counters = {
+                reason: REGISTRY.counter("schizophrenia_admission_rejections_total",
+                                         "Requests shed by the admission controller", reason=reason)
+                for reason in (AdmissionController.QUEUE_FULL, AdmissionController.QUEUE_TIMEOUT)
+            }
+            REGISTRY.register_collector("schizophrenia_admission_in_flight", "gauge",
+                                        "Admitted requests currently being served", lambda: [({}, self.in_flight)])
+            REGISTRY.register_collector("schizophrenia_admission_queue_depth", "gauge",
+                                        "Requests waiting in the admission queue", lambda: [({}, self.queue_depth)])
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _reject(self, reason: str, status_code: int) -> AdmissionRejected:
+        self._rejection_counters[reason].inc()
+        return AdmissionRejected(status_code, reason, self.admission_control_config.retry_after_seconds)
+
+    async def acquire(self) -> None:
+        """
+        Method Name :   acquire
+        Description :   This method takes a slot for the request, waiting in the queue when all slots are taken
+
+        Output      :   Returns once the request is admitted
+        On Failure  :   Raises AdmissionRejected with 429 when the queue is full and 503 when the wait timed out
+        """
+        if self.in_flight < self.admission_control_config.max_concurrency and not self._waiters:
+            self.in_flight += 1
+            self._admitted_counter.inc()
+            self.wait_histogram.observe(0.0)
+            return
+        if len(self._waiters) >= self.admission_control_config.max_queue_size:
+            raise self._reject(AdmissionController.QUEUE_FULL, 429)
+
+        start = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # asyncio.wait leaves the future alone on timeout, so a slot handed over at the last moment is not lost
+            await asyncio.wait({waiter}, timeout=self.admission_control_config.queue_timeout_seconds)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        if not waiter.done():
+            self._abandon(waiter)
+            raise self._reject(AdmissionController.QUEUE_TIMEOUT, 503)
+        self._admitted_counter.inc()
+        self.wait_histogram.observe(time.perf_counter() - start)
+
+    def _abandon(self, waiter: asyncio.Future) -> None:
+        if waiter.done() and not waiter.cancelled():
+            # the slot was handed over after the waiter gave up, pass it on
+            self.release()
+            return
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self) -> None:
+        """
+        Hands the slot of a finished request to the oldest waiter, or frees it when nobody waits
+        """
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def is_admitted_route(self, path: str) -> bool:
+        return any(path == route or path.startswith(route.rstrip("/") + "/")
+                   for route in self.admission_control_config.admitted_routes)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.admission_control_config.enabled,
+            "config": {
+                "max_concurrency": self.admission_control_config.max_concurrency,
+                "max_queue_size": self.admission_control_config.max_queue_size,
+                "queue_timeout_seconds": self.admission_control_config.queue_timeout_seconds,
+                "admitted_routes": list(self.admission_control_config.admitted_routes),
+            },
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "admitted": self._admitted_counter.value,
+            "rejections": {reason: counter.value for reason, counter in self._rejection_counters.items()},
+            "wait_histogram": self.wait_histogram.snapshot(),
+        }
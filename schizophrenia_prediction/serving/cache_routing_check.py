@@ -0,0 +1,126 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from schizophrenia_prediction.exception import SchizophreniaPredException
+
+_MODEL_VERSIONS = ("v1", "v2")
+_ROWS = 20
+_ROUTING_KEYS = 40
+
+
+def _probe() -> dict:
+    """
+    Pushes two registry versions to the local model storage, routes clients between them with an
+    even A/B split and counts the prediction cache lookups. Runs in the interpreter started by
+    check_cache_routing, whose environment points the serving modules at the temporary storage
+    """
+    import pickle
+
+    import numpy as np
+    import pandas as pd
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.tree import DecisionTreeClassifier
+
+    from schizophrenia_prediction.constants import PREDICTION_FEATURE_COLUMNS
+    from schizophrenia_prediction.entity.config_entity import ModelRegistryConfig
+    from schizophrenia_prediction.entity.estimator import SchizophreniaPredModel
+    from schizophrenia_prediction.pipeline.prediction_pipeline import SchizophreniaClassifier
+    from schizophrenia_prediction.serving.model_registry import ModelRouter, get_model_registry
+    from schizophrenia_prediction.serving.prediction_cache import get_prediction_cache
+
+    rng = np.random.default_rng(0)
+    features = pd.DataFrame({column: rng.integers(0, 100, 500) for column in PREDICTION_FEATURE_COLUMNS})
+    target = (features.iloc[:, 0] + rng.normal(0, 20, len(features)) > 50).astype(int)
+    preprocessor = ColumnTransformer([("StandardScaler", StandardScaler(), list(PREDICTION_FEATURE_COLUMNS))])
+    transformed = preprocessor.fit_transform(features)
+
+    registry_config = ModelRegistryConfig()
+    models = {}
+    for depth, model_version in enumerate(_MODEL_VERSIONS, start=1):
+        models[model_version] = DecisionTreeClassifier(max_depth=depth * 4, random_state=0).fit(transformed, target)
+        registry_dir = os.path.join(os.environ["MODEL_STORAGE_LOCAL_DIR"], registry_config.bucket_name,
+                                    registry_config.model_registry_prefix, model_version)
+        os.makedirs(registry_dir, exist_ok=True)
+        with open(os.path.join(registry_dir, "model.pkl"), "wb") as model_file:
+            pickle.dump(SchizophreniaPredModel(preprocessor, models[model_version]), model_file)
+
+    rows = features.iloc[:_ROWS].to_numpy(dtype=float)
+    expected = {model_version: model.predict(transformed[:_ROWS]) for model_version, model in models.items()}
+    router = ModelRouter(",".join(f"{model_version}={1 / len(_MODEL_VERSIONS)}" for model_version in _MODEL_VERSIONS))
+    prediction_cache = get_prediction_cache()
+    routed = {model_version: 0 for model_version in _MODEL_VERSIONS}
+    mismatches = 0
+    for index in range(_ROUTING_KEYS):
+        model_version = router.resolve(routing_key=f"client-{index}")
+        routed[model_version] += 1
+        predictions = SchizophreniaClassifier(model_version=model_version).predict_array(rows)
+        mismatches += int((predictions != expected[model_version]).sum())
+
+    cache_stats = prediction_cache.stats()
+    return {
+        "routed": routed,
+        "resident_versions": sorted(get_model_registry().stats()["versions"]),
+        "cache_hits": cache_stats["hits"],
+        "cache_misses": cache_stats["misses"],
+        "expected_cache_misses": _ROWS * sum(1 for count in routed.values() if count),
+        "prediction_mismatches": mismatches,
+    }
+
+
+def check_cache_routing() -> dict:
+    """
+    Method Name :   check_cache_routing
+    Description :   This method routes clients between two resident registry versions in a fresh
+                    interpreter and lists under "violations" every way the prediction cache failed
+                    to keep serving the entries of both versions
+
+    Output      :   Measurement of the routing run with its violations
+    On Failure  :   Write an exception log and then raise an exception
+    """
+    try:
+        with tempfile.TemporaryDirectory() as storage_dir:
+            env = dict(os.environ, MODEL_STORAGE_BACKEND="local", MODEL_STORAGE_LOCAL_DIR=storage_dir,
+                       MODEL_CACHE_DIR=os.path.join(storage_dir, "model_cache"),
+                       SERVING_PREDICTION_CACHE_ENABLED="true")
+            completed = subprocess.run([sys.executable, "-m", __spec__.name, "--probe"],
+                                       capture_output=True, text=True, check=True, env=env)
+            measurement = json.loads(completed.stdout.strip().splitlines()[-1])
+    except Exception as e:
+        raise SchizophreniaPredException(e, sys) from e
+
+    violations = []
+    for model_version, count in measurement["routed"].items():
+        if not count:
+            violations.append(f"no client was routed to {model_version}")
+        if model_version not in measurement["resident_versions"]:
+            violations.append(f"{model_version} is not resident in the model registry")
+    if measurement["cache_misses"] > measurement["expected_cache_misses"]:
+        violations.append(f"{measurement['cache_misses']} cache misses, only the first prediction of each row "
+                          f"per version should miss ({measurement['expected_cache_misses']})")
+    if measurement["prediction_mismatches"]:
+        violations.append(f"{measurement['prediction_mismatches']} cached predictions differ from the "
+                          f"model version they were routed to")
+    measurement["violations"] = violations
+    return measurement
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check that the prediction cache serves every resident model version")
+    parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        print(json.dumps(_probe()))
+        return
+    result = check_cache_routing()
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if result["violations"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import importlib.util
+from typing import Dict
+
+import numpy as np
+
+from schizophrenia_prediction.constants import PREDICTION_FEATURE_COLUMNS
+
+ARROW_STREAM_CONTENT_TYPE: str = "application/vnd.apache.arrow.stream"
+MSGPACK_CONTENT_TYPE: str = "application/x-msgpack"
+
+# content type -> module the codec needs, both libraries are optional and imported on first use
+_CODEC_MODULES: Dict[str, str] = {
+    ARROW_STREAM_CONTENT_TYPE: "pyarrow",
+    MSGPACK_CONTENT_TYPE: "msgpack",
+    "application/msgpack": "msgpack",
+}
+
+
+def normalize_content_type(content_type: str) -> str:
+    return content_type.split(";", 1)[0].strip().lower()
+
+
+def codec_available(content_type: str) -> bool:
+    module_name = _CODEC_MODULES.get(normalize_content_type(content_type))
+    return module_name is not None and importlib.util.find_spec(module_name) is not None
+
+
+def assemble_feature_array(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Lays the feature columns out as the row major float array in PREDICTION_FEATURE_COLUMNS
+    order the model takes. This is the single copy on the way in, columns that are not
+    model features are ignored
+    """
+    missing = [column for column in PREDICTION_FEATURE_COLUMNS if column not in columns]
+    if missing:
+        raise ValueError(f"Payload is missing feature columns: {missing}")
+    for column in PREDICTION_FEATURE_COLUMNS:
+        if np.ndim(columns[column]) != 1:
+            raise ValueError(f"Column {column} has to be a flat sequence of numbers")
+    n_rows = len(columns[PREDICTION_FEATURE_COLUMNS[0]])
+    feature_array = np.empty((n_rows, len(PREDICTION_FEATURE_COLUMNS)), dtype=np.float64)
+    for index, column in enumerate(PREDICTION_FEATURE_COLUMNS):
+        values = columns[column]
+        if len(values) != n_rows:
+            raise ValueError(f"Column {column} has {len(values)} values, expected {n_rows}")
+        try:
+            feature_array[:, index] = values
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Column {column} holds values that are not numbers: {e}") from e
+    return feature_array
+
+
+def decode_arrow(body: bytes) -> np.ndarray:
+    """
+    Reads an Arrow IPC stream. The buffers are wrapped instead of copied and null free
+    primitive columns come out as numpy views over them
+    """
+    import pyarrow as pa
+
+    table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    columns = {}
+    for column in PREDICTION_FEATURE_COLUMNS:
+        if column not in table.column_names:
+            continue
+        chunked_array = table.column(column)
+        if chunked_array.null_count:
+            raise ValueError(f"Column {column} contains {chunked_array.null_count} null values")
+        if chunked_array.num_chunks == 1:
+            columns[column] = chunked_array.chunk(0).to_numpy(zero_copy_only=False)
+        else:
+            columns[column] = chunked_array.to_numpy()
+    return assemble_feature_array(columns)
+
+
+def encode_arrow(predictions: np.ndarray, column_name: str = "prediction") -> bytes:
+    import pyarrow as pa
+
+    table = pa.table({column_name: pa.array(np.asarray(predictions, dtype=np.int64))})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def decode_msgpack(body: bytes) -> np.ndarray:
+    """
+    Reads a msgpack map of feature name to either a list of numbers or the raw little
+    endian float64 bytes of the column. Raw bytes are viewed in place with np.frombuffer
+    """
+    import msgpack
+
+    payload = msgpack.unpackb(body, raw=False)
+    if not isinstance(payload, dict):
+        raise ValueError("Msgpack payload has to be a map of feature name to column values")
+    columns = {}
+    for column in PREDICTION_FEATURE_COLUMNS:
+        if column not in payload:
+            continue
+        values = payload[column]
+        if isinstance(values, (bytes, bytearray)):
+            if len(values) % 8:
+                raise ValueError(f"Column {column} has {len(values)} raw bytes, not a multiple of 8")
+            columns[column] = np.frombuffer(values, dtype="<f8")
+        elif isinstance(values, (list, tuple)):
+            try:
+                columns[column] = np.asarray(values, dtype=np.float64)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Column {column} holds values that are not numbers: {e}") from e
+        else:
+            raise ValueError(f"Column {column} has to be a list of numbers or raw float64 bytes, "
+                             f"got {type(values).__name__}")
+    return assemble_feature_array(columns)
+
+
+def encode_msgpack(predictions: np.ndarray) -> bytes:
+    import msgpack
+
+    return msgpack.packb({"predictions": np.asarray(predictions, dtype=np.int64).tolist()})
+
+
+def decode_columnar(content_type: str, body: bytes) -> np.ndarray:
+    if normalize_content_type(content_type) == ARROW_STREAM_CONTENT_TYPE:
+        return decode_arrow(body)
+    return decode_msgpack(body)
+
+
+def encode_columnar(content_type: str, predictions: np.ndarray) -> bytes:
+    if normalize_content_type(content_type) == ARROW_STREAM_CONTENT_TYPE:
+        return encode_arrow(predictions)
+    return encode_msgpack(predictions)
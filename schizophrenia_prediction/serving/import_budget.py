@@ -0,0 +1,65 @@
+import argparse
+import json
+import subprocess
+import sys
+
+from schizophrenia_prediction.entity.config_entity import ImportBudgetConfig
+from schizophrenia_prediction.exception import SchizophreniaPredException
+
+_PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+__import__({module_name!r})
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "import_seconds": elapsed,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "loaded_forbidden_modules": [name for name in {forbidden_modules!r} if name in sys.modules],
+}}))
+"""
+
+
+def measure_import(import_budget_config: ImportBudgetConfig = ImportBudgetConfig()) -> dict:
+    """
+    Imports the serving module in a fresh interpreter and returns its import time, peak RSS
+    and the training only modules it pulled in
+    """
+    try:
+        probe = _PROBE.format(module_name=import_budget_config.module_name,
+                              forbidden_modules=import_budget_config.forbidden_modules)
+        completed = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True)
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+    except Exception as e:
+        raise SchizophreniaPredException(e, sys) from e
+
+
+def check_import_budget(import_budget_config: ImportBudgetConfig = ImportBudgetConfig()) -> dict:
+    """
+    Measures the serving import and lists every budget it breaks under "violations"
+    """
+    measurement = measure_import(import_budget_config)
+    violations = []
+    if measurement["import_seconds"] > import_budget_config.time_budget_seconds:
+        violations.append(f"import took {measurement['import_seconds']:.2f}s, "
+                          f"budget is {import_budget_config.time_budget_seconds:.2f}s")
+    if measurement["max_rss_mb"] > import_budget_config.rss_budget_mb:
+        violations.append(f"peak RSS was {measurement['max_rss_mb']:.0f}MB, "
+                          f"budget is {import_budget_config.rss_budget_mb:.0f}MB")
+    for module_name in measurement["loaded_forbidden_modules"]:
+        violations.append(f"{module_name} is imported by {import_budget_config.module_name}")
+    measurement["violations"] = violations
+    return measurement
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check the import time and RSS budget of the serving entry point")
+    parser.add_argument("--module", default=ImportBudgetConfig.module_name)
+    args = parser.parse_args()
+
+    result = check_import_budget(ImportBudgetConfig(module_name=args.module))
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if result["violations"] else 0)
+
+
+if __name__ == "__main__":
+    main()
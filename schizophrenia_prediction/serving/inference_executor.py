@@ -0,0 +1,79 @@
+import asyncio
+import contextvars
+import functools
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from schizophrenia_prediction.entity.config_entity import InferenceExecutorConfig, ModelWatcherConfig
+from schizophrenia_prediction.exception import SchizophreniaPredException
+from schizophrenia_prediction.logger import logging
+from schizophrenia_prediction.serving.model_holder import get_model_holder
+from schizophrenia_prediction.serving.model_watcher import ModelWatcher
+
+
+def _preload_worker_model() -> None:
+    """
+    Process pool initializer, every worker process keeps its own warm model and its own watcher
+    """
+    try:
+        get_model_holder().load()
+    except Exception as e:
+        logging.info(f"Model preload in inference worker failed, it will be retried on the first prediction: {e}")
+    model_watcher_config = ModelWatcherConfig()
+    if model_watcher_config.enabled:
+        ModelWatcher(model_holder=get_model_holder(), model_watcher_config=model_watcher_config).start()
+
+
+class InferenceExecutor:
+    """
+    This class runs blocking model loading and CPU bound prediction on a bounded
+    thread or process pool so that the asyncio event loop keeps serving other connections
+    """
+
+    THREAD: str = "thread"
+    PROCESS: str = "process"
+
+    def __init__(self, inference_executor_config: InferenceExecutorConfig = InferenceExecutorConfig()):
+        """
+        :param inference_executor_config: Configuration with the pool type and size
+        """
+        try:
+            if inference_executor_config.executor_type not in (InferenceExecutor.THREAD, InferenceExecutor.PROCESS):
+                raise ValueError(f"Unknown inference executor type: {inference_executor_config.executor_type}")
+            if inference_executor_config.max_workers < 1:
+                raise ValueError("Inference executor needs at least one worker")
+            self.inference_executor_config = inference_executor_config
+            self._executor: Optional[Executor] = None
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+        max_workers = self.inference_executor_config.max_workers
+        if self.inference_executor_config.executor_type == InferenceExecutor.PROCESS:
+            self._executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_preload_worker_model)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        logging.info(f"Started inference executor with {self.inference_executor_config}")
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            logging.info("Stopped inference executor")
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """
+        Runs fn on the pool and awaits its result. With a process pool fn and its
+        arguments have to be picklable, module level functions and plain objects are
+        """
+        if self._executor is None:
+            self.start()
+        loop = asyncio.get_running_loop()
+        call = functools.partial(fn, *args, **kwargs)
+        if self.inference_executor_config.executor_type == InferenceExecutor.THREAD:
+            # carries request scoped context such as the log route over to the pool thread
+            call = functools.partial(contextvars.copy_context().run, call)
+        return await loop.run_in_executor(self._executor, call)
@@ -0,0 +1,195 @@
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from schizophrenia_prediction.constants import PREDICTION_FEATURE_COLUMNS
+from schizophrenia_prediction.entity.config_entity import InferenceLogConfig
+from schizophrenia_prediction.logger import logging
+from schizophrenia_prediction.serving.metrics import REGISTRY, observe_seconds
+
+
+class InferenceLogWriter:
+    """
+    This class records predictions for retraining and audit without a database write on the
+    request path. Requests append their inputs and outputs to a bounded in-memory buffer, a
+    background thread expands them into one document per row and writes them to Mongo with
+    unordered insert_many batches once batch_size rows are buffered or every flush interval.
+    When Mongo falls behind the oldest buffered rows are dropped so memory stays bounded
+    """
+
+    def __init__(self, inference_log_config: InferenceLogConfig = InferenceLogConfig()):
+        """
+        :param inference_log_config: Configuration with the collection, batch size, flush interval and buffer bound
+        """
+        self.inference_log_config = inference_log_config
+        self.enabled = inference_log_config.enabled
+        self._buffer: Deque[tuple] = deque()
+        self._buffered_rows = 0
+        self._unreported_dropped_rows = 0
+        self._lock = threading.Lock()
+        self._flush_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._collection = None
+        self.flush_histogram = REGISTRY.histogram("schizophrenia_inference_log_flush_seconds",
+                                                  "Time taken by one inference log insert_many in seconds")
+        self._logged_counter = REGISTRY.counter("schizophrenia_inference_log_rows_total",
+                                                "Inference log rows by outcome", outcome="buffered")
+        self._written_counter = REGISTRY.counter("schizophrenia_inference_log_rows_total",
+                                                 "Inference log rows by outcome", outcome="written")
+        self._dropped_counter = REGISTRY.counter("schizophrenia_inference_log_rows_total",
+                                                 "Inference log rows by outcome", outcome="dropped")
+        self._failed_counter = REGISTRY.counter("schizophrenia_inference_log_rows_total",
+                                                "Inference log rows by outcome", outcome="failed")
+        REGISTRY.register_collector("schizophrenia_inference_log_buffered_rows", "gauge",
+                                    "Inference log rows waiting to be written", lambda: [({}, self._buffered_rows)])
+
+    def start(self) -> None:
+        if self.enabled and (self._thread is None or not self._thread.is_alive()):
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="inference-log-writer", daemon=True)
+            self._thread.start()
+            logging.info(f"Started inference log writer with {self.inference_log_config}")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stops the writer thread after it wrote everything buffered so far, waiting at most timeout seconds
+        """
+        self._stop_event.set()
+        self._flush_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            if self._thread.is_alive():
+                logging.info(f"Inference log writer did not drain in {timeout} seconds, {self._buffered_rows} rows left")
+            self._thread = None
+            logging.info("Stopped inference log writer")
+
+    def log(self, route: str, inputs: np.ndarray, predictions: Sequence, latency_seconds: float,
+            model_version: Optional[str] = None, probabilities: Optional[Sequence] = None,
+            patient_ids: Optional[List[int]] = None) -> None:
+        """
+        Buffers the predictions of one request, rows of inputs line up with predictions. Only
+        references are kept here, documents are built on the writer thread. Requests larger than
+        batch_size are buffered as slices of batch_size rows, so a full buffer drops the oldest
+        rows of a large request instead of the whole request
+        """
+        if not self.enabled:
+            return
+        timestamp = datetime.now(timezone.utc)
+        rows = len(predictions)
+        batch_size = max(self.inference_log_config.batch_size, 1)
+        entries = [(timestamp, route, model_version, latency_seconds, rows,
+                    inputs[start:start + batch_size], predictions[start:start + batch_size],
+                    None if probabilities is None else probabilities[start:start + batch_size],
+                    None if patient_ids is None else patient_ids[start:start + batch_size])
+                   for start in range(0, rows, batch_size)]
+        dropped_rows = 0
+        with self._lock:
+            self._buffer.extend(entries)
+            self._buffered_rows += rows
+            while self._buffered_rows > self.inference_log_config.max_buffered_rows:
+                dropped_entry_rows = len(self._buffer.popleft()[6])
+                self._buffered_rows -= dropped_entry_rows
+                dropped_rows += dropped_entry_rows
+            self._unreported_dropped_rows += dropped_rows
+            buffered_rows = self._buffered_rows
+        self._logged_counter.inc(rows)
+        if dropped_rows:
+            self._dropped_counter.inc(dropped_rows)
+        if buffered_rows >= self.inference_log_config.batch_size:
+            self._flush_event.set()
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            self._flush_event.wait(self.inference_log_config.flush_interval_seconds)
+            self._flush_event.clear()
+            self.flush()
+        self.flush()
+
+    def _get_collection(self):
+        if self._collection is None:
+            # imported here so that pymongo stays out of the serving import path
+            from schizophrenia_prediction.configuration.mongo_db_connection import MongoDBClient
+
+            mongo_client = MongoDBClient(database_name=self.inference_log_config.database_name)
+            self._collection = mongo_client.database[self.inference_log_config.collection_name]
+        return self._collection
+
+    def flush(self) -> None:
+        """
+        Method Name :   flush
+        Description :   This method writes everything buffered so far in unordered insert_many batches.
+                        Rows of a failed batch are counted and dropped, they are not retried
+
+        Output      :   Buffered rows are written to the inference log collection
+        On Failure  :   Write a log, failures never reach the request path
+        """
+        with self._lock:
+            entries = list(self._buffer)
+            self._buffer.clear()
+            self._buffered_rows = 0
+            dropped_rows, self._unreported_dropped_rows = self._unreported_dropped_rows, 0
+        if dropped_rows:
+            # reported here rather than per request so that a saturated buffer logs once per flush
+            logging.warning(f"Inference log buffer exceeded {self.inference_log_config.max_buffered_rows} rows, "
+                            f"dropped the {dropped_rows} oldest rows since the last flush")
+        if not entries:
+            return
+        batch: List[dict] = []
+        for document in InferenceLogWriter._to_documents(entries):
+            batch.append(document)
+            if len(batch) >= self.inference_log_config.batch_size:
+                self._insert_batch(batch)
+                batch = []
+        if batch:
+            self._insert_batch(batch)
+
+    def _insert_batch(self, batch: List[dict]) -> None:
+        try:
+            with observe_seconds(self.flush_histogram):
+                self._get_collection().insert_many(batch, ordered=False)
+            self._written_counter.inc(len(batch))
+        except Exception as e:
+            # BulkWriteError of an unordered insert still wrote the documents that did not fail
+            written = (getattr(e, "details", None) or {}).get("nInserted", 0)
+            self._written_counter.inc(written)
+            self._failed_counter.inc(len(batch) - written)
+            logging.info(f"Inference log insert_many failed for {len(batch) - written} of {len(batch)} rows: {e}")
+
+    @staticmethod
+    def _to_documents(entries: List[tuple]) -> Iterator[dict]:
+        for timestamp, route, model_version, latency_seconds, request_rows, inputs, predictions, probabilities, \
+                patient_ids in entries:
+            input_rows = np.asarray(inputs).tolist()
+            prediction_values = np.asarray(predictions).tolist()
+            probability_values = None if probabilities is None else np.asarray(probabilities).tolist()
+            for index, (input_row, prediction) in enumerate(zip(input_rows, prediction_values)):
+                document = {
+                    "timestamp": timestamp,
+                    "route": route,
+                    "model_version": model_version,
+                    "latency_ms": latency_seconds * 1000,
+                    "batch_size": request_rows,
+                    "features": dict(zip(PREDICTION_FEATURE_COLUMNS, input_row)),
+                    "prediction": prediction,
+                }
+                if probability_values is not None:
+                    document["probability"] = probability_values[index]
+                if patient_ids is not None:
+                    document["patient_id"] = patient_ids[index]
+                yield document
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "buffered_rows": self._buffered_rows,
+            "rows_buffered_total": self._logged_counter.value,
+            "rows_written": self._written_counter.value,
+            "rows_dropped": self._dropped_counter.value,
+            "rows_failed": self._failed_counter.value,
+            "flush_histogram": self.flush_histogram.snapshot(),
+        }
@@ -0,0 +1,237 @@
+import argparse
+import gc
+import importlib
+import importlib.util
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Optional
+
+from schizophrenia_prediction.entity.config_entity import ModelWatcherConfig, ServingLauncherConfig
+from schizophrenia_prediction.exception import SchizophreniaPredException
+from schizophrenia_prediction.logger import logging
+from schizophrenia_prediction.serving.model_holder import get_model_holder
+
+_worker_index: Optional[int] = None
+
+
+def read_process_memory(pid: int) -> Dict[str, float]:
+    """
+    Reads rss, pss and the shared/private split of a process in MB from /proc. Pss divides
+    every shared page among the processes mapping it, so summing it over the workers gives
+    the real footprint of the pool
+    """
+    memory = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as smaps_rollup:
+            for line in smaps_rollup:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    memory[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    except OSError:
+        return {}
+    return {
+        "rss_mb": memory.get("Rss", 0.0),
+        "pss_mb": memory.get("Pss", 0.0),
+        "shared_mb": memory.get("Shared_Clean", 0.0) + memory.get("Shared_Dirty", 0.0),
+        "private_mb": memory.get("Private_Clean", 0.0) + memory.get("Private_Dirty", 0.0),
+    }
+
+
+def pid_alive(pid: Optional[int]) -> bool:
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def in_launcher_worker() -> bool:
+    """
+    True in a worker forked by ServingLauncher, whose parent watches the model for it
+    """
+    return _worker_index is not None
+
+
+def _pick_implementation(module_name: str) -> str:
+    return module_name if importlib.util.find_spec(module_name) is not None else "auto"
+
+
+class ServingLauncher:
+    """
+    This class runs the FastAPI app on several pre-forked uvicorn workers sharing one listening
+    socket. The model is loaded once in the parent before forking, so the workers share its
+    arrays copy-on-write instead of each downloading and holding a private copy. The parent
+    is also the only process polling the model, on a new version it loads it once and
+    re-forks the workers so they keep sharing a single copy
+    """
+
+    def __init__(self, serving_launcher_config: ServingLauncherConfig = ServingLauncherConfig(),
+                 model_watcher_config: ModelWatcherConfig = ModelWatcherConfig()):
+        """
+        :param serving_launcher_config: Configuration with the address, worker count and memory report interval
+        :param model_watcher_config: Configuration with the interval the parent polls the model at
+        """
+        self.serving_launcher_config = serving_launcher_config
+        self.model_watcher_config = model_watcher_config
+        self._workers: Dict[int, int] = {}
+        self._stopping = False
+
+    def _bind_socket(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.serving_launcher_config.host, self.serving_launcher_config.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def _spawn_worker(self, worker_index: int, app, sock: socket.socket) -> int:
+        pid = os.fork()
+        if pid:
+            return pid
+
+        import uvicorn
+
+        global _worker_index
+        _worker_index = worker_index
+        exit_code = 0
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            config = uvicorn.Config(app, loop=_pick_implementation("uvloop"), http=_pick_implementation("httptools"),
+                                    lifespan="on", log_config=None)
+            uvicorn.Server(config).run(sockets=[sock])
+        except Exception as e:
+            logging.info(f"Serving worker {worker_index} failed: {e}")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def memory_report(self) -> Dict[str, dict]:
+        report = {"parent": {"pid": os.getpid(), **read_process_memory(os.getpid())}}
+        for pid, worker_index in sorted(self._workers.items(), key=lambda item: item[1]):
+            report[f"worker_{worker_index}"] = {"pid": pid, **read_process_memory(pid)}
+        workers = [memory for name, memory in report.items() if name != "parent"]
+        report["total"] = {
+            "workers": len(workers),
+            "rss_mb": sum(memory.get("rss_mb", 0.0) for memory in workers),
+            "pss_mb": sum(memory.get("pss_mb", 0.0) for memory in workers),
+        }
+        return report
+
+    def _recycle_workers(self, app, sock: socket.socket) -> None:
+        """
+        Replaces the workers one at a time after the parent swapped in a new model. Each
+        replacement is forked before its predecessor gets SIGTERM, which lets uvicorn finish
+        the requests in flight, so the socket is never left without a worker
+        """
+        gc.unfreeze()
+        gc.collect()
+        gc.freeze()
+        for pid, worker_index in list(self._workers.items()):
+            if self._stopping:
+                return
+            self._workers[self._spawn_worker(worker_index, app, sock)] = worker_index
+            del self._workers[pid]
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        logging.info(f"Recycled {len(self._workers)} serving workers onto the new model")
+
+    def _poll_model(self, app, sock: socket.socket) -> None:
+        try:
+            if not get_model_holder().reload_if_changed():
+                return
+        except Exception as e:
+            logging.info(f"Model poll in launcher failed, keeping the active model: {e}")
+            return
+        self._recycle_workers(app, sock)
+
+    def _stop_workers(self, signum, frame) -> None:
+        self._stopping = True
+        for pid in list(self._workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        """
+        Method Name :   run
+        Description :   This method loads the model, freezes the objects allocated so far out of
+                        the garbage collector so its passes do not dirty the shared pages, forks
+                        the workers and restarts any worker that dies until SIGINT/SIGTERM. When
+                        the model watcher is enabled it polls the model and re-forks the workers
+                        whenever a new version was swapped in
+
+        Output      :   Returns when every worker has exited
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the run method of ServingLauncher class")
+        try:
+            app = importlib.import_module(self.serving_launcher_config.app_module).app
+            try:
+                get_model_holder().load()
+            except Exception as e:
+                logging.info(f"Model preload in launcher failed, workers will load it themselves: {e}")
+
+            gc.collect()
+            gc.freeze()
+
+            sock = self._bind_socket()
+            for worker_index in range(self.serving_launcher_config.workers):
+                self._workers[self._spawn_worker(worker_index, app, sock)] = worker_index
+            logging.info(f"Started {len(self._workers)} serving workers on "
+                         f"{self.serving_launcher_config.host}:{self.serving_launcher_config.port}")
+
+            signal.signal(signal.SIGINT, self._stop_workers)
+            signal.signal(signal.SIGTERM, self._stop_workers)
+
+            next_report = time.monotonic() + min(5.0, self.serving_launcher_config.memory_report_interval_seconds)
+            next_poll = time.monotonic() + self.model_watcher_config.poll_interval_seconds
+            while self._workers:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+                if pid == 0:
+                    if self.model_watcher_config.enabled and not self._stopping and time.monotonic() >= next_poll:
+                        self._poll_model(app, sock)
+                        next_poll = time.monotonic() + self.model_watcher_config.poll_interval_seconds
+                    if time.monotonic() >= next_report:
+                        logging.info(f"Serving memory report: {self.memory_report()}")
+                        next_report = time.monotonic() + self.serving_launcher_config.memory_report_interval_seconds
+                    time.sleep(0.5)
+                    continue
+                worker_index = self._workers.pop(pid, None)
+                if worker_index is not None and not self._stopping:
+                    logging.info(f"Serving worker {worker_index} (pid {pid}) exited with status {status}, restarting it")
+                    self._workers[self._spawn_worker(worker_index, app, sock)] = worker_index
+
+            sock.close()
+            logging.info("Exited the run method of ServingLauncher class")
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the prediction app on pre-forked workers sharing one model")
+    parser.add_argument("--host", default=ServingLauncherConfig.host)
+    parser.add_argument("--port", type=int, default=ServingLauncherConfig.port)
+    parser.add_argument("--workers", type=int, default=ServingLauncherConfig.workers)
+    parser.add_argument("--memory-report-interval", type=float,
+                        default=ServingLauncherConfig.memory_report_interval_seconds)
+    args = parser.parse_args()
+
+    ServingLauncher(
+        serving_launcher_config=ServingLauncherConfig(host=args.host, port=args.port, workers=args.workers,
+                                                      memory_report_interval_seconds=args.memory_report_interval)
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import bisect
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                                              0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    This class keeps cumulative bucket counts, total count and sum of observed values
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        """
+        :param buckets: Sorted upper bounds of the histogram buckets
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> dict:
+        """
+        Returns cumulative counts per upper bound in the same shape prometheus uses
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative, running = {}, 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            running += bucket_count
+            cumulative[str(bound)] = running
+        cumulative["+Inf"] = count
+        return {"buckets": cumulative, "count": count, "sum": total}
+
+
+class Counter:
+    """
+    This class is a monotonically increasing thread safe counter
+    """
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class MetricsRegistry:
+    """
+    This class holds the metrics of the serving process and renders them in the prometheus
+    text exposition format. Metrics owned by other objects are exposed through collect callbacks.
+    Values are per process, workers of the serving launcher do not aggregate them
+    """
+
+    def __init__(self):
+        self._families: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _child(self, name: str, metric_type: str, documentation: str, labels: Dict[str, str], factory: Callable):
+        label_key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._families.setdefault(
+                name, {"type": metric_type, "help": documentation, "children": OrderedDict(), "collect": None})
+            child = family["children"].get(label_key)
+            if child is None:
+                child = factory()
+                family["children"][label_key] = child
+            return child
+
+    def counter(self, name: str, documentation: str, **labels: str) -> Counter:
+        return self._child(name, "counter", documentation, labels, Counter)
+
+    def histogram(self, name: str, documentation: str, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+                  **labels: str) -> Histogram:
+        return self._child(name, "histogram", documentation, labels, lambda: Histogram(buckets=buckets))
+
+    def register_collector(self, name: str, metric_type: str, documentation: str,
+                           collect: Callable[[], List[Tuple[Dict[str, str], object]]]) -> None:
+        """
+        Exposes values read at scrape time. collect returns (labels, value) pairs where value is a
+        number for counters and gauges and a Histogram for histograms
+        """
+        with self._lock:
+            self._families[name] = {"type": metric_type, "help": documentation, "children": OrderedDict(),
+                                    "collect": collect}
+
+    @staticmethod
+    def _format_labels(labels: Dict[str, str], **extra: str) -> str:
+        items = list(labels.items()) + list(extra.items())
+        if not items:
+            return ""
+        escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in items)
+        return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(items, escaped)) + "}"
+
+    def _samples(self, family: dict) -> Iterator[Tuple[Dict[str, str], object]]:
+        for label_key, child in list(family["children"].items()):
+            yield dict(label_key), child
+        if family["collect"] is not None:
+            yield from family["collect"]()
+
+    def render(self) -> str:
+        lines = []
+        for name, family in list(self._families.items()):
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['type']}")
+            for labels, value in self._samples(family):
+                if isinstance(value, Histogram):
+                    snapshot = value.snapshot()
+                    for bound, count in snapshot["buckets"].items():
+                        lines.append(f"{name}_bucket{self._format_labels(labels, le=bound)} {count}")
+                    lines.append(f"{name}_sum{self._format_labels(labels)} {snapshot['sum']}")
+                    lines.append(f"{name}_count{self._format_labels(labels)} {snapshot['count']}")
+                else:
+                    number = value.value if isinstance(value, Counter) else value
+                    lines.append(f"{name}{self._format_labels(labels)} {float(number)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def predict_stage_histogram(stage: str) -> Histogram:
+    return REGISTRY.histogram("schizophrenia_predict_stage_seconds",
+                              "Latency of each stage of the prediction path in seconds", stage=stage)
+
+
+@contextmanager
+def observe_seconds(histogram: Histogram) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start)
@@ -0,0 +1,125 @@
+import asyncio
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from schizophrenia_prediction.entity.config_entity import MicroBatchConfig
+from schizophrenia_prediction.logger import logging
+from schizophrenia_prediction.pipeline.prediction_pipeline import SchizophreniaBatchData
+from schizophrenia_prediction.serving.inference_executor import InferenceExecutor
+from schizophrenia_prediction.serving.metrics import REGISTRY, observe_seconds, predict_stage_histogram
+
+
+class MicroBatcher:
+    """
+    This class coalesces concurrent single row predictions into one vectorized
+    transform and predict call and fans the results back out to the waiting requests
+    """
+
+    def __init__(self, predict_fn: Callable[[np.ndarray], object],
+                 micro_batch_config: MicroBatchConfig = MicroBatchConfig(),
+                 inference_executor: Optional[InferenceExecutor] = None):
+        """
+        :param predict_fn: Function predicting a whole float array, e.g. SchizophreniaClassifier().predict_array
+        :param micro_batch_config: Configuration of the batching window
+        :param inference_executor: Pool the batches are predicted on, the loop default executor when None
+        """
+        self.predict_fn = predict_fn
+        self.inference_executor = inference_executor
+        self.micro_batch_config = micro_batch_config
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.batch_size_histogram = REGISTRY.histogram(
+            "schizophrenia_micro_batch_size", "Number of rows predicted per micro batch",
+            buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+        self.queue_depth_histogram = REGISTRY.histogram(
+            "schizophrenia_micro_batch_queue_depth", "Requests left waiting when a micro batch is taken",
+            buckets=(0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512))
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logging.info(f"Started micro batcher with {self.micro_batch_config}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            while not self._queue.empty():
+                _, future = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError("Micro batcher stopped"))
+            logging.info("Stopped micro batcher")
+
+    async def predict(self, record: object):
+        """
+        Queues one record exposing all model features as attributes and waits for its prediction.
+        The record is parsed here, so an invalid input fails only its own caller and never the batch
+        """
+        if self._task is None:
+            raise RuntimeError("Micro batcher is not started")
+        with observe_seconds(predict_stage_histogram("input_build")):
+            input_row = SchizophreniaBatchData(records=[record]).get_schizophrenia_input_array()[0]
+        future = asyncio.get_running_loop().create_future()
+        self.queue_depth_histogram.observe(self._queue.qsize())
+        await self._queue.put((input_row, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[np.ndarray, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.micro_batch_config.max_wait_ms / 1000
+        while len(batch) < self.micro_batch_config.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            self.batch_size_histogram.observe(len(batch))
+            try:
+                input_array = np.stack([input_row for input_row, _ in batch])
+                if self.inference_executor is not None:
+                    predictions = await self.inference_executor.run(self.predict_fn, input_array)
+                else:
+                    predictions = await loop.run_in_executor(None, self.predict_fn, input_array)
+                for (_, future), prediction in zip(batch, predictions):
+                    if not future.done():
+                        future.set_result(prediction)
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(RuntimeError("Micro batcher stopped"))
+                raise
+            except Exception as e:
+                logging.info(f"Micro batch of {len(batch)} records failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self._task is not None,
+            "config": {
+                "max_wait_ms": self.micro_batch_config.max_wait_ms,
+                "max_batch_size": self.micro_batch_config.max_batch_size,
+            },
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_depth_histogram": self.queue_depth_histogram.snapshot(),
+            "batch_size_histogram": self.batch_size_histogram.snapshot(),
+        }
@@ -0,0 +1,193 @@
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from schizophrenia_prediction.entity.config_entity import SchizophreniaPredConfig
+from schizophrenia_prediction.entity.estimator import SchizophreniaPredModel
+from schizophrenia_prediction.entity.s3_estimator import SchizophreniaEstimator
+from schizophrenia_prediction.exception import SchizophreniaPredException
+from schizophrenia_prediction.logger import logging
+from schizophrenia_prediction.serving.metrics import REGISTRY
+
+
+class ModelHolder:
+    """
+    This class keeps one warm copy of the production model per process so that
+    predictions are served from memory instead of reloading the model from s3 on every request
+    """
+
+    NOT_LOADED: str = "not_loaded"
+    LOADING: str = "loading"
+    RELOADING: str = "reloading"
+    READY: str = "ready"
+    FAILED: str = "failed"
+
+    def __init__(self, prediction_pipeline_config: SchizophreniaPredConfig = SchizophreniaPredConfig()):
+        """
+        :param prediction_pipeline_config: Configuration holding the bucket and key of the model
+        """
+        self.prediction_pipeline_config = prediction_pipeline_config
+        self._lock = threading.Lock()
+        self._active: Optional[Tuple[SchizophreniaPredModel, int]] = None
+        self.state: str = ModelHolder.NOT_LOADED
+        self.error: Optional[str] = None
+        self.version: int = 0
+        self.model_version: Optional[str] = None
+        self.loaded_at: Optional[float] = None
+        self.load_duration: Optional[float] = None
+        model_label = f"{prediction_pipeline_config.model_bucket_name}/{prediction_pipeline_config.model_file_path}"
+        self.load_duration_histogram = REGISTRY.histogram(
+            "schizophrenia_model_load_seconds", "Time taken to load the model from storage in seconds",
+            buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60), model=model_label)
+        self._load_success_counter = REGISTRY.counter(
+            "schizophrenia_model_loads_total", "Number of model loads by result", model=model_label, result="success")
+        self._load_failure_counter = REGISTRY.counter(
+            "schizophrenia_model_loads_total", "Number of model loads by result", model=model_label, result="failure")
+        self.swap_count: int = 0
+        self.last_swap_at: Optional[float] = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self._active is not None
+
+    @property
+    def _model(self) -> Optional[SchizophreniaPredModel]:
+        active = self._active
+        return None if active is None else active[0]
+
+    def load(self, force: bool = False) -> SchizophreniaPredModel:
+        """
+        Method Name :   load
+        Description :   This method loads the model from s3 once. Concurrent callers wait on the
+                        same lock and reuse the model loaded by the first caller
+
+        Output      :   Returns the in-memory model object
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        with self._lock:
+            if self._model is not None and not force:
+                return self._model
+
+            logging.info("Entered the load method of ModelHolder class")
+            self.state = ModelHolder.LOADING if self._active is None else ModelHolder.RELOADING
+            start = time.perf_counter()
+            try:
+                estimator = self._get_estimator()
+                model_version = self._read_model_version(estimator)
+                model = estimator.load_model(model_version=model_version)
+                model.compile_preprocessor()
+                inference_engine = model.select_inference_engine(
+                    self.prediction_pipeline_config.inference_engine,
+                    onnx_intra_op_num_threads=self.prediction_pipeline_config.onnx_intra_op_num_threads)
+            except Exception as e:
+                self.state = ModelHolder.READY if self._model is not None else ModelHolder.FAILED
+                self.error = str(e)
+                self._load_failure_counter.inc()
+                logging.info(f"Model load failed: {e}")
+                raise SchizophreniaPredException(e, sys) from e
+
+            is_swap = self._active is not None
+            self.version += 1
+            self._active = (model, self.version)
+            self.model_version = model_version
+            self.state = ModelHolder.READY
+            self.error = None
+            self.loaded_at = time.time()
+            self.load_duration = time.perf_counter() - start
+            self.load_duration_histogram.observe(self.load_duration)
+            self._load_success_counter.inc()
+            if is_swap:
+                self.swap_count += 1
+                self.last_swap_at = self.loaded_at
+                logging.info(f"Swapped in model version {model_version} as holder version {self.version}")
+            logging.info(f"Loaded model {model} with {inference_engine} inference engine in {self.load_duration:.3f} seconds")
+            logging.info("Exited the load method of ModelHolder class")
+            return model
+
+    def _get_estimator(self) -> SchizophreniaEstimator:
+        return SchizophreniaEstimator(
+            bucket_name=self.prediction_pipeline_config.model_bucket_name,
+            model_path=self.prediction_pipeline_config.model_file_path,
+            native_model_path=self.prediction_pipeline_config.native_model_file_path,
+        )
+
+    @staticmethod
+    def _read_model_version(estimator: SchizophreniaEstimator) -> Optional[str]:
+        try:
+            return estimator.get_model_version()
+        except Exception as e:
+            logging.info(f"Could not read the model version: {e}")
+            return None
+
+    def reload_if_changed(self) -> bool:
+        """
+        Method Name :   reload_if_changed
+        Description :   This method compares the ETag/VersionId of the model object with the one
+                        of the active model through a HEAD request and loads the new model when
+                        it changed. The reference is swapped in one assignment, requests already
+                        holding the old model finish on it
+
+        Output      :   Returns True when a new model was swapped in
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        if self._active is None:
+            self.load()
+            return True
+        model_version = self._get_estimator().get_model_version()
+        if model_version == self.model_version:
+            return False
+        logging.info(f"Model version changed from {self.model_version} to {model_version}, reloading")
+        self.load(force=True)
+        return True
+
+    def get_model(self) -> SchizophreniaPredModel:
+        """
+        Returns the warm model, loading it on the first call if startup preload did not happen
+        """
+        return self.get_model_with_version()[0]
+
+    def get_model_with_version(self) -> Tuple[SchizophreniaPredModel, int]:
+        """
+        Returns the warm model together with the version it was loaded as, read in one step
+        so that callers keying results on the version never pair it with another model
+        """
+        active = self._active
+        if active is None:
+            self.load()
+            active = self._active
+        return active
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "ready": self.is_ready,
+            "model": str(self._model) if self._model is not None else None,
+            "version": self.version,
+            "model_version": self.model_version,
+            "loaded_at": self.loaded_at,
+            "load_duration": self.load_duration,
+            "load_duration_histogram": self.load_duration_histogram.snapshot(),
+            "swap_count": self.swap_count,
+            "last_swap_at": self.last_swap_at,
+            "error": self.error,
+        }
+
+
+_model_holders: Dict[Tuple[str, str], ModelHolder] = {}
+_model_holders_lock = threading.Lock()
+
+
+def get_model_holder(prediction_pipeline_config: SchizophreniaPredConfig = SchizophreniaPredConfig()) -> ModelHolder:
+    """
+    Returns the process wide ModelHolder for the bucket and key of the given configuration
+    """
+    key = (prediction_pipeline_config.model_bucket_name, prediction_pipeline_config.model_file_path)
+    holder = _model_holders.get(key)
+    if holder is None:
+        with _model_holders_lock:
+            holder = _model_holders.get(key)
+            if holder is None:
+                holder = ModelHolder(prediction_pipeline_config=prediction_pipeline_config)
+                _model_holders[key] = holder
+    return holder
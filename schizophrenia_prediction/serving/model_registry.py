@@ -0,0 +1,210 @@
+import hashlib
+import random
+import re
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from schizophrenia_prediction.entity.config_entity import ModelRegistryConfig, SchizophreniaPredConfig
+from schizophrenia_prediction.exception import SchizophreniaPredException
+from schizophrenia_prediction.logger import logging
+from schizophrenia_prediction.serving.metrics import REGISTRY
+from schizophrenia_prediction.serving.model_holder import ModelHolder
+
+_MODEL_VERSION_PATTERN = re.compile(r"^[A-Za-z0-9_-][A-Za-z0-9_.-]{0,127}$")
+
+
+def estimate_model_bytes(model: object) -> int:
+    """
+    Sums the numpy arrays and byte buffers reachable from the model. Scikit-learn trees keep
+    their node arrays behind __getstate__ instead of __dict__, memory owned by native
+    libraries outside of numpy is not seen
+    """
+    total, seen, stack = 0, set(), [model]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or obj is None or isinstance(obj, (str, int, float, bool)):
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, np.ndarray):
+            total += obj.nbytes
+        elif isinstance(obj, (bytes, bytearray, memoryview)):
+            total += len(obj)
+        elif isinstance(obj, dict):
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        else:
+            state = getattr(obj, "__dict__", None)
+            if state is None and hasattr(obj, "__getstate__"):
+                try:
+                    state = obj.__getstate__()
+                except Exception:
+                    state = None
+            if isinstance(state, dict):
+                stack.extend(state.values())
+    return total
+
+
+class ModelRegistry:
+    """
+    This class keeps several versions of the model pushed under model-registry/<version>/ warm at
+    once, next to the production model of ModelHolder. Versions are loaded on first use and the
+    least recently used ones are dropped once their estimated size exceeds the memory budget
+    """
+
+    def __init__(self, model_registry_config: ModelRegistryConfig = ModelRegistryConfig(),
+                 prediction_pipeline_config: SchizophreniaPredConfig = SchizophreniaPredConfig()):
+        """
+        :param model_registry_config: Configuration with the registry location and the memory budget
+        :param prediction_pipeline_config: Configuration the file names and inference engine are taken from
+        """
+        self.model_registry_config = model_registry_config
+        self.prediction_pipeline_config = prediction_pipeline_config
+        self._holders: "OrderedDict[str, Tuple[ModelHolder, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version_locks: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self._evictions_counter = REGISTRY.counter("schizophrenia_model_registry_evictions_total",
+                                                   "Model versions dropped to stay within the memory budget")
+
+    @property
+    def loaded_bytes(self) -> int:
+        return sum(size for _, size in self._holders.values())
+
+    def version_config(self, model_version: str) -> SchizophreniaPredConfig:
+        registry_dir = f"{self.model_registry_config.model_registry_prefix}/{model_version}"
+        return SchizophreniaPredConfig(
+            model_file_path=f"{registry_dir}/{self.prediction_pipeline_config.model_file_path}",
+            native_model_file_path=f"{registry_dir}/{self.prediction_pipeline_config.native_model_file_path}",
+            model_bucket_name=self.model_registry_config.bucket_name,
+            inference_engine=self.prediction_pipeline_config.inference_engine,
+            onnx_intra_op_num_threads=self.prediction_pipeline_config.onnx_intra_op_num_threads,
+        )
+
+    def get_holder(self, model_version: str) -> ModelHolder:
+        """
+        Method Name :   get_holder
+        Description :   This method returns the warm holder of model_version, loading it on first use.
+                        Concurrent requests for the same version wait for a single load
+
+        Output      :   ModelHolder of the version
+        On Failure  :   ValueError for a malformed version, KeyError for a version missing from the
+                        registry, SchizophreniaPredException when loading fails
+        """
+        if not _MODEL_VERSION_PATTERN.match(model_version) or ".." in model_version:
+            raise ValueError(f"Malformed model version {model_version!r}")
+
+        with self._lock:
+            entry = self._holders.get(model_version)
+            if entry is not None:
+                self._holders.move_to_end(model_version)
+                self.hits += 1
+                return entry[0]
+            version_lock = self._version_locks.setdefault(model_version, threading.Lock())
+
+        with version_lock:
+            with self._lock:
+                entry = self._holders.get(model_version)
+            if entry is not None:
+                return entry[0]
+
+            holder = ModelHolder(prediction_pipeline_config=self.version_config(model_version))
+            estimator = holder._get_estimator()
+            if not (estimator.is_model_present(estimator.model_path)
+                    or estimator.is_model_present(estimator.native_model_path)):
+                raise KeyError(f"Model version {model_version} is not in the registry")
+            size = estimate_model_bytes(holder.load())
+
+            with self._lock:
+                self._holders[model_version] = (holder, size)
+                self.loads += 1
+                self._evict(keep=model_version)
+                self._version_locks.pop(model_version, None)
+            logging.info(f"Loaded model version {model_version} of about {size / 1024 / 1024:.1f} MB, "
+                         f"{len(self._holders)} versions use {self.loaded_bytes / 1024 / 1024:.1f} MB")
+            return holder
+
+    def _evict(self, keep: str) -> None:
+        while self.loaded_bytes > self.model_registry_config.memory_budget_bytes and len(self._holders) > 1:
+            model_version = next(version for version in self._holders if version != keep)
+            self._holders.pop(model_version)
+            self.evictions += 1
+            self._evictions_counter.inc()
+            logging.info(f"Evicted model version {model_version} to stay within the registry memory budget")
+
+    def stats(self) -> dict:
+        with self._lock:
+            versions = {version: {"estimated_bytes": size, "model": holder.status()["model"],
+                                  "loaded_at": holder.loaded_at}
+                        for version, (holder, size) in self._holders.items()}
+        return {
+            "versions": versions,
+            "loaded_bytes": sum(version["estimated_bytes"] for version in versions.values()),
+            "memory_budget_bytes": self.model_registry_config.memory_budget_bytes,
+            "hits": self.hits,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
+
+
+class ModelRouter:
+    """
+    This class picks the model version of a request. A pinned version always wins, other
+    requests are split between registry versions by the configured fractions and fall through
+    to the production model. A routing key keeps a client on the same side of the split
+    """
+
+    def __init__(self, ab_split: str = ModelRegistryConfig.ab_split):
+        """
+        :param ab_split: Comma separated version=fraction pairs, fractions add up to at most 1
+        """
+        try:
+            self.splits: List[Tuple[str, float]] = []
+            for item in filter(None, (item.strip() for item in ab_split.split(","))):
+                model_version, fraction = item.rsplit("=", 1)
+                self.splits.append((model_version.strip(), float(fraction)))
+            if sum(fraction for _, fraction in self.splits) > 1 + 1e-9:
+                raise ValueError(f"A/B split fractions add up to more than 1: {ab_split}")
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+    def resolve(self, pinned_version: Optional[str] = None, routing_key: Optional[str] = None) -> Optional[str]:
+        """
+        Returns the registry version to serve, None for the production model
+        """
+        if pinned_version:
+            return pinned_version
+        if not self.splits:
+            return None
+        if routing_key:
+            point = int(hashlib.sha256(routing_key.encode()).hexdigest()[:8], 16) / 0x100000000
+        else:
+            point = random.random()
+        cumulative = 0.0
+        for model_version, fraction in self.splits:
+            cumulative += fraction
+            if point < cumulative:
+                return model_version
+        return None
+
+
+_model_registry: Optional[ModelRegistry] = None
+_model_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """
+    Returns the process wide model registry
+    """
+    global _model_registry
+    if _model_registry is None:
+        with _model_registry_lock:
+            if _model_registry is None:
+                _model_registry = ModelRegistry()
+    return _model_registry
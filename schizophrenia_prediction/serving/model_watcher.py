@@ -0,0 +1,56 @@
+import threading
+from typing import Optional
+
+from schizophrenia_prediction.entity.config_entity import ModelWatcherConfig
+from schizophrenia_prediction.logger import logging
+from schizophrenia_prediction.serving.model_holder import ModelHolder
+
+
+class ModelWatcher:
+    """
+    This class polls the model object in s3 from a background thread and hot swaps the
+    model of a ModelHolder whenever ModelPusher uploads a new one, without a restart
+    """
+
+    def __init__(self, model_holder: ModelHolder, model_watcher_config: ModelWatcherConfig = ModelWatcherConfig()):
+        """
+        :param model_holder: Holder whose model is swapped
+        :param model_watcher_config: Configuration with the poll interval
+        """
+        self.model_holder = model_holder
+        self.model_watcher_config = model_watcher_config
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.poll_count: int = 0
+        self.poll_error_count: int = 0
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+            self._thread.start()
+            logging.info(f"Started model watcher with {self.model_watcher_config}")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+            logging.info("Stopped model watcher")
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.model_watcher_config.poll_interval_seconds):
+            self.poll_count += 1
+            try:
+                self.model_holder.reload_if_changed()
+            except Exception as e:
+                self.poll_error_count += 1
+                logging.info(f"Model watcher poll failed, keeping the active model: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "poll_interval_seconds": self.model_watcher_config.poll_interval_seconds,
+            "poll_count": self.poll_count,
+            "poll_error_count": self.poll_error_count,
+        }
@@ -0,0 +1,139 @@
+import os
+import sys
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from schizophrenia_prediction.constants import PATIENT_ID_COLUMN, PREDICTION_FEATURE_COLUMNS
+from schizophrenia_prediction.entity.config_entity import PatientFeatureStoreConfig
+from schizophrenia_prediction.exception import SchizophreniaPredException
+from schizophrenia_prediction.logger import logging
+from schizophrenia_prediction.serving.metrics import REGISTRY, observe_seconds
+from schizophrenia_prediction.serving.prediction_cache import LRUCache
+
+
+class PatientFeatureStore:
+    """
+    This class looks up the model features of patients by Patient_ID in the Mongo collection
+    filled by data ingestion. Lookups go through a bounded read-through cache, the ids missing
+    from it are fetched with one $in query on the unique Patient_ID index that returns only the
+    feature fields
+    """
+
+    def __init__(self, patient_feature_store_config: PatientFeatureStoreConfig = PatientFeatureStoreConfig()):
+        """
+        :param patient_feature_store_config: Configuration with the collection, cache bounds and query timeout
+        """
+        self.patient_feature_store_config = patient_feature_store_config
+        self._cache = LRUCache(max_size=patient_feature_store_config.cache_max_size,
+                               ttl_seconds=patient_feature_store_config.cache_ttl_seconds)
+        self._collection = None
+        self._collection_pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._projection = {"_id": 0, PATIENT_ID_COLUMN: 1, **{column: 1 for column in PREDICTION_FEATURE_COLUMNS}}
+        self.query_histogram = REGISTRY.histogram("schizophrenia_patient_feature_query_seconds",
+                                                  "Time taken by Mongo patient feature queries in seconds")
+        REGISTRY.register_collector("schizophrenia_patient_feature_cache_hits_total", "counter",
+                                    "Patient feature lookups answered from the cache", lambda: [({}, self._cache.hits)])
+        REGISTRY.register_collector("schizophrenia_patient_feature_cache_misses_total", "counter",
+                                    "Patient feature lookups sent to Mongo", lambda: [({}, self._cache.misses)])
+
+    def _get_collection(self):
+        if self._collection is None or self._collection_pid != os.getpid():
+            with self._lock:
+                if self._collection is None or self._collection_pid != os.getpid():
+                    # imported here so that pymongo stays out of the serving import path until a patient lookup
+                    from schizophrenia_prediction.configuration.mongo_db_connection import MongoDBClient
+
+                    mongo_client = MongoDBClient(database_name=self.patient_feature_store_config.database_name)
+                    collection = mongo_client.database[self.patient_feature_store_config.collection_name]
+                    PatientFeatureStore._ensure_index(collection)
+                    self._collection, self._collection_pid = collection, os.getpid()
+        return self._collection
+
+    @staticmethod
+    def _ensure_index(collection) -> None:
+        try:
+            collection.create_index([(PATIENT_ID_COLUMN, 1)], unique=True, name=f"{PATIENT_ID_COLUMN}_unique")
+        except Exception as e:
+            logging.info(f"Could not create the unique {PATIENT_ID_COLUMN} index, lookups fall back to scans: {e}")
+
+    def get_features(self, patient_ids: Sequence[int]) -> Dict[int, np.ndarray]:
+        """
+        Method Name :   get_features
+        Description :   This method returns the features of the given patients from the cache and
+                        fetches the remaining ones with a single $in query
+
+        Output      :   Dict of patient id to a read only float row in PREDICTION_FEATURE_COLUMNS
+                        order, unknown ids are left out
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            features: Dict[int, np.ndarray] = {}
+            missing_ids = []
+            for patient_id in dict.fromkeys(patient_ids):
+                row = self._cache.get(patient_id)
+                if row is None:
+                    missing_ids.append(patient_id)
+                else:
+                    features[patient_id] = row
+            if not missing_ids:
+                return features
+
+            with observe_seconds(self.query_histogram):
+                cursor = self._get_collection().find({PATIENT_ID_COLUMN: {"$in": missing_ids}}, self._projection)
+                documents = list(cursor.max_time_ms(self.patient_feature_store_config.query_timeout_ms))
+            for document in documents:
+                row = np.array([_to_float(document.get(column)) for column in PREDICTION_FEATURE_COLUMNS], dtype=np.float64)
+                row.flags.writeable = False
+                features[document[PATIENT_ID_COLUMN]] = row
+                self._cache.put(document[PATIENT_ID_COLUMN], row)
+            return features
+
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+    def get_feature_array(self, patient_ids: Sequence[int]) -> Tuple[List[int], np.ndarray, List[int]]:
+        """
+        Returns the ids found with complete features, their feature array in the same order and the
+        ids that are unknown or have feature values missing
+        """
+        features = self.get_features(patient_ids)
+        found_ids, unavailable_ids = [], []
+        for patient_id in dict.fromkeys(patient_ids):
+            row = features.get(patient_id)
+            if row is None or np.isnan(row).any():
+                unavailable_ids.append(patient_id)
+            else:
+                found_ids.append(patient_id)
+        feature_array = np.vstack([features[patient_id] for patient_id in found_ids]) if found_ids \
+            else np.empty((0, len(PREDICTION_FEATURE_COLUMNS)))
+        return found_ids, feature_array, unavailable_ids
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), "query_histogram": self.query_histogram.snapshot()}
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        # ingestion keeps "na" and missing fields, they make the row unavailable for prediction
+        return np.nan
+
+
+_patient_feature_store: Optional[PatientFeatureStore] = None
+_patient_feature_store_lock = threading.Lock()
+
+
+def get_patient_feature_store() -> PatientFeatureStore:
+    """
+    Returns the process wide patient feature store
+    """
+    global _patient_feature_store
+    if _patient_feature_store is None:
+        with _patient_feature_store_lock:
+            if _patient_feature_store is None:
+                _patient_feature_store = PatientFeatureStore()
+    return _patient_feature_store
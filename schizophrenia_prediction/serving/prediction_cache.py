@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+import numpy as np
+
+from schizophrenia_prediction.entity.config_entity import PredictionCacheConfig
+from schizophrenia_prediction.serving.metrics import REGISTRY
+
+
+class LRUCache:
+    """
+    This class is a thread safe, size bounded least recently used cache whose entries expire after ttl_seconds
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: Optional[float] = None):
+        """
+        :param max_size: Maximum number of entries kept, the least recently used one is evicted beyond it
+        :param ttl_seconds: Lifetime of an entry, entries never expire when None
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value) -> None:
+        if self.max_size <= 0:
+            return
+        expires_at = None if self.ttl_seconds is None else time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class PredictionCache:
+    """
+    This class caches predictions keyed on the model version and the normalized feature tuple of a
+    row. Versions served side by side share the cache, entries of a replaced version are never hit
+    again and age out through the LRU bound and the ttl
+    """
+
+    def __init__(self, prediction_cache_config: PredictionCacheConfig = PredictionCacheConfig()):
+        """
+        :param prediction_cache_config: Configuration with the size bound and ttl of the cache
+        """
+        self.prediction_cache_config = prediction_cache_config
+        self.enabled = prediction_cache_config.enabled
+        self._cache = LRUCache(max_size=prediction_cache_config.max_size,
+                               ttl_seconds=prediction_cache_config.ttl_seconds)
+
+    @staticmethod
+    def feature_key(row: np.ndarray) -> tuple:
+        """
+        Rows are parsed to floats before they get here, so "3", 3 and 3.0 share one key
+        """
+        return tuple(row.tolist())
+
+    def get(self, model_version: Hashable, row: np.ndarray):
+        return self._cache.get((model_version, PredictionCache.feature_key(row)))
+
+    def put(self, model_version: Hashable, row: np.ndarray, prediction) -> None:
+        self._cache.put((model_version, PredictionCache.feature_key(row)), prediction)
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        stats["enabled"] = self.enabled
+        return stats
+
+
+_prediction_cache: Optional[PredictionCache] = None
+_prediction_cache_lock = threading.Lock()
+
+
+def get_prediction_cache() -> PredictionCache:
+    """
+    Returns the process wide prediction cache
+    """
+    global _prediction_cache
+    if _prediction_cache is None:
+        with _prediction_cache_lock:
+            if _prediction_cache is None:
+                _prediction_cache = PredictionCache()
+                _register_prediction_cache_metrics(_prediction_cache)
+    return _prediction_cache
+
+
+def _register_prediction_cache_metrics(prediction_cache: PredictionCache) -> None:
+    REGISTRY.register_collector("schizophrenia_prediction_cache_hits_total", "counter",
+                                "Prediction cache lookups answered from the cache",
+                                lambda: [({}, prediction_cache._cache.hits)])
+    REGISTRY.register_collector("schizophrenia_prediction_cache_misses_total", "counter",
+                                "Prediction cache lookups that had to run the model",
+                                lambda: [({}, prediction_cache._cache.misses)])
+    REGISTRY.register_collector("schizophrenia_prediction_cache_evictions_total", "counter",
+                                "Entries evicted from the prediction cache",
+                                lambda: [({}, prediction_cache._cache.evictions)])
+    REGISTRY.register_collector("schizophrenia_prediction_cache_size", "gauge",
+                                "Entries currently held by the prediction cache",
+                                lambda: [({}, len(prediction_cache._cache))])
@@ -0,0 +1,374 @@
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import BinaryIO, Dict, Optional
+
+from schizophrenia_prediction.cloud_storage.local_storage import get_storage_service
+from schizophrenia_prediction.entity.config_entity import SchizophreniaPredConfig, ScoringJobConfig
+from schizophrenia_prediction.exception import SchizophreniaPredException
+from schizophrenia_prediction.logger import logging
+from schizophrenia_prediction.pipeline.batch_prediction_pipeline import BatchPredictionPipeline, predict_chunk
+from schizophrenia_prediction.serving.launcher import pid_alive
+from schizophrenia_prediction.serving.model_holder import get_model_holder
+
+_JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+_COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class ScoringUploadTooLarge(Exception):
+    """
+    Raised when an uploaded input file goes over the configured upload limit
+    """
+
+
+@dataclass
+class ScoringJob:
+    job_id: str
+    status: str
+    created_at: float
+    input_format: str
+    source: str
+    pid: Optional[int] = None
+    total_rows: Optional[int] = None
+    rows_scored: int = 0
+    chunks_scored: int = 0
+    model: Optional[str] = None
+    model_version: Optional[str] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    result_s3_key: Optional[str] = None
+
+
+def count_rows(file_path: str, input_format: str) -> int:
+    """
+    Number of data rows of the input file, read from the footer of parquet files and by counting
+    line breaks of CSV files, quoted line breaks inside CSV values make it an estimate
+    """
+    if input_format == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(file_path).metadata.num_rows
+    line_breaks, last_byte = 0, b"\n"
+    with open(file_path, "rb") as input_file:
+        for block in iter(lambda: input_file.read(_COPY_BUFFER_SIZE), b""):
+            line_breaks += block.count(b"\n")
+            last_byte = block[-1:]
+    return max(line_breaks - 1 + (last_byte != b"\n"), 0)
+
+
+def _run_scoring_job(job_id: str, scoring_job_config: ScoringJobConfig,
+                     prediction_pipeline_config: SchizophreniaPredConfig) -> None:
+    """
+    Entry point of the scoring worker process. The production model is loaded once here and the
+    whole file is scored with it, progress is reported through the job.json of the job
+    """
+    if scoring_job_config.nice:
+        os.nice(scoring_job_config.nice)
+    scoring_job_manager = ScoringJobManager(scoring_job_config, prediction_pipeline_config)
+    scoring_job_manager._score(scoring_job_manager._load_state(job_id))
+
+
+class ScoringJobManager:
+    """
+    This class scores uploaded or referenced CSV and Parquet files of patients as background jobs.
+    Every job is scored chunk by chunk in a separate, lower priority process so that it does not
+    compete with /predict for the GIL of the serving worker, a small thread pool bounds how many
+    of them run at once. Results are appended to disk as they are produced. The state of every
+    job is kept in a job.json next to its files, so any serving worker can report the progress
+    of a job and cancel it, whichever worker accepted the upload
+    """
+
+    RECEIVING: str = "receiving"
+    PENDING: str = "pending"
+    RUNNING: str = "running"
+    SUCCEEDED: str = "succeeded"
+    FAILED: str = "failed"
+    CANCELLED: str = "cancelled"
+    ACTIVE_STATUSES = (RECEIVING, PENDING, RUNNING)
+    INPUT_FORMATS = ("csv", "parquet")
+
+    def __init__(self, scoring_job_config: ScoringJobConfig = ScoringJobConfig(),
+                 prediction_pipeline_config: SchizophreniaPredConfig = SchizophreniaPredConfig()):
+        """
+        :param scoring_job_config: Configuration with the job directory, pool size, niceness, limits and output location
+        :param prediction_pipeline_config: Configuration of the model to score with
+        """
+        self.scoring_job_config = scoring_job_config
+        self.prediction_pipeline_config = prediction_pipeline_config
+        self._jobs: "OrderedDict[str, ScoringJob]" = OrderedDict()
+        self._context = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._futures: Dict[str, object] = {}
+
+    def _job_dir(self, job_id: str) -> str:
+        return os.path.join(self.scoring_job_config.job_dir, job_id)
+
+    def input_path(self, job: ScoringJob) -> str:
+        return os.path.join(self._job_dir(job.job_id), f"input.{job.input_format}")
+
+    def result_path(self, job: ScoringJob) -> str:
+        return os.path.join(self._job_dir(job.job_id), f"result.{job.input_format}")
+
+    def _cancel_marker_path(self, job_id: str) -> str:
+        return os.path.join(self._job_dir(job_id), "cancel")
+
+    def _save_state(self, job: ScoringJob) -> None:
+        state_path = os.path.join(self._job_dir(job.job_id), "job.json")
+        temp_path = f"{state_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as state_file:
+            json.dump(asdict(job), state_file)
+        os.replace(temp_path, state_path)
+
+    def _load_state(self, job_id: str) -> Optional[ScoringJob]:
+        try:
+            with open(os.path.join(self._job_dir(job_id), "job.json")) as state_file:
+                return ScoringJob(**json.load(state_file))
+        except FileNotFoundError:
+            return None
+
+    def create_job(self, input_format: str, source: str = "upload") -> ScoringJob:
+        """
+        Method Name :   create_job
+        Description :   This method registers a job and creates its directory, the job is scored once submitted
+
+        Output      :   Returns the new job in receiving state
+        On Failure  :   ValueError for an unsupported input format, otherwise an exception is raised
+        """
+        if input_format not in ScoringJobManager.INPUT_FORMATS:
+            raise ValueError(f"Unsupported input format {input_format!r}, expected one of {ScoringJobManager.INPUT_FORMATS}")
+        try:
+            job = ScoringJob(job_id=uuid.uuid4().hex, status=ScoringJobManager.RECEIVING, created_at=time.time(),
+                             input_format=input_format, source=source, pid=os.getpid())
+            os.makedirs(self._job_dir(job.job_id))
+            self._save_state(job)
+            with self._lock:
+                self._jobs[job.job_id] = job
+                self._trim_history()
+            return job
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+    def save_upload(self, job: ScoringJob, file_object: BinaryIO) -> None:
+        """
+        Copies an uploaded file into the job directory, raises ScoringUploadTooLarge past the upload limit
+        """
+        written = 0
+        with open(self.input_path(job), "wb") as input_file:
+            for block in iter(lambda: file_object.read(_COPY_BUFFER_SIZE), b""):
+                written += len(block)
+                if written > self.scoring_job_config.max_upload_bytes:
+                    raise ScoringUploadTooLarge(
+                        f"Upload exceeds limit of {self.scoring_job_config.max_upload_bytes} bytes")
+                input_file.write(block)
+
+    def discard(self, job: ScoringJob) -> None:
+        """
+        Forgets a job whose upload did not complete and removes its files
+        """
+        with self._lock:
+            self._jobs.pop(job.job_id, None)
+        shutil.rmtree(self._job_dir(job.job_id), ignore_errors=True)
+
+    def submit(self, job: ScoringJob) -> ScoringJob:
+        """
+        Method Name :   submit
+        Description :   This method queues a job whose input is in place, or referenced, for scoring
+
+        Output      :   Returns the job in pending state
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.scoring_job_config.max_concurrent_jobs,
+                                                        thread_name_prefix="scoring-job")
+                job.status = ScoringJobManager.PENDING
+                self._save_state(job)
+                self._futures[job.job_id] = self._executor.submit(self._run, job)
+            logging.info(f"Queued scoring job {job.job_id} for {job.source}")
+            return job
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+    def submit_upload(self, file_object: BinaryIO, filename: str) -> ScoringJob:
+        """
+        Stores an uploaded file, the format is taken from its extension, and queues it for scoring
+        """
+        input_format = "parquet" if (filename or "").lower().endswith(".parquet") else "csv"
+        job = self.create_job(input_format)
+        try:
+            self.save_upload(job, file_object)
+        except BaseException:
+            self.discard(job)
+            raise
+        return self.submit(job)
+
+    def _check_reference(self, bucket_name: Optional[str], s3_key: str) -> str:
+        """
+        Reference jobs read with the credentials of the server, so they are limited to keys under the
+        configured input prefix of the input bucket. Returns the bucket name, raises ValueError otherwise
+        """
+        input_bucket_name = self.scoring_job_config.input_bucket_name
+        if not input_bucket_name:
+            raise ValueError("Scoring jobs from storage references are disabled, SERVING_SCORING_JOB_INPUT_BUCKET is not set")
+        if bucket_name is not None and bucket_name != input_bucket_name:
+            raise ValueError(f"Scoring jobs can only read from bucket {input_bucket_name!r}")
+        key_parts = s3_key.split("/")
+        if "\\" in s3_key or any(part in ("", ".", "..") for part in key_parts):
+            raise ValueError(f"Invalid s3_key {s3_key!r}")
+        prefix_parts = [part for part in self.scoring_job_config.input_key_prefix.split("/") if part]
+        if len(key_parts) <= len(prefix_parts) or key_parts[:len(prefix_parts)] != prefix_parts:
+            raise ValueError(f"s3_key has to be under {'/'.join(prefix_parts)}/")
+        return input_bucket_name
+
+    def submit_reference(self, bucket_name: Optional[str], s3_key: str) -> ScoringJob:
+        """
+        Queues an object of the storage backend for scoring, it is downloaded by the job worker.
+        bucket_name defaults to the configured input bucket
+        """
+        bucket_name = self._check_reference(bucket_name, s3_key)
+        input_format = "parquet" if s3_key.lower().endswith(".parquet") else "csv"
+        job = self.create_job(input_format, source=f"s3://{bucket_name}/{s3_key}")
+        return self.submit(job)
+
+    def _run(self, job: ScoringJob) -> None:
+        if os.path.exists(self._cancel_marker_path(job.job_id)):
+            self._finish(job, ScoringJobManager.CANCELLED)
+            return
+        try:
+            process = self._context.Process(target=_run_scoring_job, name=f"scoring-{job.job_id}",
+                                            args=(job.job_id, self.scoring_job_config, self.prediction_pipeline_config),
+                                            daemon=True)
+            process.start()
+        except Exception as e:
+            self._finish(job, ScoringJobManager.FAILED, error=f"Scoring process did not start: {e}")
+            return
+        logging.info(f"Started scoring job {job.job_id} in process {process.pid}")
+        process.join()
+        finished_job = self._load_state(job.job_id)
+        if finished_job.status in ScoringJobManager.ACTIVE_STATUSES:
+            self._finish(finished_job, ScoringJobManager.FAILED,
+                         error=f"Scoring process exited with code {process.exitcode}")
+        else:
+            self._finish_local(finished_job)
+
+    def _score(self, job: ScoringJob) -> None:
+        job.status = ScoringJobManager.RUNNING
+        job.started_at = time.time()
+        self._save_state(job)
+        writer = None
+        try:
+            input_path = self.input_path(job)
+            if job.source.startswith("s3://"):
+                bucket_name, s3_key = job.source[len("s3://"):].split("/", 1)
+                get_storage_service().download_file(bucket_name, s3_key, input_path)
+            job.total_rows = count_rows(input_path, job.input_format)
+
+            # the model is loaded once for the whole job, a hot swap mid file does not mix two models in one result
+            model_holder = get_model_holder(self.prediction_pipeline_config)
+            model = model_holder.get_model()
+            job.model, job.model_version = str(model), model_holder.model_version
+            self._save_state(job)
+
+            writer = BatchPredictionPipeline._ChunkWriter(self.result_path(job))
+            for chunk in BatchPredictionPipeline.read_chunks(input_path, self.scoring_job_config.chunk_size):
+                if os.path.exists(self._cancel_marker_path(job.job_id)):
+                    writer.close()
+                    self._finish(job, ScoringJobManager.CANCELLED)
+                    return
+                writer.write(predict_chunk(model, chunk, self.scoring_job_config.prediction_column))
+                job.rows_scored += len(chunk)
+                job.chunks_scored += 1
+                self._save_state(job)
+            writer.close()
+
+            if self.scoring_job_config.output_bucket_name:
+                result_s3_key = f"{self.scoring_job_config.output_key_prefix}/{job.job_id}/{os.path.basename(self.result_path(job))}"
+                get_storage_service().upload_file(self.result_path(job), result_s3_key,
+                                                  self.scoring_job_config.output_bucket_name, remove=False)
+                job.result_s3_key = result_s3_key
+            os.remove(input_path)
+            self._finish(job, ScoringJobManager.SUCCEEDED)
+        except Exception as e:
+            if writer is not None:
+                writer.close()
+            self._finish(job, ScoringJobManager.FAILED, error=f"{e}")
+
+    def _finish(self, job: ScoringJob, status: str, error: Optional[str] = None) -> None:
+        job.status = status
+        job.error = error
+        job.finished_at = time.time()
+        self._save_state(job)
+        self._finish_local(job)
+        logging.info(f"Scoring job {job.job_id} finished with status {status} after {job.rows_scored} rows")
+
+    def _finish_local(self, job: ScoringJob) -> None:
+        with self._lock:
+            if job.job_id in self._jobs:
+                self._jobs[job.job_id] = job
+            self._futures.pop(job.job_id, None)
+
+    def get(self, job_id: str) -> Optional[ScoringJob]:
+        """
+        Returns the job as its job.json records it, the scoring process keeps that file up to date.
+        An active job whose serving worker is gone is reported as failed
+        """
+        if not _JOB_ID_PATTERN.match(job_id):
+            return None
+        job = self._load_state(job_id)
+        if job is not None and job.status in ScoringJobManager.ACTIVE_STATUSES and not pid_alive(job.pid):
+            job.status = ScoringJobManager.FAILED
+            job.error = f"Serving worker {job.pid} running the job exited"
+        return job
+
+    def cancel(self, job_id: str) -> Optional[ScoringJob]:
+        """
+        Asks the worker scoring the job to stop after its current chunk, finished jobs are returned unchanged
+        """
+        job = self.get(job_id)
+        if job is None or job.status not in ScoringJobManager.ACTIVE_STATUSES:
+            return job
+        open(self._cancel_marker_path(job_id), "w").close()
+        future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            self._finish(job, ScoringJobManager.CANCELLED)
+        logging.info(f"Requested cancellation of scoring job {job_id}")
+        return self.get(job_id)
+
+    def shutdown(self) -> None:
+        for job in list(self._jobs.values()):
+            if job.status in ScoringJobManager.ACTIVE_STATUSES:
+                self.cancel(job.job_id)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def _trim_history(self) -> None:
+        while len(self._jobs) > self.scoring_job_config.history_size:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest.status in ScoringJobManager.ACTIVE_STATUSES:
+                break
+            del self._jobs[oldest_id]
+            shutil.rmtree(self._job_dir(oldest_id), ignore_errors=True)
+
+    @staticmethod
+    def to_dict(job: ScoringJob) -> dict:
+        job_dict = asdict(job)
+        job_dict["progress"] = {
+            "rows_scored": job.rows_scored,
+            "total_rows": job.total_rows,
+            "fraction": min(job.rows_scored / job.total_rows, 1.0) if job.total_rows else None,
+        }
+        return job_dict
+
@@ -0,0 +1,305 @@
+import fcntl
+import json
+import multiprocessing
+import os
+import queue
+import re
+import shutil
+import signal
+import sys
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Iterator, List, Optional
+
+from schizophrenia_prediction.constants import TRAINING_PIPELINE_STAGES
+from schizophrenia_prediction.entity.config_entity import TrainingJobConfig
+from schizophrenia_prediction.exception import SchizophreniaPredException
+from schizophrenia_prediction.logger import logging
+from schizophrenia_prediction.serving.launcher import pid_alive
+
+_JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+@dataclass
+class TrainingJob:
+    job_id: str
+    status: str
+    created_at: float
+    stage: Optional[str] = None
+    completed_stages: List[str] = field(default_factory=list)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    pid: Optional[int] = None
+    owner_pid: Optional[int] = None
+
+
+def _run_training_job(job_id: str, status_queue, nice: int) -> None:
+    """
+    Entry point of the training worker process. Training modules are imported here so that
+    the serving process never loads them, stage changes are reported through status_queue
+    """
+    try:
+        if nice:
+            os.nice(nice)
+        from schizophrenia_prediction.pipeline.training_pipeline import TrainPipeline
+
+        train_pipeline = TrainPipeline(progress_callback=lambda stage: status_queue.put((job_id, "stage", stage)))
+        train_pipeline.run_pipeline()
+        status_queue.put((job_id, TrainingJobManager.SUCCEEDED, None))
+    except BaseException as e:
+        status_queue.put((job_id, TrainingJobManager.FAILED, f"{e}\n{traceback.format_exc()}"))
+
+
+class TrainingJobManager:
+    """
+    This class runs TrainPipeline as a job in a separate, lower priority worker process.
+    Only one job runs at a time, submitting while a job is active returns the active job.
+    The serving worker starting a job owns it and keeps its job.json in job_dir up to date.
+    Any other worker reads the status from there, and a lock file in job_dir keeps the
+    pre-forked workers from starting trainings side by side
+    """
+
+    PENDING: str = "pending"
+    RUNNING: str = "running"
+    SUCCEEDED: str = "succeeded"
+    FAILED: str = "failed"
+    CANCELLED: str = "cancelled"
+    ACTIVE_STATUSES = (PENDING, RUNNING)
+
+    def __init__(self, training_job_config: TrainingJobConfig = TrainingJobConfig()):
+        """
+        :param training_job_config: Configuration with the worker niceness and the job history size
+        """
+        self.training_job_config = training_job_config
+        self._context = multiprocessing.get_context("spawn")
+        self._status_queue = None
+        self._jobs: "OrderedDict[str, TrainingJob]" = OrderedDict()
+        self._processes = {}
+        self._lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def _job_dir(self, job_id: str) -> str:
+        return os.path.join(self.training_job_config.job_dir, job_id)
+
+    def _cancel_marker_path(self, job_id: str) -> str:
+        return os.path.join(self._job_dir(job_id), "cancel")
+
+    def _active_pointer_path(self) -> str:
+        return os.path.join(self.training_job_config.job_dir, "active")
+
+    def _save_state(self, job: TrainingJob) -> None:
+        state_path = os.path.join(self._job_dir(job.job_id), "job.json")
+        temp_path = f"{state_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as state_file:
+            json.dump(asdict(job), state_file)
+        os.replace(temp_path, state_path)
+
+    def _load_state(self, job_id: str) -> Optional[TrainingJob]:
+        try:
+            with open(os.path.join(self._job_dir(job_id), "job.json")) as state_file:
+                return TrainingJob(**json.load(state_file))
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def _submit_lock(self) -> Iterator[None]:
+        # a POSIX record lock belongs to this process only, the training process started while it is
+        # held does not inherit it, and it is released when the file is closed or the worker dies
+        os.makedirs(self.training_job_config.job_dir, exist_ok=True)
+        with open(os.path.join(self.training_job_config.job_dir, "submit.lock"), "w") as lock_file:
+            fcntl.lockf(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _active_job(self) -> Optional[TrainingJob]:
+        try:
+            with open(self._active_pointer_path()) as pointer_file:
+                job = self.get(pointer_file.read().strip())
+        except FileNotFoundError:
+            return None
+        return job if job is not None and job.status in TrainingJobManager.ACTIVE_STATUSES else None
+
+    def _ensure_listener(self) -> None:
+        if self._listener is None or not self._listener.is_alive():
+            self._status_queue = self._status_queue or self._context.Queue()
+            self._stop_event.clear()
+            self._listener = threading.Thread(target=self._listen, name="training-job-listener", daemon=True)
+            self._listener.start()
+
+    def submit(self) -> TrainingJob:
+        """
+        Method Name :   submit
+        Description :   This method starts a training job unless one is already active in any
+                        serving worker
+
+        Output      :   Returns the new job, or the active one when training is already running
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            with self._lock, self._submit_lock():
+                active_job = self._active_job()
+                if active_job is not None:
+                    logging.info(f"Training job {active_job.job_id} is already active, not starting another one")
+                    return active_job
+
+                self._ensure_listener()
+                job = TrainingJob(job_id=uuid.uuid4().hex, status=TrainingJobManager.PENDING, created_at=time.time(),
+                                  owner_pid=os.getpid())
+                os.makedirs(self._job_dir(job.job_id))
+                process = self._context.Process(target=_run_training_job, name=f"training-{job.job_id}",
+                                                args=(job.job_id, self._status_queue, self.training_job_config.nice),
+                                                daemon=False)
+                process.start()
+                job.pid = process.pid
+                job.status = TrainingJobManager.RUNNING
+                job.started_at = time.time()
+                self._jobs[job.job_id] = job
+                self._processes[job.job_id] = process
+                self._save_state(job)
+                with open(self._active_pointer_path(), "w") as pointer_file:
+                    pointer_file.write(job.job_id)
+                self._trim_history()
+                logging.info(f"Started training job {job.job_id} in process {process.pid}")
+                return job
+        except Exception as e:
+            raise SchizophreniaPredException(e, sys) from e
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        """
+        Returns the job from this process or from its job.json when another worker owns it. An
+        active job whose owning worker and training process are both gone is reported as failed
+        """
+        if not _JOB_ID_PATTERN.match(job_id):
+            return None
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        job = self._load_state(job_id)
+        if job is not None and job.status in TrainingJobManager.ACTIVE_STATUSES \
+                and not pid_alive(job.owner_pid) and not pid_alive(job.pid):
+            job.status = TrainingJobManager.FAILED
+            job.error = f"Serving worker {job.owner_pid} owning the job exited"
+        return job
+
+    def list(self) -> List[TrainingJob]:
+        return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[TrainingJob]:
+        """
+        Terminates the worker process of an active job, finished jobs are returned unchanged. A job
+        owned by another serving worker is flagged with a cancel marker its owner acts on, this waits
+        up to cancel_wait_seconds for the owner to record the cancellation
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                if job.status not in TrainingJobManager.ACTIVE_STATUSES:
+                    return job
+                process = self._processes.pop(job_id, None)
+                if process is not None and process.is_alive():
+                    process.terminate()
+                    process.join(timeout=10)
+                job.status = TrainingJobManager.CANCELLED
+                job.finished_at = time.time()
+                self._save_state(job)
+                logging.info(f"Cancelled training job {job_id}")
+                return job
+
+        job = self.get(job_id)
+        if job is None or job.status not in TrainingJobManager.ACTIVE_STATUSES:
+            return job
+        if not pid_alive(job.owner_pid):
+            # the owning worker died and left its training process behind, nobody else will stop it
+            try:
+                os.kill(job.pid, signal.SIGTERM)
+            except (ProcessLookupError, TypeError):
+                pass
+            job.status = TrainingJobManager.CANCELLED
+            job.finished_at = time.time()
+            self._save_state(job)
+            logging.info(f"Cancelled training job {job_id} of exited worker {job.owner_pid}")
+            return job
+        open(self._cancel_marker_path(job_id), "w").close()
+        logging.info(f"Requested cancellation of training job {job_id} from worker {job.owner_pid}")
+        deadline = time.monotonic() + self.training_job_config.cancel_wait_seconds
+        while job.status in TrainingJobManager.ACTIVE_STATUSES and time.monotonic() < deadline:
+            time.sleep(0.2)
+            job = self.get(job_id)
+        return job
+
+    def shutdown(self) -> None:
+        for job in self.list():
+            self.cancel(job.job_id)
+        self._stop_event.set()
+        if self._listener is not None:
+            self._listener.join(timeout=5)
+            self._listener = None
+
+    def _trim_history(self) -> None:
+        while len(self._jobs) > self.training_job_config.history_size:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest.status in TrainingJobManager.ACTIVE_STATUSES:
+                break
+            del self._jobs[oldest_id]
+            shutil.rmtree(self._job_dir(oldest_id), ignore_errors=True)
+
+    def _apply_cancel_requests(self) -> None:
+        for job in self.list():
+            if job.status in TrainingJobManager.ACTIVE_STATUSES and os.path.exists(self._cancel_marker_path(job.job_id)):
+                self.cancel(job.job_id)
+
+    def _listen(self) -> None:
+        while not self._stop_event.is_set():
+            self._apply_cancel_requests()
+            try:
+                job_id, event, payload = self._status_queue.get(timeout=1)
+            except queue.Empty:
+                self._reap_dead_processes()
+                continue
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job.status not in TrainingJobManager.ACTIVE_STATUSES:
+                    continue
+                if event == "stage":
+                    if job.stage is not None:
+                        job.completed_stages.append(job.stage)
+                    job.stage = payload
+                    self._save_state(job)
+                else:
+                    if event == TrainingJobManager.SUCCEEDED and job.stage is not None:
+                        job.completed_stages.append(job.stage)
+                    job.status = event
+                    job.error = payload
+                    job.finished_at = time.time()
+                    self._save_state(job)
+                    process = self._processes.pop(job_id, None)
+                    if process is not None:
+                        process.join(timeout=10)
+                    logging.info(f"Training job {job_id} finished with status {event}")
+
+    def _reap_dead_processes(self) -> None:
+        with self._lock:
+            for job_id, process in list(self._processes.items()):
+                if not process.is_alive():
+                    job = self._jobs[job_id]
+                    if job.status in TrainingJobManager.ACTIVE_STATUSES and self._status_queue.empty():
+                        job.status = TrainingJobManager.FAILED
+                        job.error = f"Training process exited with code {process.exitcode}"
+                        job.finished_at = time.time()
+                        self._save_state(job)
+                        del self._processes[job_id]
+
+    @staticmethod
+    def to_dict(job: TrainingJob) -> dict:
+        job_dict = asdict(job)
+        job_dict["progress"] = {
+            "completed_stages": len(job.completed_stages),
+            "total_stages": len(TRAINING_PIPELINE_STAGES),
+        }
+        return job_dict